@@ -2,17 +2,11 @@ import os
 import sys
 import cv2
 import numpy as np
-import mediapipe as mp
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.middleware.cors import CORSMiddleware
-from ultralytics import YOLO
 from pydantic import BaseModel
 import io
-import json
-import joblib
-# Support for both Keras and ONNX model loading since process_video expects ONNX
-from tensorflow.keras.models import load_model
-import onnxruntime as ort
+# Keras / ONNX shot models are loaded through model_registry (TensorFlow only imported for .keras)
 from fastapi.responses import StreamingResponse
 
 # Initialize FastAPI
@@ -35,7 +29,9 @@ MODELS_DIR = os.path.join(os.path.dirname(BASE_DIR), 'models')
 sys.path.append(os.path.dirname(BASE_DIR)) # ai_engine
 sys.path.append(os.path.join(os.path.dirname(os.path.dirname(BASE_DIR)), "cricket_lbw_system"))
 
-from process_video import process_video as pv_live
+from process_video import process_video as pv_live, BATCH_SIZE
+from chunked_video import process_video_chunked
+import model_registry as registry
 try:
     from process_lbw_video import process_video as pv_lbw
 except ImportError:
@@ -66,29 +62,27 @@ def load_models():
     
     try:
         if os.path.exists(YOLO_MODEL_PATH):
-            yolo_model = YOLO(YOLO_MODEL_PATH)
+            yolo_model = registry.yolo(YOLO_MODEL_PATH, warmup=True)
             print("YOLO ball model loaded.")
         
         if os.path.exists(YOLO_PITCH_PATH):
-            pitch_yolo_model = YOLO(YOLO_PITCH_PATH)
+            pitch_yolo_model = registry.yolo(YOLO_PITCH_PATH, warmup=True)
             print("YOLO pitch model loaded.")
         
         if os.path.exists(SHOT_ONNX_PATH):
-            shot_model = ort.InferenceSession(SHOT_ONNX_PATH)
-            scaler = joblib.load(SCALER_PATH)
-            with open(LABEL_MAP_PATH, "r") as f:
-                classes = json.load(f)["classes"]
+            shot_model = registry.shot_model(SHOT_ONNX_PATH, warmup=True)
+            scaler = registry.shot_scaler(SHOT_ONNX_PATH, SCALER_PATH)
+            classes = registry.labels(LABEL_MAP_PATH)
             print("LSTM ONNX model loaded.")
         elif os.path.exists(SHOT_MODEL_PATH):
-            shot_model = load_model(SHOT_MODEL_PATH)
-            scaler = joblib.load(SCALER_PATH)
-            with open(LABEL_MAP_PATH, "r") as f:
-                classes = json.load(f)["classes"]
+            shot_model = registry.keras_model(SHOT_MODEL_PATH, warmup=True)
+            scaler = registry.scaler(SCALER_PATH)
+            classes = registry.labels(LABEL_MAP_PATH)
             print("LSTM Keras model loaded.")
 
-        mp_pose = mp.solutions.pose
-        pose_detector = mp_pose.Pose(static_image_mode=True, min_detection_confidence=0.5)
+        pose_detector = registry.pose(static_image_mode=True, warmup=True)
         print("MediaPipe initialized.")
+        print(registry.format_load_report())
     except Exception as e:
         print(f"Startup Error: {e}")
 
@@ -155,7 +149,10 @@ async def predict(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/process-video")
-async def process_video_endpoint(input_path: str = Form(...), output_path: str = Form(...), mode: str = Form("mediapipe")):
+async def process_video_endpoint(input_path: str = Form(...), output_path: str = Form(...), mode: str = Form("mediapipe"), batch_size: int = Form(BATCH_SIZE), workers: int = Form(1)):
+    if workers > 1:
+        # Long videos: each worker process loads its own models
+        return StreamingResponse(process_video_chunked(input_path, output_path, mode, workers=workers, batch_size=batch_size), media_type="text/event-stream")
     models_dict = {
         'ball_model': yolo_model,
         'pitch_model': pitch_yolo_model,
@@ -164,7 +161,7 @@ async def process_video_endpoint(input_path: str = Form(...), output_path: str =
         'classes': classes,
         'pose_detector': pose_detector
     }
-    return StreamingResponse(pv_live(input_path, output_path, mode, models_dict), media_type="text/event-stream")
+    return StreamingResponse(pv_live(input_path, output_path, mode, models_dict, batch_size=batch_size), media_type="text/event-stream")
 
 @app.post("/process-lbw-video")
 async def process_lbw_endpoint(input_path: str = Form(...), output_path: str = Form(...), mode: str = Form("auto")):
@@ -0,0 +1,134 @@
+"""
+api_client.py
+=============
+Client for the Node API (detection records) used by the live servers.
+
+The live loops sent /api/detections/update every third frame through
+make_api_call_async(), which started a new thread and opened a new HTTP
+connection for each POST, carrying the full trajectory every time.
+DetectionUpdateSender keeps one background thread and one keep-alive
+requests.Session instead:
+
+  * update(db_id, results) only stores the payload in a slot per detection
+    id; a newer update for the same id replaces the pending one (merged)
+  * the sender thread POSTs the pending slots at most once per flush
+    interval (CRICKET_UPDATE_FLUSH_MS, default 200 ms)
+  * a failed POST is retried on the next flush unless a newer update for
+    that id has arrived in the meantime (then it counts as dropped)
+
+stats() reports submitted / sent / merged / failed / dropped counts; the
+live servers expose them on /api/metrics.
+
+Usage:
+    sender = DetectionUpdateSender()
+    db_id = sender.create_detection("Live Stream")
+    sender.update(db_id, results_data)      # returns immediately
+    sender.close()                          # final flush
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+API_BASE_ENV = "CRICKET_NODE_API"
+DEFAULT_API_BASE = "http://127.0.0.1:3000"
+FLUSH_ENV = "CRICKET_UPDATE_FLUSH_MS"
+DEFAULT_FLUSH_MS = 200
+UPDATE_TIMEOUT = 0.5
+CREATE_TIMEOUT = 0.3
+
+
+class DetectionUpdateSender:
+    def __init__(self, base_url=None, flush_interval_ms=None, timeout=UPDATE_TIMEOUT):
+        self.base_url = (base_url or os.environ.get(API_BASE_ENV, DEFAULT_API_BASE)).rstrip("/")
+        if flush_interval_ms is None:
+            flush_interval_ms = float(os.environ.get(FLUSH_ENV, DEFAULT_FLUSH_MS))
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self._pending = {}    # db_id -> latest results not yet sent
+        self._cond = threading.Condition()
+        self._stop = False
+        self._thread = None
+        self.metrics = {'submitted': 0, 'sent': 0, 'merged': 0, 'failed': 0, 'dropped': 0}
+
+    def create_detection(self, image_path="Live Stream"):
+        """New detection record (synchronous: the id is needed right away); None on failure."""
+        try:
+            r = self.session.post(f"{self.base_url}/api/detections/new", json={"image_path": image_path},
+                                  timeout=CREATE_TIMEOUT)
+            if r.status_code == 200:
+                return r.json().get("id")
+        except Exception as e:
+            print(f"Error creating DB record: {e}")
+        return None
+
+    def update(self, db_id, results):
+        """Queue the latest results for db_id; replaces an update for the same id that is still pending."""
+        if db_id is None:
+            return
+        with self._cond:
+            self.metrics['submitted'] += 1
+            if db_id in self._pending:
+                self.metrics['merged'] += 1
+            self._pending[db_id] = results
+            self._cond.notify()
+        self._ensure_thread()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._cond:
+                if self._thread is None or not self._thread.is_alive():
+                    self._stop = False
+                    self._thread = threading.Thread(target=self._loop, name="detection-updates", daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending or self._stop)
+                if self._stop and not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+            self._send(batch)
+            with self._cond:
+                if self._stop:
+                    continue  # Flush what is left without waiting
+                self._cond.wait_for(lambda: self._stop, self.flush_interval)
+
+    def _send(self, batch):
+        for db_id, results in batch.items():
+            try:
+                r = self.session.post(f"{self.base_url}/api/detections/update", json={"id": db_id, "results": results},
+                                      timeout=self.timeout)
+                r.close()
+                ok = r.status_code < 500
+            except Exception:
+                ok = False
+            with self._cond:
+                if ok:
+                    self.metrics['sent'] += 1
+                    continue
+                self.metrics['failed'] += 1
+                if db_id in self._pending or self._stop:
+                    self.metrics['dropped'] += 1  # Superseded by a newer update (or shutting down)
+                else:
+                    self._pending[db_id] = results  # Retry on the next flush
+
+    def close(self, timeout=2.0):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._cond:
+            self.metrics['dropped'] += len(self._pending)
+            self._pending.clear()
+        self.session.close()
+
+    def stats(self):
+        with self._cond:
+            return dict(self.metrics, pending=len(self._pending), flush_interval_ms=self.flush_interval * 1000)
@@ -0,0 +1,120 @@
+"""
+batsman_tracker.py
+==================
+Keeps the MediaPipe crop on the batsman from frame to frame.
+
+The pipelines picked the batsman from the YOLO detections on every frame
+(every person box checked against the pitch and against every bat) and cut
+a fresh crop around whichever box won. Once a batsman has been picked and
+MediaPipe finds a pose, the next crop can come from that pose instead:
+the extent of the visible landmarks, shifted by the last motion, plus a
+margin that grows with the motion. The YOLO-based selection runs again
+only when the track is lost:
+
+  * the pose is missing or its mean visibility drops below min_confidence
+  * the landmark extent jumps or rescales more than a body can between
+    frames (MediaPipe latched onto something else)
+  * revalidate_frames frames have been tracked (periodic re-check)
+  * a scene cut (reset())
+
+Usage:
+    tracker = BatsmanTracker()
+    box = tracker.select(lambda: select_batsman(...))   # tracked ROI or YOLO pick
+    ... MediaPipe on frame[box] ...
+    tracker.update(pose_features if res_pose.pose_landmarks else None, frame.shape)
+"""
+
+import numpy as np
+
+# Config
+MARGIN = 0.25               # Crop padding as a fraction of the landmark extent
+MIN_VISIBILITY = 0.5        # Landmarks that count towards the extent
+MIN_POINTS = 8              # Fewer visible landmarks than this loses the track
+MIN_CONFIDENCE = 0.4        # Mean landmark visibility below this loses the track
+MAX_JUMP = 0.5              # Max centre shift per frame, fraction of the extent
+MAX_SCALE_CHANGE = 1.6      # Max extent height ratio between frames
+REVALIDATE_FRAMES = 150     # Force a YOLO re-selection after this many tracked frames
+
+
+class BatsmanTracker:
+    def __init__(self, margin=MARGIN, min_confidence=MIN_CONFIDENCE, max_jump=MAX_JUMP,
+                 max_scale_change=MAX_SCALE_CHANGE, revalidate_frames=REVALIDATE_FRAMES):
+        self.margin = margin
+        self.min_confidence = min_confidence
+        self.max_jump = max_jump
+        self.max_scale_change = max_scale_change
+        self.revalidate_frames = revalidate_frames
+        self.reused = 0
+        self.selections = 0
+        self.lost = {}
+        self.reset()
+
+    def reset(self):
+        self.box = None         # Crop for the next frame, None = re-select
+        self._center = None
+        self._size = None
+        self._tracked = 0
+
+    def on_scene_change(self, event, frame_idx=None):
+        if event == "cut":
+            self.reset()
+
+    def select(self, select_fn):
+        """Tracked crop, or select_fn() (the full YOLO-based pick) when not tracking."""
+        if self.box is not None:
+            self.reused += 1
+            return self.box
+        self._center = self._size = None
+        self._tracked = 0
+        box = select_fn()
+        if box is not None:
+            self.selections += 1
+        return box
+
+    def _lose(self, reason):
+        self.lost[reason] = self.lost.get(reason, 0) + 1
+        self.reset()
+        return None
+
+    def update(self, extractor, frame_shape):
+        """Derive the next crop from the pose just found (extractor) or drop the track."""
+        if extractor is None or extractor.landmarks is None:
+            return self._lose("no_pose")
+        visibility = extractor.landmarks[:, 3]
+        if visibility.mean() < self.min_confidence:
+            return self._lose("low_confidence")
+        points = extractor.pixels()[visibility >= MIN_VISIBILITY]
+        if len(points) < MIN_POINTS:
+            return self._lose("low_confidence")
+
+        lo, hi = points.min(axis=0), points.max(axis=0)
+        center, size = (lo + hi) / 2, np.maximum(hi - lo, 1.0)
+        motion = np.zeros(2)
+        if self._center is not None:
+            motion = center - self._center
+            if np.any(np.abs(motion) > self.max_jump * self._size):
+                return self._lose("drift")
+            ratio = size[1] / self._size[1]
+            if not 1 / self.max_scale_change <= ratio <= self.max_scale_change:
+                return self._lose("drift")
+
+        self._tracked += 1
+        if self._tracked >= self.revalidate_frames:
+            return self._lose("revalidate")
+
+        # 1. Predict the next position from the last motion, pad more when moving fast
+        half = size / 2 + self.margin * size + np.abs(motion)
+        nxt = center + motion
+        h, w = frame_shape[:2]
+        x1, y1 = np.maximum(nxt - half, 0).astype(int)
+        x2, y2 = np.minimum(nxt + half, (w, h)).astype(int)
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return self._lose("drift")
+
+        self.box = (int(x1), int(y1), int(x2), int(y2))
+        self._center, self._size = center, size
+        return self.box
+
+    def stats(self):
+        return {'reused': self.reused, 'selections': self.selections, 'lost': dict(self.lost),
+                'tracking': self.box is not None}
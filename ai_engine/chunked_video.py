@@ -0,0 +1,219 @@
+"""
+chunked_video.py
+================
+Parallel chunked analysis of long videos across a process pool.
+
+The input is split into keyframe-aligned frame ranges. Each range is analysed
+by process_video() in a separate worker process with its own model instances.
+Every chunk starts a few frames early (the overlap window), so the ball track,
+pose buffer and latched shot carry over the chunk boundary the same way they
+would in a single sequential pass. The per-chunk MP4s are then concatenated
+into one annotated video, and the per-chunk results are merged into one.
+
+Usage:
+    python chunked_video.py --input <video> --output <out.mp4> --workers 16
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import shutil
+import subprocess
+import tempfile
+
+import cv2
+
+from process_video import process_video, load_models, new_pose_detector, SEQ_LEN, SHOT_DISPLAY_FRAMES, MAX_MISSING_FRAMES
+
+# Config
+MIN_CHUNK_SECONDS = 60  # Shorter videos are not worth splitting
+CHUNKS_PER_WORKER = 2   # Extra chunks even out the load between workers
+OVERLAP_FRAMES = SEQ_LEN + SHOT_DISPLAY_FRAMES + MAX_MISSING_FRAMES
+
+_worker_models = None
+
+
+def find_keyframes(input_path, fps):
+    """Frame indices of the video keyframes, or None if ffprobe is unavailable.
+
+    fps must be the exact (float) rate: truncating 29.97 to 29 puts a cut ten
+    minutes in about 580 frames away from its keyframe.
+    """
+    ffprobe = shutil.which("ffprobe")
+    if not ffprobe:
+        return None
+    cmd = [ffprobe, "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", input_path]
+    try:
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=300)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if res.returncode != 0:
+        return None
+
+    keyframes = set()
+    for line in res.stdout.splitlines():
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.add(int(round(float(parts[0]) * fps)))
+        except ValueError:
+            continue
+    return sorted(keyframes)
+
+
+def plan_chunks(total_frames, fps, n_chunks, keyframes=None):
+    """Split [0, total_frames) into n_chunks ranges, snapping cuts to keyframes."""
+    min_len = int(MIN_CHUNK_SECONDS * fps)
+    n_chunks = max(1, min(n_chunks, total_frames // max(1, min_len)))
+    step = total_frames / n_chunks
+
+    cuts = [0]
+    for i in range(1, n_chunks):
+        target = int(i * step)
+        if keyframes:
+            # Nearest keyframe at or after the target cut
+            target = next((k for k in keyframes if k >= target), total_frames)
+        if cuts[-1] < target < total_frames:
+            cuts.append(target)
+    cuts.append(total_frames)
+    return [(cuts[i], cuts[i + 1]) for i in range(len(cuts) - 1)]
+
+
+def _init_worker():
+    global _worker_models
+    cv2.setNumThreads(1)
+    _worker_models = load_models(pose=False)  # Each chunk builds its own pose tracker
+
+
+def _process_chunk(task):
+    chunk_idx, input_path, chunk_path, mode, start, end, overlap, batch_size = task
+
+    # Fresh pose tracker per chunk so MediaPipe does not carry ROI state across ranges
+    models = dict(_worker_models)
+    models['pose_detector'] = new_pose_detector()
+
+    result = {'chunk': chunk_idx, 'path': chunk_path, 'start': start, 'end': end, 'final_result': None, 'error': None}
+    try:
+        for output in process_video(input_path, chunk_path, mode, models, batch_size=batch_size,
+                                    start_frame=start, end_frame=end, warmup_frames=overlap if start > 0 else 0):
+            if not output.startswith("data: "):
+                continue
+            data = json.loads(output[6:])
+            if "final_result" in data:
+                result['final_result'] = data['final_result']
+            elif "error" in data:
+                result['error'] = data['error']
+    finally:
+        models['pose_detector'].close()
+    return result
+
+
+def concat_videos(chunk_paths, output_path, fps, size):
+    """Join the chunk MP4s. Uses the ffmpeg concat demuxer when available, else re-encodes with OpenCV."""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        list_path = output_path + ".concat.txt"
+        with open(list_path, "w") as f:
+            for path in chunk_paths:
+                f.write(f"file '{os.path.abspath(path)}'\n")
+        res = subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "concat", "-safe", "0",
+                              "-i", list_path, "-c", "copy", output_path], capture_output=True)
+        os.remove(list_path)
+        if res.returncode == 0:
+            return
+
+    out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'avc1'), fps, size)
+    if not out.isOpened():
+        out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), fps, size)
+    for path in chunk_paths:
+        cap = cv2.VideoCapture(path)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+    out.release()
+
+
+def process_video_chunked(input_path, output_path, mode="mediapipe", workers=None, overlap=OVERLAP_FRAMES, batch_size=8):
+    """Same SSE contract as process_video(), minus the per-frame previews."""
+    yield f"data: {json.dumps({'progress': f'Starting chunked analysis: {input_path} with mode {mode}'})}\n\n"
+
+    cap = cv2.VideoCapture(input_path)
+    if not cap.isOpened():
+        yield f"data: {json.dumps({'error': 'Could not open video source'})}\n\n"
+        return
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if not fps or fps <= 0 or fps != fps:
+        fps = 30.0
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+
+    workers = workers or os.cpu_count() or 1
+    chunks = plan_chunks(total_frames, fps, workers * CHUNKS_PER_WORKER, find_keyframes(input_path, fps))
+    if len(chunks) == 1:
+        # Too short to split: plain sequential run
+        yield from process_video(input_path, output_path, mode, batch_size=batch_size)
+        return
+
+    yield f"data: {json.dumps({'progress': f'Split into {len(chunks)} chunks across {workers} workers'})}\n\n"
+
+    tmp_dir = tempfile.mkdtemp(prefix="chunks_", dir=os.path.dirname(os.path.abspath(output_path)))
+    tasks = [(i, input_path, os.path.join(tmp_dir, f"chunk_{i:04d}.mp4"), mode, start, end, overlap, batch_size)
+             for i, (start, end) in enumerate(chunks)]
+
+    results = [None] * len(tasks)
+    try:
+        ctx = mp.get_context("spawn")
+        with ctx.Pool(processes=min(workers, len(tasks)), initializer=_init_worker) as pool:
+            done = 0
+            for res in pool.imap_unordered(_process_chunk, tasks):
+                results[res['chunk']] = res
+                done += 1
+                if res['error']:
+                    msg = f"Chunk {res['chunk']} failed: {res['error']}"
+                    yield f"data: {json.dumps({'error': msg})}\n\n"
+                    return
+                msg = f"Chunk {done}/{len(tasks)} done (frames {res['start']}-{res['end']})"
+                yield f"data: {json.dumps({'progress': msg})}\n\n"
+
+        yield f"data: {json.dumps({'progress': 'Merging chunk outputs...'})}\n\n"
+        concat_videos([r['path'] for r in results], output_path, fps, (width, height))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    # A sequential pass only reports a shot still latched on the last frame (the countdown
+    # clears it SHOT_DISPLAY_FRAMES after the hit). The last chunk ends on that frame and its
+    # warm-up replays the countdown, so its final_result is the sequential one; a shot latched
+    # at the end of an earlier chunk has already expired by then.
+    final_res = results[-1]['final_result']
+    if final_res:
+        yield f"data: {json.dumps({'final_result': final_res})}\n\n"
+
+    yield f"data: {json.dumps({'progress': 'Video processing complete.'})}\n\n"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", required=True)
+    parser.add_argument("--output", required=True)
+    parser.add_argument('--mode', type=str, default="mediapipe", help='Analysis mode or manual pitch JSON array')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--overlap', type=int, default=OVERLAP_FRAMES, help='Warm-up frames replayed before each chunk')
+    args = parser.parse_args()
+
+    for output in process_video_chunked(args.input, args.output, args.mode, args.workers, args.overlap):
+        if output.startswith("data: "):
+            data = json.loads(output[6:])
+            if "progress" in data:
+                print(data["progress"], flush=True)
+            elif "final_result" in data:
+                print(f"FINAL_RESULT: {data['final_result']['class_name']}|{data['final_result']['conf']}", flush=True)
+            elif "error" in data:
+                print(f"ERROR: {data['error']}", flush=True)
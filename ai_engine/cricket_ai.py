@@ -6,19 +6,22 @@ d:\\runs_archive\\main.py.
 
 Usage:
     python cricket_ai.py --input <video_path> --output <output_path>
+    python cricket_ai.py --input <video_path> --output <output_path> --rescore
 
 Outputs:
     - Annotated video written to <output_path>
     - One JSON line printed to stdout on completion:
       {"ball_type": "...", "shot_label": "...", "shot_conf": 0.0,
        "ball_points": 42, "frames_processed": 300, "status": "ok"}
+
+Every full run records the batsman poses in the pose cache (pose_cache.py).
+--rescore re-runs only the shot model on the cached poses when the video and
+the vision models are unchanged (no output video is written).
 """
 
 import argparse
 import cv2
 import json
-import joblib
-import mediapipe as mp
 import numpy as np
 import os
 import sys
@@ -30,8 +33,13 @@ warnings.filterwarnings("ignore")
 # ── Suppress TF / MediaPipe spam ──────────────────────────────────────────────
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "3"
 
-from ultralytics import YOLO
-from tensorflow.keras.models import load_model  # noqa: E402
+import model_registry as registry  # noqa: E402
+from lazy_imports import lazy_import, preload  # noqa: E402
+from pose_sequence import PoseSequenceBuffer  # noqa: E402
+from pose_features import PoseFeatureExtractor  # noqa: E402
+from pose_cache import PoseCacheWriter, open_cache, model_version, pose_version, detector_env  # noqa: E402
+
+mp = lazy_import("mediapipe")  # Not needed by --rescore
 
 # ─────────────────────────────────────────────────────────────────────────────
 # MODEL PATHS  (all referenced from d:\runs_archive so nothing needs copying)
@@ -54,6 +62,7 @@ CONF_THRESHOLD    = 0.70
 IGNORE_LABELS     = {"Batsman"}
 MAX_MISSING_FRAMES = 10
 SHOT_DISPLAY_FRAMES = 90
+POSE_OPTIONS      = dict(min_detection_confidence=0.5, min_tracking_confidence=0.5)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -137,30 +146,102 @@ def draw_trail(frame, track):
     return frame
 
 
+def cache_versions():
+    """Everything upstream of the shot classifier that the cached poses depend on."""
+    return {"pipeline": "cricket_ai", "ball": model_version(BALL_MODEL_PATH), "pitch": model_version(PITCH_MODEL_PATH),
+            "pose": pose_version(**POSE_OPTIONS), "detector": detector_env()}
+
+
+def classify_shot(shot_model, pose_buffer, classes):
+    """(label, conf) of an accepted shot on a full buffer, else ("Waiting...", 0.0)."""
+    preds    = registry.predict_shot(shot_model, pose_buffer.window())
+    pred_idx = int(np.argmax(preds[0]))
+    label    = classes[pred_idx]
+    conf     = float(preds[0][pred_idx])
+    if label not in IGNORE_LABELS and conf >= CONF_THRESHOLD:
+        return label, conf
+    return "Waiting...", 0.0
+
+
+def load_shot_models():
+    # lstm_final.onnx (shot_stream.py --export-window) when present: TensorFlow is then never imported
+    try:
+        shot_model, scaler = registry.shot_classifier(SHOT_MODEL_PATH, SCALER_PATH)
+        return shot_model, scaler, registry.labels(LABEL_MAP_PATH)
+    except Exception as e:
+        print(json.dumps({"status": "error", "message": f"Shot model load failed: {e}"}))
+        sys.exit(1)
+
+
+def rescore(cache):
+    """Shot labels replayed from a pose cache entry (same latch rules as run())."""
+    shot_model, scaler, classes = load_shot_models()
+    pose_buffer            = PoseSequenceBuffer(SEQ_LEN, scaler=scaler)
+    latched_shot_label     = None
+    latched_shot_conf      = 0.0
+    shot_display_countdown = 0
+    all_shot_labels        = []
+
+    for _, feat, contact in cache.iter_features():
+        current_shot_label = "Waiting..."
+        current_shot_conf  = 0.0
+        if feat is not None:
+            pose_buffer.append(feat)
+            if pose_buffer.full:
+                current_shot_label, current_shot_conf = classify_shot(shot_model, pose_buffer, classes)
+
+        if contact and current_shot_label != "Waiting...":
+            latched_shot_label     = current_shot_label
+            latched_shot_conf      = current_shot_conf
+            shot_display_countdown = SHOT_DISPLAY_FRAMES
+            all_shot_labels.append(latched_shot_label)
+
+        if shot_display_countdown > 0:
+            shot_display_countdown -= 1
+        else:
+            latched_shot_label = None
+
+    summary = {
+        "status":           "ok",
+        "ball_type":        cache.extras.get("ball_type", "NO DATA"),
+        "shot_label":       latched_shot_label or (all_shot_labels[-1] if all_shot_labels else "None"),
+        "shot_conf":        round(latched_shot_conf, 3),
+        "ball_points":      cache.extras.get("ball_points", 0),
+        "frames_processed": len(cache),
+        "all_shots":        all_shot_labels,
+        "rescored":         True,
+    }
+    print(json.dumps(summary), flush=True)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # MAIN PIPELINE
 # ─────────────────────────────────────────────────────────────────────────────
-def run(input_path: str, output_path: str):
+def run(input_path: str, output_path: str, use_cache: bool = True, rescore_only: bool = False):
+    # ── Re-score from the pose cache (skips YOLO and MediaPipe) ─────────────
+    if not rescore_only:
+        preload("ultralytics", "mediapipe")  # Overlap the framework imports with hashing the video
+    versions = cache_versions() if use_cache or rescore_only else None
+    if rescore_only:
+        cache = open_cache(input_path, versions)
+        if cache is not None:
+            rescore(cache)
+            return
+        print("[pose-cache] no entry for this video yet, running the full analysis", file=sys.stderr, flush=True)
+
     # ── Load models ──────────────────────────────────────────────────────────
     try:
-        ball_model  = YOLO(BALL_MODEL_PATH)
-        pitch_model = YOLO(PITCH_MODEL_PATH)
+        ball_model  = registry.yolo(BALL_MODEL_PATH)
+        pitch_model = registry.yolo(PITCH_MODEL_PATH)
     except Exception as e:
         print(json.dumps({"status": "error", "message": f"YOLO load failed: {e}"}))
         sys.exit(1)
 
-    try:
-        shot_model = load_model(SHOT_MODEL_PATH)
-        scaler     = joblib.load(SCALER_PATH)
-        with open(LABEL_MAP_PATH, "r") as f:
-            classes = json.load(f)["classes"]
-    except Exception as e:
-        print(json.dumps({"status": "error", "message": f"Shot model load failed: {e}"}))
-        sys.exit(1)
+    shot_model, scaler, classes = load_shot_models()
 
     mp_pose    = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
-    pose       = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
+    pose       = registry.new_pose(**POSE_OPTIONS)
 
     # ── Open video ───────────────────────────────────────────────────────────
     cap = cv2.VideoCapture(input_path)
@@ -175,8 +256,16 @@ def run(input_path: str, output_path: str):
     fourcc = cv2.VideoWriter_fourcc(*"mp4v")
     out    = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
+    cache_writer = None
+    if use_cache:
+        try:
+            cache_writer = PoseCacheWriter(input_path, versions, cap.get(cv2.CAP_PROP_FRAME_COUNT), (width, height), fps)
+        except OSError as e:
+            print(f"[pose-cache] not writing a cache entry: {e}", file=sys.stderr, flush=True)
+
     # ── State ────────────────────────────────────────────────────────────────
-    pose_buffer          = []
+    pose_buffer          = PoseSequenceBuffer(SEQ_LEN, scaler=scaler)
+    pose_features        = PoseFeatureExtractor()
     ball_track           = []
     frames_without_ball  = 0
     ball_hit_bat         = False
@@ -188,169 +277,171 @@ def run(input_path: str, output_path: str):
     # Aggregated results
     all_shot_labels = []
 
-    # ── Frame loop ───────────────────────────────────────────────────────────
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        frames_processed += 1
-
-        # 1. YOLO Ball/Bat/Batsman detection
-        results_ball    = ball_model(frame, verbose=False)
-        annotated_frame = results_ball[0].plot()
-
-        # 2. Pose detection (gated on Batsman box)
-        batsman_box = None
-        for box in results_ball[0].boxes:
-            if int(box.cls[0]) == 2:
-                batsman_box = box.xyxy[0].tolist()
+    try:
+        # ── Frame loop ───────────────────────────────────────────────────────
+        while True:
+            ret, frame = cap.read()
+            if not ret:
                 break
-
-        current_shot_label = "Waiting..."
-        current_shot_conf  = 0.0
-
-        if batsman_box:
-            bx1, by1, bx2, by2 = map(int, batsman_box)
-            bx1, by1 = max(0, bx1), max(0, by1)
-            bx2, by2 = min(width, bx2), min(height, by2)
-            crop = frame[by1:by2, bx1:bx2]
-
-            if crop.size > 0:
-                img_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
-                img_rgb.flags.writeable = False
-                res_pose = pose.process(img_rgb)
-                img_rgb.flags.writeable = True
-
-                if res_pose.pose_landmarks:
-                    crop_w, crop_h = bx2 - bx1, by2 - by1
-                    feat = []
-                    for p in res_pose.pose_landmarks.landmark:
-                        gx, gy = p.x * crop_w + bx1, p.y * crop_h + by1
-                        gnx, gny = gx / width, gy / height
-                        feat.extend([gnx, gny, p.z, p.visibility])
-                        p.x, p.y = gnx, gny
-
-                    mp_drawing.draw_landmarks(
-                        annotated_frame,
-                        res_pose.pose_landmarks,
-                        mp_pose.POSE_CONNECTIONS,
-                    )
-
-                    pose_buffer.append(feat)
-                    if len(pose_buffer) > SEQ_LEN:
-                        pose_buffer.pop(0)
-
-                    if len(pose_buffer) == SEQ_LEN:
-                        X        = np.array(pose_buffer, dtype=np.float32)
-                        X_scaled = scaler.transform(X).reshape(1, SEQ_LEN, -1)
-                        preds    = shot_model.predict(X_scaled, verbose=0)
-                        pred_idx = int(np.argmax(preds[0]))
-                        label    = classes[pred_idx]
-                        conf     = float(preds[0][pred_idx])
-
-                        if label not in IGNORE_LABELS and conf >= CONF_THRESHOLD:
-                            current_shot_label = label
-                            current_shot_conf  = conf
-
-        # 3. Pitch detection
-        results_pitch = pitch_model.predict(frame, conf=0.5, verbose=False)
-        pitch_boxes   = []
-        for res in results_pitch:
-            for box in res.boxes:
-                if int(box.cls[0]) == 1:
-                    px1, py1, px2, py2 = box.xyxy[0].tolist()
-                    pitch_boxes.append((px1, py1, px2, py2))
-                    cv2.rectangle(annotated_frame,
-                                  (int(px1), int(py1)), (int(px2), int(py2)),
-                                  (0, 255, 0), 2)
-                    cv2.putText(annotated_frame, "PITCH",
-                                (int(px1), int(py1) - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-
-        # 4. Ball tracking
-        boxes                    = results_ball[0].boxes
-        ball_detected_this_frame = False
-        current_ball_box         = None
-        current_bat_box          = None
-
-        for box in boxes:
-            cls_name = ball_model.names[int(box.cls[0])].lower()
-            if cls_name == "bat":
-                current_bat_box = box.xyxy[0].tolist()
-            elif cls_name == "ball" and not ball_detected_this_frame:
-                x1, y1, x2, y2 = box.xyxy[0].tolist()
-                cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
-                inside = any(px1 <= cx <= px2 and py1 <= cy <= py2
-                             for (px1, py1, px2, py2) in pitch_boxes)
-                if inside:
-                    current_ball_box = (x1, y1, x2, y2)
-                    ball_track.append((cx, cy))
-                    ball_detected_this_frame = True
-                    frames_without_ball = 0
-
-        if not ball_detected_this_frame:
-            frames_without_ball += 1
-            if frames_without_ball > MAX_MISSING_FRAMES:
-                ball_track    = []
-                ball_hit_bat  = False
-
-        # Check ball-bat contact
-        if current_ball_box and current_bat_box:
-            bx1, by1, bx2, by2 = current_ball_box
-            tx1, ty1, tx2, ty2 = current_bat_box
-            ball_cx = (bx1 + bx2) / 2
-            ball_cy = (by1 + by2) / 2
-            MARGIN  = 40
-            if (tx1 - MARGIN) <= ball_cx <= (tx2 + MARGIN) and \
-               (ty1 - MARGIN) <= ball_cy <= (ty2 + MARGIN):
-                ball_hit_bat = True
-                if current_shot_label != "Waiting...":
-                    latched_shot_label      = current_shot_label
-                    latched_shot_conf       = current_shot_conf
-                    shot_display_countdown  = SHOT_DISPLAY_FRAMES
-                    all_shot_labels.append(latched_shot_label)
-
-        # 5. Trail
-        annotated_frame = draw_trail(annotated_frame, ball_track)
-
-        # 6. Ball type
-        ball_type = analyze_ball(ball_track)
-
-        # Countdown
-        if shot_display_countdown > 0:
-            shot_display_countdown -= 1
-        else:
-            latched_shot_label = None
-
-        # 7. Stats overlay
-        cv2.rectangle(annotated_frame, (20, 20), (450, 160), (0, 0, 0), -1)
-        cv2.putText(annotated_frame, f"BALL TYPE: {ball_type}",
-                    (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        cv2.putText(annotated_frame, f"POINTS: {len(ball_track)}",
-                    (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-
-        if not ball_hit_bat:
-            cv2.putText(annotated_frame, "SHOT: Waiting for hit...",
-                        (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (150, 150, 150), 1)
-        elif latched_shot_label:
-            cv2.putText(annotated_frame,
-                        f"SHOT: {latched_shot_label} ({latched_shot_conf * 100:.1f}%)",
-                        (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 100), 2)
-        else:
-            cv2.putText(annotated_frame, "SHOT: Detecting...",
-                        (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (150, 150, 150), 1)
-
-        # 8. Write frame (NO imshow)
-        out.write(annotated_frame)
-
-    # ── Cleanup ──────────────────────────────────────────────────────────────
-    cap.release()
-    out.release()
-    pose.close()
-
-    # ── Summary ──────────────────────────────────────────────────────────────
-    final_ball_type   = analyze_ball(ball_track) if ball_track else "NO DATA"
-    final_shot_label  = latched_shot_label or (all_shot_labels[-1] if all_shot_labels else "None")
+            frames_processed += 1
+
+            # 1. YOLO Ball/Bat/Batsman detection
+            results_ball    = ball_model(frame, verbose=False)
+            annotated_frame = results_ball[0].plot()
+
+            # 2. Pose detection (gated on Batsman box)
+            batsman_box = None
+            for box in results_ball[0].boxes:
+                if int(box.cls[0]) == 2:
+                    batsman_box = box.xyxy[0].tolist()
+                    break
+
+            current_shot_label = "Waiting..."
+            current_shot_conf  = 0.0
+            pose_rect          = None
+            contact            = False
+
+            if batsman_box:
+                bx1, by1, bx2, by2 = map(int, batsman_box)
+                bx1, by1 = max(0, bx1), max(0, by1)
+                bx2, by2 = min(width, bx2), min(height, by2)
+                crop = frame[by1:by2, bx1:bx2]
+
+                if crop.size > 0:
+                    img_rgb = cv2.cvtColor(crop, cv2.COLOR_BGR2RGB)
+                    img_rgb.flags.writeable = False
+                    res_pose = pose.process(img_rgb)
+                    img_rgb.flags.writeable = True
+
+                    if res_pose.pose_landmarks:
+                        pose_rect = (bx1, by1, bx2, by2)
+                        pose_features.read(res_pose.pose_landmarks, pose_rect)
+                        landmarks = pose_features.frame_landmarks((width, height))
+                        feat = landmarks.reshape(-1)
+                        # Frame-normalised landmarks so the skeleton draws on the full frame
+                        for p, (gnx, gny) in zip(res_pose.pose_landmarks.landmark, landmarks[:, :2].tolist()):
+                            p.x, p.y = gnx, gny
+
+                        mp_drawing.draw_landmarks(
+                            annotated_frame,
+                            res_pose.pose_landmarks,
+                            mp_pose.POSE_CONNECTIONS,
+                        )
+
+                        pose_buffer.append(feat)
+
+                        if pose_buffer.full:
+                            current_shot_label, current_shot_conf = classify_shot(shot_model, pose_buffer, classes)
+
+            # 3. Pitch detection
+            results_pitch = pitch_model.predict(frame, conf=0.5, verbose=False)
+            pitch_boxes   = []
+            for res in results_pitch:
+                for box in res.boxes:
+                    if int(box.cls[0]) == 1:
+                        px1, py1, px2, py2 = box.xyxy[0].tolist()
+                        pitch_boxes.append((px1, py1, px2, py2))
+                        cv2.rectangle(annotated_frame,
+                                      (int(px1), int(py1)), (int(px2), int(py2)),
+                                      (0, 255, 0), 2)
+                        cv2.putText(annotated_frame, "PITCH",
+                                    (int(px1), int(py1) - 10),
+                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+
+            # 4. Ball tracking
+            boxes                    = results_ball[0].boxes
+            ball_detected_this_frame = False
+            current_ball_box         = None
+            current_bat_box          = None
+
+            for box in boxes:
+                cls_name = ball_model.names[int(box.cls[0])].lower()
+                if cls_name == "bat":
+                    current_bat_box = box.xyxy[0].tolist()
+                elif cls_name == "ball" and not ball_detected_this_frame:
+                    x1, y1, x2, y2 = box.xyxy[0].tolist()
+                    cx, cy = int((x1 + x2) / 2), int((y1 + y2) / 2)
+                    inside = any(px1 <= cx <= px2 and py1 <= cy <= py2
+                                 for (px1, py1, px2, py2) in pitch_boxes)
+                    if inside:
+                        current_ball_box = (x1, y1, x2, y2)
+                        ball_track.append((cx, cy))
+                        ball_detected_this_frame = True
+                        frames_without_ball = 0
+
+            if not ball_detected_this_frame:
+                frames_without_ball += 1
+                if frames_without_ball > MAX_MISSING_FRAMES:
+                    ball_track    = []
+                    ball_hit_bat  = False
+
+            # Check ball-bat contact
+            if current_ball_box and current_bat_box:
+                bx1, by1, bx2, by2 = current_ball_box
+                tx1, ty1, tx2, ty2 = current_bat_box
+                ball_cx = (bx1 + bx2) / 2
+                ball_cy = (by1 + by2) / 2
+                MARGIN  = 40
+                if (tx1 - MARGIN) <= ball_cx <= (tx2 + MARGIN) and \
+                   (ty1 - MARGIN) <= ball_cy <= (ty2 + MARGIN):
+                    ball_hit_bat = True
+                    contact      = True
+                    if current_shot_label != "Waiting...":
+                        latched_shot_label      = current_shot_label
+                        latched_shot_conf       = current_shot_conf
+                        shot_display_countdown  = SHOT_DISPLAY_FRAMES
+                        all_shot_labels.append(latched_shot_label)
+
+            if cache_writer:
+                cache_writer.append(pose_rect, pose_features.landmarks if pose_rect else None, contact)
+
+            # 5. Trail
+            annotated_frame = draw_trail(annotated_frame, ball_track)
+
+            # 6. Ball type
+            ball_type = analyze_ball(ball_track)
+
+            # Countdown
+            if shot_display_countdown > 0:
+                shot_display_countdown -= 1
+            else:
+                latched_shot_label = None
+
+            # 7. Stats overlay
+            cv2.rectangle(annotated_frame, (20, 20), (450, 160), (0, 0, 0), -1)
+            cv2.putText(annotated_frame, f"BALL TYPE: {ball_type}",
+                        (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(annotated_frame, f"POINTS: {len(ball_track)}",
+                        (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+
+            if not ball_hit_bat:
+                cv2.putText(annotated_frame, "SHOT: Waiting for hit...",
+                            (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (150, 150, 150), 1)
+            elif latched_shot_label:
+                cv2.putText(annotated_frame,
+                            f"SHOT: {latched_shot_label} ({latched_shot_conf * 100:.1f}%)",
+                            (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 100), 2)
+            else:
+                cv2.putText(annotated_frame, "SHOT: Detecting...",
+                            (30, 120), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (150, 150, 150), 1)
+
+            # 8. Write frame (NO imshow)
+            out.write(annotated_frame)
+
+        # ── Summary ──────────────────────────────────────────────────────────
+        final_ball_type   = analyze_ball(ball_track) if ball_track else "NO DATA"
+        final_shot_label  = latched_shot_label or (all_shot_labels[-1] if all_shot_labels else "None")
+
+        if cache_writer:
+            # Ball results do not depend on the shot model: --rescore reports them from here
+            cache_writer.commit({"ball_type": final_ball_type, "ball_points": len(ball_track)})
+    finally:
+        # ── Cleanup ──────────────────────────────────────────────────────────
+        cap.release()
+        out.release()
+        pose.close()
+        if cache_writer:
+            cache_writer.close()
 
     summary = {
         "status":           "ok",
@@ -369,5 +460,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Cricket AI full pipeline (headless)")
     parser.add_argument("--input",  required=True, help="Input video path")
     parser.add_argument("--output", required=True, help="Output video path")
+    parser.add_argument("--no-pose-cache", action="store_true", help="Do not record poses for later re-scoring")
+    parser.add_argument("--rescore", action="store_true", help="Re-run only the shot model from the pose cache when one exists")
     args = parser.parse_args()
-    run(args.input, args.output)
+    run(args.input, args.output, use_cache=not args.no_pose_cache, rescore_only=args.rescore)
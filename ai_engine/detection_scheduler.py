@@ -0,0 +1,229 @@
+"""
+detection_scheduler.py
+======================
+Cross-camera batching of the ball model for the live servers.
+
+With several camera sessions in one process (live_session.py) every
+pipeline calls the ball model on its own frame, one batch-of-one forward
+pass per camera per frame, taking turns on the shared model. The
+DetectionScheduler collects the latest frame of each active stream and runs
+them through predict_in_rois() as one batched call per tick, then hands each
+stream its own Results (full-frame coordinates, as predict_in_roi returns).
+
+A tick runs as soon as
+  * every active stream (one that submitted within the last ACTIVE_WINDOW
+    seconds) has a frame waiting, or
+  * the earliest deadline among the waiting frames is reached: a frame waits
+    at most deadline_ms (CRICKET_DETECT_WAIT_MS, default 8 ms) for the
+    other cameras, per stream via set_deadline(), or
+  * max_batch frames are waiting.
+
+With a single camera the first condition holds immediately and the call
+costs one thread hand-off. CRICKET_DETECT_BATCHING=0 turns the scheduler
+into a direct predict_in_roi() call for comparison.
+
+Usage:
+    scheduler = DetectionScheduler(ball_model, verbose=False, conf=0.15)
+    results = scheduler.detect(session_id, frame, roi_rect)   # blocks for this stream's result
+    print(scheduler.stats())
+
+    python detection_scheduler.py --bench --streams 4        # per-stream calls vs. batched ticks
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from roi_inference import predict_in_roi, predict_in_rois
+
+BATCHING_ENV = "CRICKET_DETECT_BATCHING"
+WAIT_ENV = "CRICKET_DETECT_WAIT_MS"
+DEFAULT_WAIT_MS = 8.0
+MAX_BATCH = 8
+ACTIVE_WINDOW = 1.0  # Seconds without a frame after which a stream is no longer waited for
+
+
+class _Request:
+    __slots__ = ("frame", "rect", "submitted", "deadline", "future")
+
+    def __init__(self, frame, rect, submitted, deadline):
+        self.frame = frame
+        self.rect = rect
+        self.submitted = submitted
+        self.deadline = deadline
+        self.future = Future()
+
+
+class DetectionScheduler:
+    """One batched ball-model pass per tick over the latest frame of every active stream."""
+
+    def __init__(self, model, deadline_ms=None, max_batch=MAX_BATCH, enabled=None, **predict_kwargs):
+        self.model = model
+        self.predict_kwargs = predict_kwargs
+        if deadline_ms is None:
+            deadline_ms = float(os.environ.get(WAIT_ENV, DEFAULT_WAIT_MS))
+        self.deadline = deadline_ms / 1000.0
+        self.max_batch = max_batch
+        if enabled is None:
+            enabled = os.environ.get(BATCHING_ENV, "1").lower() not in ("0", "false", "no")
+        self.enabled = enabled
+        self._cond = threading.Condition()
+        self._pending = {}    # stream id -> _Request (latest frame wins)
+        self._last_seen = {}  # stream id -> time of its last submit
+        self._deadlines = {}  # stream id -> per-stream deadline (s)
+        self._thread = None
+        self.frames = 0
+        self.ticks = 0
+        self.superseded = 0
+        self.deadline_ticks = 0
+        self.queue_s = 0.0
+
+    def set_deadline(self, stream_id, deadline_ms):
+        """Longest time this stream's frames wait for other cameras (None = scheduler default)."""
+        with self._cond:
+            if deadline_ms is None:
+                self._deadlines.pop(stream_id, None)
+            else:
+                self._deadlines[stream_id] = deadline_ms / 1000.0
+
+    def forget(self, stream_id):
+        """Stop waiting for a stream (its camera went away)."""
+        with self._cond:
+            self._last_seen.pop(stream_id, None)
+            self._deadlines.pop(stream_id, None)
+            self._cond.notify()
+
+    def submit(self, stream_id, frame, rect=None):
+        """Queue a frame; the Future resolves to its Results. A newer frame from the same stream
+        replaces one still waiting, whose Future then resolves to None."""
+        now = time.perf_counter()
+        with self._cond:
+            request = _Request(frame, rect, now, now + self._deadlines.get(stream_id, self.deadline))
+            old = self._pending.get(stream_id)
+            self._pending[stream_id] = request
+            self._last_seen[stream_id] = now
+            if old is not None:
+                self.superseded += 1
+            self._cond.notify()
+        if old is not None:
+            old.future.set_result(None)
+        self._ensure_thread()
+        return request.future
+
+    def detect(self, stream_id, frame, rect=None):
+        """Results for frame (cropped to rect when given), batched with the other streams."""
+        if not self.enabled:
+            return predict_in_roi(self.model, frame, rect, **self.predict_kwargs)
+        return self.submit(stream_id, frame, rect).result()
+
+    def _ensure_thread(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="detection-scheduler", daemon=True)
+                self._thread.start()
+
+    def _ready(self, now):
+        if not self._pending:
+            return False
+        if len(self._pending) >= self.max_batch:
+            return True
+        active = [sid for sid, t in self._last_seen.items() if now - t <= ACTIVE_WINDOW]
+        return all(sid in self._pending for sid in active)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.perf_counter()
+                    if self._ready(now):
+                        break
+                    if self._pending:
+                        earliest = min(r.deadline for r in self._pending.values())
+                        if now >= earliest:
+                            self.deadline_ticks += 1
+                            break
+                        self._cond.wait(earliest - now)
+                    else:
+                        self._cond.wait()
+                # Most urgent first when more streams wait than fit in one batch
+                taken = sorted(self._pending, key=lambda sid: self._pending[sid].deadline)[:self.max_batch]
+                batch = [self._pending.pop(sid) for sid in taken]
+            self._run(batch)
+
+    def _run(self, batch):
+        start = time.perf_counter()
+        try:
+            results = predict_in_rois(self.model, [r.frame for r in batch], [r.rect for r in batch], **self.predict_kwargs)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        for request, result in zip(batch, results):
+            self.queue_s += start - request.submitted
+            request.future.set_result(result)
+        self.frames += len(batch)
+        self.ticks += 1
+
+    def stats(self):
+        with self._cond:
+            now = time.perf_counter()
+            active = sum(1 for t in self._last_seen.values() if now - t <= ACTIVE_WINDOW)
+        return {'enabled': self.enabled, 'active_streams': active, 'frames': self.frames, 'ticks': self.ticks,
+                'mean_batch': round(self.frames / self.ticks, 2) if self.ticks else 0.0,
+                'deadline_ticks': self.deadline_ticks, 'superseded': self.superseded,
+                'avg_queue_ms': round(self.queue_s * 1000 / self.frames, 2) if self.frames else 0.0}
+
+
+def bench(model_path, streams=4, frames=60, width=1000, height=562):
+    """Aggregate FPS of `streams` camera threads: each calling the model vs. one scheduler."""
+    import numpy as np
+    import model_registry as registry
+
+    model = registry.yolo(model_path, warmup=True)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (height, width, 3), dtype=np.uint8) for _ in range(streams)]
+    rect = (width // 4, 0, 3 * width // 4, height)  # A pitch-sized crop, as in the live servers
+    lock = threading.Lock()
+
+    def direct(i):
+        with lock:  # The live servers serialise per-stream calls on a shared model
+            predict_in_roi(model, images[i], rect, verbose=False, conf=0.15)
+
+    scheduler = DetectionScheduler(model, enabled=True, verbose=False, conf=0.15)
+
+    def batched(i):
+        scheduler.detect(i, images[i], rect)
+
+    def drive(call):
+        def camera(i):
+            for _ in range(frames):
+                call(i)
+        pool = [threading.Thread(target=camera, args=(i,)) for i in range(streams)]
+        t0 = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return streams * frames / (time.perf_counter() - t0)
+
+    drive(direct)  # Warm-up
+    per_stream = drive(direct)
+    aggregate = drive(batched)
+    print(f"{streams} streams x {frames} frames, {width}x{height}, pitch crop")
+    print(f"  per-stream calls {per_stream:7.1f} frames/s total")
+    print(f"  batched ticks    {aggregate:7.1f} frames/s total  {scheduler.stats()}")
+
+
+if __name__ == "__main__":
+    from model_registry import YOLO_BALL_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", action="store_true", help="Compare per-stream and batched ball-model throughput")
+    parser.add_argument("--model", default=YOLO_BALL_PATH)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=60)
+    args = parser.parse_args()
+    if args.bench:
+        bench(args.model, args.streams, args.frames)
@@ -0,0 +1,141 @@
+"""
+frame_broadcaster.py
+====================
+One inference loop per camera, any number of /video_feed viewers.
+
+/video_feed used to run generate_frames() inside each HTTP response, so every
+open dashboard ran its own YOLO + MediaPipe + LSTM loop and they all pulled
+from the same frame_queue: a second screen halved the frame rate for both.
+
+BroadcastWorker runs the server's generate_frames() on a single background
+thread and publishes every encoded JPEG it yields to a FrameBroadcaster.
+Viewers subscribe to the broadcaster and always get the newest frame: a slow
+client skips the frames it could not keep up with instead of holding back the
+pipeline or the other viewers. With no viewer connected the worker pauses
+after the current frame, as the per-request loop did.
+
+Usage:
+    broadcaster = FrameBroadcaster()
+    worker = BroadcastWorker(generate_frames, broadcaster, name="live")   # generate_frames yields JPEG bytes
+
+    @app.route('/video_feed')
+    def video_feed():
+        worker.ensure_running()
+        return Response(broadcaster.stream(), mimetype='multipart/x-mixed-replace; boundary=frame')
+"""
+
+import threading
+import traceback
+
+VIEWER_TIMEOUT = 1.0  # Seconds a viewer waits for a frame before checking again
+RESTART_DELAY = 1.0   # Pause before restarting a pipeline that raised
+
+
+def multipart_part(jpeg):
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n'
+
+
+class FrameBroadcaster:
+    """Latest-frame-wins fan-out of encoded frames from one producer to many viewers."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._seq = 0
+        self.closed = False
+        self.viewers = 0
+        self.published = 0
+        self.delivered = 0
+
+    def publish(self, jpeg):
+        with self._cond:
+            self._frame = jpeg
+            self._seq += 1
+            self.published += 1
+            self._cond.notify_all()
+
+    def frames(self, timeout=VIEWER_TIMEOUT):
+        """Generator of the newest frame each time a new one is published."""
+        with self._cond:
+            self.viewers += 1
+            self._cond.notify_all()  # Wakes a worker paused for lack of viewers
+        seen = 0
+        try:
+            while not self.closed:
+                with self._cond:
+                    if not self._cond.wait_for(lambda: self._seq != seen or self.closed, timeout) or self.closed:
+                        continue
+                    seen, frame = self._seq, self._frame
+                    self.delivered += 1
+                yield frame
+        finally:
+            with self._cond:
+                self.viewers -= 1
+
+    def stream(self):
+        """multipart/x-mixed-replace body for one viewer."""
+        for jpeg in self.frames():
+            yield multipart_part(jpeg)
+
+    def wait_for_viewers(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: self.viewers > 0, timeout)
+
+    def close(self):
+        """Ends every viewer's stream (the source is gone)."""
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'viewers': self.viewers, 'published': self.published, 'delivered': self.delivered}
+
+
+class BroadcastWorker:
+    """Drives frame_source() on one thread and publishes what it yields while anyone is watching."""
+
+    def __init__(self, frame_source, broadcaster, name="pipeline"):
+        self.frame_source = frame_source
+        self.broadcaster = broadcaster
+        self.name = name
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_running(self):
+        with self._lock:
+            if self._stop.is_set():
+                return
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout=2.0):
+        """Stops the pipeline after its current frame; ensure_running() does nothing afterwards.
+
+        Returns False if the pipeline is still running after timeout.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _run(self):
+        while not self._stop.is_set():
+            frames = self.frame_source()
+            try:
+                for jpeg in frames:
+                    self.broadcaster.publish(jpeg)
+                    while not self.broadcaster.wait_for_viewers(VIEWER_TIMEOUT):
+                        if self._stop.is_set():
+                            return
+                    if self._stop.is_set():
+                        return
+            except Exception as e:
+                print(f"[{self.name}] pipeline error, restarting: {e}", flush=True)
+                traceback.print_exc()
+            finally:
+                frames.close()
+            self._stop.wait(RESTART_DELAY)
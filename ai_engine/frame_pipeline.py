@@ -0,0 +1,112 @@
+"""
+frame_pipeline.py
+=================
+Bounded-queue stage pipeline for offline video analysis.
+
+Every stage runs on its own worker thread and hands its output to the next
+stage through a bounded queue, so decoding and encoding overlap with model
+inference instead of waiting for it. Items leave the last stage in the order
+the source produced them, which keeps the stateful tracking stages correct.
+
+Usage:
+    pipeline = StagePipeline(read_frames(cap), [detect, analyse, encode])
+    for item in pipeline:
+        ...
+"""
+
+import queue
+import threading
+
+QUEUE_SIZE = 4  # Items buffered between two stages
+
+_END = object()
+
+
+class _StageError:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+class StagePipeline:
+    def __init__(self, source, stages, maxsize=QUEUE_SIZE, threaded=True):
+        self.source = source
+        self.stages = list(stages)
+        self.maxsize = maxsize
+        self.threaded = threaded
+        self._stop = threading.Event()
+        self._threads = []
+
+    def _put(self, q, item):
+        # Block while the next stage is busy, but give up once the pipeline is closed
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _feed(self, outbox):
+        try:
+            for item in self.source:
+                if not self._put(outbox, item):
+                    return
+        except Exception as e:
+            self._put(outbox, _StageError(e))
+            return
+        self._put(outbox, _END)
+
+    def _work(self, fn, inbox, outbox):
+        while True:
+            item = self._get(inbox)
+            if item is _END or isinstance(item, _StageError):
+                self._put(outbox, item)
+                return
+            try:
+                result = fn(item)
+            except Exception as e:
+                self._put(outbox, _StageError(e))
+                return
+            if not self._put(outbox, result):
+                return
+
+    def __iter__(self):
+        if not self.threaded:
+            # Serial fallback: same stages, one thread (handy for debugging)
+            for item in self.source:
+                for fn in self.stages:
+                    item = fn(item)
+                yield item
+            return
+
+        queues = [queue.Queue(maxsize=self.maxsize) for _ in range(len(self.stages) + 1)]
+        self._threads = [threading.Thread(target=self._feed, args=(queues[0],), daemon=True)]
+        for i, fn in enumerate(self.stages):
+            self._threads.append(threading.Thread(target=self._work, args=(fn, queues[i], queues[i + 1]), daemon=True))
+        for t in self._threads:
+            t.start()
+
+        try:
+            while True:
+                item = self._get(queues[-1])
+                if item is _END:
+                    break
+                if isinstance(item, _StageError):
+                    raise item.exc
+                yield item
+        finally:
+            self.close()
+
+    def close(self):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout=1.0)
+        self._threads = []
@@ -0,0 +1,129 @@
+"""
+fuse_scaler.py
+==============
+Folds the StandardScaler (scaler_v2.save) into the shot-classifier ONNX graph.
+
+Every shot prediction used to run the scikit-learn scaler through joblib
+before session.run(), which costs Python overhead per call and imports sklearn
+in every process. This tool prepends (x - mean) / scale as Sub + Div nodes on
+the model input and writes <stem>_fused.onnx. The runtime then feeds raw
+landmark features straight in: inference_backend.shot_model_path() prefers
+the fused model and model_registry.shot_scaler() returns None for it, so
+joblib/sklearn are never loaded.
+
+The parity check feeds the same raw features through scaler + original model
+and through the fused model, and fails when the outputs differ.
+
+Step models (shot_stream.py) can be fused the same way; only the first
+(feature) input is rewritten, state inputs are left alone.
+
+Usage:
+    python fuse_scaler.py                                  # lstm_shot_v2 + scaler_v2
+    python fuse_scaler.py --model models/lstm_shot_v2_step.onnx
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from inference_backend import fused_path
+from model_registry import SHOT_MODEL_PATH, SCALER_PATH
+from pose_sequence import SEQ_LEN
+
+PARITY_TOLERANCE = 1e-5
+PARITY_BATCH = 64
+
+
+def scaler_params(scaler):
+    """(mean, scale) as float32 (F,) arrays; with_mean/with_std=False leave them None."""
+    mean = scaler.mean_ if scaler.mean_ is not None else 0.0
+    scale = scaler.scale_ if scaler.scale_ is not None else 1.0
+    n_features = scaler.n_features_in_
+    return (np.broadcast_to(np.asarray(mean, dtype=np.float32), (n_features,)).copy(),
+            np.broadcast_to(np.asarray(scale, dtype=np.float32), (n_features,)).copy())
+
+
+def fuse(onnx_path, scaler, out_path):
+    import onnx
+    from onnx import helper, numpy_helper
+
+    model = onnx.load(onnx_path)
+    graph = model.graph
+    initializers = {init.name for init in graph.initializer}
+    feature_input = [i for i in graph.input if i.name not in initializers][0]
+    scaled_name = feature_input.name
+    raw_name = scaled_name + "_raw"
+
+    # 1. Raw input with the same type / shape takes the old input's place
+    raw_input = onnx.ValueInfoProto()
+    raw_input.CopyFrom(feature_input)
+    raw_input.name = raw_name
+    inputs = [raw_input if i.name == scaled_name else i for i in graph.input]
+    del graph.input[:]
+    graph.input.extend(inputs)
+
+    # 2. Scaler constants; (F,) broadcasts over (batch, time, F)
+    mean, scale = scaler_params(scaler)
+    graph.initializer.extend([numpy_helper.from_array(mean, "scaler_mean"),
+                              numpy_helper.from_array(scale, "scaler_scale")])
+
+    # 3. Sub + Div write the tensor the original graph already consumes
+    nodes = [helper.make_node("Sub", [raw_name, "scaler_mean"], ["scaler_centered"], name="scaler_sub"),
+             helper.make_node("Div", ["scaler_centered", "scaler_scale"], [scaled_name], name="scaler_div")]
+    original = list(graph.node)
+    del graph.node[:]
+    graph.node.extend(nodes + original)
+
+    onnx.checker.check_model(model)
+    onnx.save(model, out_path)
+    print(f"Fused {os.path.basename(SCALER_PATH)} into {os.path.basename(onnx_path)} -> {out_path}")
+
+
+def _feeds(session, x):
+    """Feature input x plus zero states for step models."""
+    inputs = session.get_inputs()
+    feeds = {inputs[0].name: x}
+    for inp in inputs[1:]:
+        feeds[inp.name] = np.zeros((x.shape[0], inp.shape[-1]), dtype=np.float32)
+    return feeds
+
+
+def verify(onnx_path, fused, scaler, seed=0):
+    import onnxruntime as ort
+
+    ref = ort.InferenceSession(onnx_path)
+    var = ort.InferenceSession(fused)
+    shape = ref.get_inputs()[0].shape
+    steps = shape[1] if isinstance(shape[1], int) and shape[1] > 0 else SEQ_LEN
+    n_features = shape[2]
+
+    # Raw features distributed like the training data the scaler was fitted on
+    mean, scale = scaler_params(scaler)
+    rng = np.random.default_rng(seed)
+    raw = (rng.standard_normal((PARITY_BATCH, steps, n_features)) * scale + mean).astype(np.float32)
+    scaled = scaler.transform(raw.reshape(-1, n_features)).reshape(raw.shape).astype(np.float32)
+
+    ref_out = ref.run(None, _feeds(ref, scaled))[0]
+    var_out = var.run(None, _feeds(var, raw))[0]
+    max_diff = float(np.abs(ref_out - var_out).max())
+    agree = float(np.mean(np.argmax(ref_out, -1) == np.argmax(var_out, -1)))
+    ok = max_diff <= PARITY_TOLERANCE and agree == 1.0
+    print(f"parity max |diff| = {max_diff:.2e}, argmax agreement {agree:.1%} -> {'PASS' if ok else 'FAIL'}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default=SHOT_MODEL_PATH, help="Shot classifier ONNX (window or step model)")
+    parser.add_argument("--scaler", default=SCALER_PATH, help="joblib StandardScaler")
+    parser.add_argument("--out", help="Output path (default <model>_fused.onnx)")
+    args = parser.parse_args()
+
+    import joblib
+    scaler = joblib.load(args.scaler)
+    out_path = args.out or fused_path(args.model)
+    fuse(args.model, scaler, out_path)
+    if not verify(args.model, out_path, scaler):
+        os.remove(out_path)  # Never leave a fused model the runtime would pick up
+        raise SystemExit(1)
@@ -5,8 +5,7 @@ import traceback
 import cv2
 import numpy as np
 import warnings
-import mediapipe as mp
-from ultralytics import YOLO
+import model_registry as registry
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -28,7 +27,7 @@ pose_detector = None
 
 try:
     if os.path.exists(YOLO_PATH):
-        yolo_model = YOLO(YOLO_PATH)
+        yolo_model = registry.yolo(YOLO_PATH, warmup=True)
 except Exception as e:
     pass
 
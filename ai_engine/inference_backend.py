@@ -0,0 +1,306 @@
+"""
+inference_backend.py
+====================
+Backend registry for the YOLO detectors (ball, pitch, stumps).
+
+Every entry point keeps referring to the .pt weights; load_yolo() decides which
+runtime actually serves them:
+
+  * pytorch   - the .pt file itself
+  * onnx      - <stem>.onnx next to the .pt (ONNX Runtime)
+  * openvino  - <stem>_openvino_model/ next to the .pt (needs the .xml and .bin)
+
+The backend comes from the CRICKET_INFERENCE_BACKEND environment variable
+(pytorch | onnx | openvino | auto, default auto). In auto mode every available
+export is timed on a dummy frame the first time a model is loaded and the
+fastest one is kept for the rest of the process. Missing or incomplete exports
+fall back to PyTorch.
+
+The shot classifier is loaded as <stem>_fused.onnx when fuse_scaler.py has
+folded the StandardScaler into it (see scaler_fused()).
+
+CRICKET_MODEL_PRECISION (fp32 | fp16 | int8, default fp32) selects the
+quantized OpenVINO variants (<stem>_int8_openvino_model/ ...) and the INT8
+shot model (<stem>_int8.onnx) built by quantize_models.py. A variant is only
+used when models/quantization_report.json approves that precision for the
+exact files being loaded: the entry is keyed by the model path and records
+the content hashes of the weights and of the variant that passed the
+accuracy gate. A retrained model, a re-export or a model that was never
+evaluated loads as FP32.
+
+Static-shape exports (fixed batch / input size) are wrapped so batched calls
+are split per frame and imgsz overrides are dropped; callers do not need to
+know which backend they got.
+
+Usage:
+    ball_model = load_yolo(YOLO_BALL_PATH)
+    python inference_backend.py --export onnx openvino   # create the exports
+    python inference_backend.py --bench                   # compare backends
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import time
+
+import numpy as np
+
+from lazy_imports import lazy_import
+
+YOLO = lazy_import("ultralytics", "YOLO")  # torch is only imported once a detector is loaded
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+BACKEND_ENV = "CRICKET_INFERENCE_BACKEND"
+DEFAULT_BACKEND = "auto"
+
+PRECISIONS = ("fp32", "fp16", "int8")
+PRECISION_ENV = "CRICKET_MODEL_PRECISION"
+DEFAULT_PRECISION = "fp32"
+
+BENCH_RUNS = 5
+BENCH_SHAPE = (562, 1000, 3)  # Live servers resize frames to 1000 px wide
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MODELS = [
+    os.path.join(BASE_DIR, "models", "yolo_ball_best.pt"),
+    os.path.join(BASE_DIR, "models", "yolo_pitch_best.pt"),
+    os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system", "runs", "detect", "train", "weights", "best.pt"),
+]
+
+QUANT_REPORT_PATH = os.path.join(BASE_DIR, "models", "quantization_report.json")
+REPO_DIR = os.path.dirname(BASE_DIR)
+
+_auto_choice = {}  # pt path -> backend picked by the benchmark
+
+
+def export_path(pt_path, backend, precision=DEFAULT_PRECISION):
+    stem = os.path.splitext(pt_path)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        suffix = "" if precision == "fp32" else f"_{precision}"
+        return stem + suffix + "_openvino_model"
+    return pt_path
+
+
+def get_precision(precision=None):
+    precision = (precision or os.environ.get(PRECISION_ENV, DEFAULT_PRECISION)).lower()
+    return precision if precision in PRECISIONS else DEFAULT_PRECISION
+
+
+def int8_shot_path(onnx_path):
+    return os.path.splitext(onnx_path)[0] + "_int8.onnx"
+
+
+def variant_files(path, precision):
+    """Files a quantized variant of path consists of: the INT8 shot model or the OpenVINO export."""
+    if path.endswith(".onnx"):
+        return [int8_shot_path(path)]
+    export = export_path(path, "openvino", precision)
+    return sorted(glob.glob(os.path.join(export, "*.xml")) + glob.glob(os.path.join(export, "*.bin")))
+
+
+def approval_key(path):
+    """Report key of a model: its path relative to the repository."""
+    return os.path.relpath(os.path.realpath(path), REPO_DIR).replace(os.sep, "/")
+
+
+def model_fingerprint(path, precision):
+    """Content hashes of the weights and of their variant for precision."""
+    from pose_cache import model_version
+    return [model_version(p) for p in [path] + variant_files(path, precision)]
+
+
+def is_approved(precision, path):
+    """True when quantize_models.py recorded a passing accuracy gate for this precision of exactly these files."""
+    if precision == "fp32":
+        return True
+    try:
+        with open(QUANT_REPORT_PATH) as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return False
+    variant = report.get("variants", {}).get(precision, {})
+    if not variant.get("approved"):
+        return False
+    return variant.get("models", {}).get(approval_key(path)) == model_fingerprint(path, precision)
+
+
+def is_available(pt_path, backend, precision=DEFAULT_PRECISION):
+    path = export_path(pt_path, backend, precision)
+    if backend == "openvino":
+        # An export dir without its .bin weights (e.g. an LFS checkout) is unusable
+        return bool(glob.glob(os.path.join(path, "*.xml"))) and bool(glob.glob(os.path.join(path, "*.bin")))
+    return os.path.exists(path)
+
+
+def available_backends(pt_path):
+    return [b for b in BACKENDS if is_available(pt_path, b)]
+
+
+def _export_args(path, backend):
+    """Export-time args (batch, dynamic, imgsz) recorded by ultralytics, {} if unknown."""
+    try:
+        if backend == "openvino":
+            import yaml
+            with open(os.path.join(path, "metadata.yaml")) as f:
+                meta = yaml.safe_load(f) or {}
+        else:
+            import onnxruntime as ort
+            meta = dict(ort.InferenceSession(path, providers=["CPUExecutionProvider"]).get_modelmeta().custom_metadata_map)
+            for key in ("args", "imgsz", "batch"):
+                if isinstance(meta.get(key), str):
+                    meta[key] = ast.literal_eval(meta[key])
+    except Exception:
+        return {}
+    args = dict(meta.get("args") or {})
+    args.setdefault("batch", meta.get("batch", 1))
+    args["imgsz"] = meta.get("imgsz")
+    return args
+
+
+class BackendModel:
+    """Wraps an exported YOLO so static input shapes behave like the .pt model."""
+
+    def __init__(self, model, backend, batch=1, dynamic=False):
+        self.model = model
+        self.backend = backend
+        self.batch = batch or 1
+        self.dynamic = dynamic
+
+    def __call__(self, source, **kwargs):
+        if self.dynamic:
+            return self.model(source, **kwargs)
+        kwargs.pop("imgsz", None)  # Fixed at export time
+        if isinstance(source, list) and len(source) > self.batch:
+            results = []
+            for i in range(0, len(source), self.batch):
+                results.extend(self.model(source[i:i + self.batch], **kwargs))
+            return results
+        return self.model(source, **kwargs)
+
+    def predict(self, source, **kwargs):
+        return self(source, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def load_export(pt_path, backend, task="detect", precision=DEFAULT_PRECISION):
+    """Load one specific export (no resolution, no approval check)."""
+    if backend == "pytorch":
+        return YOLO(pt_path, task=task)
+    path = export_path(pt_path, backend, precision)
+    args = _export_args(path, backend)
+    return BackendModel(YOLO(path, task=task), backend, batch=args.get("batch", 1), dynamic=bool(args.get("dynamic")))
+
+
+def benchmark(pt_path, backends=None, runs=BENCH_RUNS, task="detect"):
+    """Median latency (ms) per backend on a dummy frame."""
+    frame = np.random.default_rng(0).integers(0, 255, BENCH_SHAPE, dtype=np.uint8)
+    timings = {}
+    for backend in backends or available_backends(pt_path):
+        try:
+            model = load_export(pt_path, backend, task)
+            model(frame, verbose=False)  # Warm-up (graph compile, allocations)
+            samples = []
+            for _ in range(runs):
+                t0 = time.perf_counter()
+                model(frame, verbose=False)
+                samples.append((time.perf_counter() - t0) * 1000)
+            timings[backend] = float(np.median(samples))
+        except Exception as e:
+            print(f"[backend] {backend} failed for {os.path.basename(pt_path)}: {e}")
+    return timings
+
+
+def resolve_backend(pt_path, backend=None, task="detect"):
+    backend = (backend or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)).lower()
+    if backend in BACKENDS:
+        if is_available(pt_path, backend):
+            return backend
+        print(f"[backend] {backend} export not found for {os.path.basename(pt_path)}, using pytorch")
+        return "pytorch"
+
+    # auto
+    candidates = available_backends(pt_path)
+    if len(candidates) <= 1:
+        return candidates[0] if candidates else "pytorch"
+    if pt_path not in _auto_choice:
+        timings = benchmark(pt_path, candidates, task=task)
+        _auto_choice[pt_path] = min(timings, key=timings.get) if timings else "pytorch"
+        print(f"[backend] {os.path.basename(pt_path)}: {timings} -> {_auto_choice[pt_path]}")
+    return _auto_choice[pt_path]
+
+
+def load_yolo(pt_path, backend=None, task="detect", precision=None):
+    """Load a YOLO detector on the configured (or fastest) backend."""
+    precision = get_precision(precision)
+    requested = (backend or os.environ.get(BACKEND_ENV, DEFAULT_BACKEND)).lower()
+    if precision != "fp32":
+        # Quantized variants only exist as OpenVINO exports and must have passed the gate
+        if requested not in ("auto", "openvino"):
+            print(f"[backend] {precision} variants need the openvino backend, using fp32 {requested}")
+        elif not is_available(pt_path, "openvino", precision):
+            print(f"[backend] {precision} export not found for {os.path.basename(pt_path)}, using fp32")
+        elif not is_approved(precision, pt_path):
+            print(f"[backend] {precision} {os.path.basename(pt_path)} not approved for these weights "
+                  f"in {os.path.basename(QUANT_REPORT_PATH)}, using fp32")
+        else:
+            return load_export(pt_path, "openvino", task, precision)
+    return load_export(pt_path, resolve_backend(pt_path, backend, task), task)
+
+
+def fused_path(onnx_path):
+    return os.path.splitext(onnx_path)[0] + "_fused.onnx"
+
+
+def shot_model_path(onnx_path, precision=None):
+    """Path of the shot-classifier variant to load for the configured precision."""
+    # ONNX Runtime gains nothing from FP16 on CPU, only int8 has its own variant
+    if get_precision(precision) == "int8":
+        variant = int8_shot_path(onnx_path)
+        if os.path.exists(variant) and is_approved("int8", onnx_path):
+            return variant
+        print(f"[backend] int8 shot model not available or not approved, using {os.path.basename(onnx_path)}")
+    fused = fused_path(onnx_path)
+    return fused if os.path.exists(fused) else onnx_path
+
+
+def scaler_fused(onnx_path, precision=None):
+    """True when the model that will be loaded for onnx_path takes raw (unscaled) features."""
+    return shot_model_path(onnx_path, precision) == fused_path(onnx_path)
+
+
+def load_shot_model(onnx_path, precision=None):
+    import onnxruntime as ort
+    return ort.InferenceSession(shot_model_path(onnx_path, precision))
+
+
+def export_models(pt_paths, backends):
+    for pt_path in pt_paths:
+        model = YOLO(pt_path, task="detect")
+        for backend in backends:
+            if backend == "pytorch":
+                continue
+            # Dynamic shapes keep batched and cropped (smaller imgsz) inference available
+            out = model.export(format=backend, dynamic=True)
+            print(f"Exported {pt_path} -> {out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", nargs="+", default=DEFAULT_MODELS, help="YOLO .pt weights")
+    parser.add_argument("--export", nargs="+", choices=BACKENDS, help="Export the models to these backends")
+    parser.add_argument("--bench", action="store_true", help="Time every available backend")
+    args = parser.parse_args()
+
+    if args.export:
+        export_models(args.models, args.export)
+    if args.bench or not args.export:
+        for pt_path in args.models:
+            print(f"{pt_path}: available={available_backends(pt_path)}")
+            for backend, ms in benchmark(pt_path).items():
+                print(f"  {backend:9s} {ms:8.2f} ms")
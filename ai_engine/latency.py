@@ -0,0 +1,145 @@
+"""
+latency.py
+==========
+Frame age tracking and the stale-frame drop policy for the live servers.
+
+The camera readers pushed bare frames into frame_queue(maxsize=2), so there
+was no way to tell how old a frame was by the time it was analysed and shown,
+and frames were only dropped when the queue happened to be full. Now the
+reader stamps every frame when the capture hands it over and each session
+keeps a LatencyMonitor:
+
+  * queue      - capture -> taken by the inference loop
+  * inference  - capture -> detections / pose / shot / LBW logic done
+  * encode     - capture -> annotated JPEG ready for the viewers
+
+Each stage keeps the last WINDOW samples; snapshot() reports p50 / p95 / p99
+and max in ms, how many frames exceeded the age budget at that stage (late)
+and how many frames were dropped, by reason. The live servers serve it on
+/api/latency?session=<id>.
+
+DropPolicy decides which queued frame the inference loop takes
+(CRICKET_DROP_POLICY, budget CRICKET_MAX_FRAME_AGE_MS, default 150 ms):
+
+  * max_age  - frames in order, but a frame older than the budget is skipped
+               when a newer one is already queued (default)
+  * latest   - always the newest queued frame, everything older is dropped
+  * fifo     - every frame in order (uploaded video files always use this)
+
+The newest frame is never dropped, so a pipeline slower than the budget still
+shows its most recent result; those frames count as late.
+
+Usage:
+    monitor = LatencyMonitor()
+    policy = DropPolicy.from_env()
+    captured_at, frame = policy.select(frame_queue, *frame_queue.get(), monitor)
+    monitor.record("inference", captured_at)
+    print(monitor.snapshot())
+"""
+
+import math
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+POLICY_ENV = "CRICKET_DROP_POLICY"
+MAX_AGE_ENV = "CRICKET_MAX_FRAME_AGE_MS"
+DEFAULT_POLICY = "max_age"
+DEFAULT_MAX_AGE_MS = 150.0
+POLICIES = ("max_age", "latest", "fifo")
+STAGES = ("queue", "inference", "encode")
+WINDOW = 1000  # Samples per stage kept for the percentiles
+
+now = time.perf_counter  # Clock for capture stamps and ages
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = math.ceil(q / 100.0 * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+
+class LatencyMonitor:
+    """Rolling per-stage frame ages (capture -> stage) and drop counters for one stream."""
+
+    def __init__(self, budget_ms=None, window=WINDOW):
+        if budget_ms is None:
+            budget_ms = float(os.environ.get(MAX_AGE_ENV, DEFAULT_MAX_AGE_MS))
+        self.budget = budget_ms / 1000.0
+        self._lock = threading.Lock()
+        self._ages = {stage: deque(maxlen=window) for stage in STAGES}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for ages in self._ages.values():
+                ages.clear()
+            self.counts = {stage: 0 for stage in STAGES}
+            self.late = {stage: 0 for stage in STAGES}
+            self.dropped = {}
+
+    def record(self, stage, captured_at, at=None):
+        """Age of a frame at stage; returns it in seconds."""
+        age = (now() if at is None else at) - captured_at
+        with self._lock:
+            self._ages[stage].append(age)
+            self.counts[stage] += 1
+            if age > self.budget:
+                self.late[stage] += 1
+        return age
+
+    def drop(self, reason):
+        with self._lock:
+            self.dropped[reason] = self.dropped.get(reason, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            stages = {}
+            for stage, ages in self._ages.items():
+                values = sorted(ages)
+                stages[stage] = {'samples': len(values), 'frames': self.counts[stage], 'late': self.late[stage]}
+                for q in (50, 95, 99):
+                    p = percentile(values, q)
+                    stages[stage][f'p{q}_ms'] = round(p * 1000, 1) if p is not None else None
+                stages[stage]['max_ms'] = round(values[-1] * 1000, 1) if values else None
+            return {'budget_ms': round(self.budget * 1000, 1), 'stages': stages, 'dropped': dict(self.dropped)}
+
+
+class DropPolicy:
+    """Which queued frame the inference loop processes next."""
+
+    def __init__(self, mode=DEFAULT_POLICY, max_age_ms=DEFAULT_MAX_AGE_MS):
+        if mode not in POLICIES:
+            raise ValueError(f"Unknown drop policy {mode!r}, expected one of {', '.join(POLICIES)}")
+        self.mode = mode
+        self.max_age = max_age_ms / 1000.0
+
+    @classmethod
+    def from_env(cls):
+        return cls(os.environ.get(POLICY_ENV, DEFAULT_POLICY).strip().lower(),
+                   float(os.environ.get(MAX_AGE_ENV, DEFAULT_MAX_AGE_MS)))
+
+    def select(self, frame_queue, captured_at, frame, monitor=None):
+        """(captured_at, frame) to process, given the one just taken from frame_queue.
+
+        Frames skipped for a newer queued one are counted on monitor as "stale" / "superseded".
+        """
+        if self.mode == "fifo":
+            return captured_at, frame
+        while True:
+            if self.mode == "max_age" and now() - captured_at <= self.max_age:
+                return captured_at, frame
+            try:
+                newer = frame_queue.get_nowait()
+            except queue.Empty:
+                return captured_at, frame  # Nothing newer: late, but the freshest there is
+            if monitor is not None:
+                monitor.drop("stale" if self.mode == "max_age" else "superseded")
+            captured_at, frame = newer
+
+    def describe(self):
+        return {'policy': self.mode, 'max_age_ms': round(self.max_age * 1000, 1)}
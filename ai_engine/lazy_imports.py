@@ -0,0 +1,106 @@
+"""
+lazy_imports.py
+===============
+Deferred imports for the heavy frameworks.
+
+ultralytics (and with it torch), MediaPipe and TensorFlow take seconds to
+import, and every entry point used to import them at module top whether or
+not the run needed them: a --rescore pass never touches YOLO or MediaPipe,
+the ONNX shot model never needs TensorFlow, and the FastAPI server imports
+process_video just to hand requests over to it.
+
+lazy_import() returns a stand-in that performs the real import on first
+attribute access or call. The time each deferred import took is recorded
+for import_report() / startup_benchmark.py. preload() starts the imports
+on a background thread so they overlap with work that does not need them
+(opening and hashing the video, loading ONNX sessions); a later access
+waits on the import lock instead of importing twice.
+
+Usage:
+    from lazy_imports import lazy_import, preload
+    mp = lazy_import("mediapipe")                       # nothing imported yet
+    mp_drawing = lazy_import("mediapipe", "solutions.drawing_utils")
+    YOLO = lazy_import("ultralytics", "YOLO")
+    preload("ultralytics", "mediapipe")                 # warm them in the background
+"""
+
+import importlib
+import sys
+import threading
+import time
+
+_times = {}
+_lock = threading.Lock()
+
+
+def _import(name):
+    # Always go through import_module: it waits for an import still running on the preload thread
+    fresh = name not in sys.modules
+    t0 = time.perf_counter()
+    module = importlib.import_module(name)
+    if fresh:
+        with _lock:
+            _times.setdefault(name, time.perf_counter() - t0)
+    return module
+
+
+class LazyObject:
+    """Module (or module attribute path) imported on first use."""
+
+    def __init__(self, name, attr=None):
+        self.__dict__["_name"] = name
+        self.__dict__["_attr"] = attr
+        self.__dict__["_target"] = None
+
+    def _resolve(self):
+        target = self.__dict__["_target"]
+        if target is None:
+            target = _import(self._name)
+            for part in (self._attr.split(".") if self._attr else ()):
+                target = getattr(target, part)
+            self.__dict__["_target"] = target
+        return target
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, item, value):
+        setattr(self._resolve(), item, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __dir__(self):
+        return dir(self._resolve())
+
+    def __repr__(self):
+        path = f"{self._name}.{self._attr}" if self._attr else self._name
+        state = "loaded" if self.__dict__["_target"] is not None else "not loaded"
+        return f"<lazy {path} ({state})>"
+
+
+def lazy_import(name, attr=None):
+    return LazyObject(name, attr)
+
+
+def is_loaded(name):
+    return name in sys.modules
+
+
+def preload(*names):
+    """Import names on a daemon thread; returns the thread."""
+    def run():
+        for name in names:
+            try:
+                _import(name)
+            except Exception as e:
+                print(f"[lazy-imports] preload of {name} failed: {e}", flush=True)
+    thread = threading.Thread(target=run, name="preload", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_report():
+    """Seconds spent in each deferred import so far."""
+    with _lock:
+        return dict(_times)
@@ -1,149 +1,38 @@
 import cv2
-import threading
-import sys
 import time
 import os
 import argparse
 import numpy as np
-import mediapipe as mp
+from lazy_imports import lazy_import
+mp = lazy_import("mediapipe")
 import warnings
 from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
-from ultralytics import YOLO
 from hawk_eye_engine import estimate_speed, swing_amount, spin_intensity, get_ball_type
+from refresh_scheduler import StaticSceneScheduler
+from scene_change import SceneChangeDetector, CUT
+from roi_inference import pitch_crop_rect
+from motion_gate import MotionGate
+from shot_stream import load_shot_classifier
+from pose_features import PoseFeatureExtractor
+from batsman_tracker import BatsmanTracker
+from mjpeg_stream import source_size
+from api_client import DetectionUpdateSender
+from live_session import LiveSession, LiveSessions, ModelPool, DEFAULT_SESSION, session_for_request
+from detection_scheduler import DetectionScheduler
+import model_registry as registry
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-import json
-import requests
-import threading
 import queue
-import time
-
-camera_lock = threading.Lock()
-
-import queue
-import threading
-
-frame_queue = queue.Queue(maxsize=2)
-reader_thread = None
-stop_reader = False
-video_writer = None
-
-def camera_reader():
-    global camera, frame_queue, stop_reader, connection_status, is_video_file
-    while not stop_reader:
-        with camera_lock:
-            if camera is None or not camera.isOpened():
-                time.sleep(0.01)
-                continue
-            success, frame = camera.read()
-        
-        if success:
-            if video_writer is not None:
-                try:
-                    video_writer.write(frame)
-                except Exception as e:
-                    print(f"Error writing to video: {e}")
-            
-            if getattr(sys.modules[__name__], 'is_video_file', False):
-                # Block until there is space in the queue to avoid dropping frames for video files
-                frame_queue.put(frame, block=True)
-            else:
-                # For live webcams, drop oldest frame to maintain realtime
-                if not frame_queue.full():
-                    frame_queue.put(frame)
-                else:
-                    try:
-                        frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                    frame_queue.put(frame)
-        else:
-            with camera_lock:
-                connection_status = "Video Finished / Interrupted"
-                if camera: camera.release(); camera = None
-                if video_writer: video_writer.release(); video_writer = None
-            time.sleep(0.1)
-
 
-stop_reader_thread = False
-reader_thread_obj = None
 
-
-class HTTPMJPEGStream:
-    def __init__(self, url):
-        self.url = url
-        self.stream = None
-        self.iterator = None
-        self.bytes = b''
-        self.opened = False
-        self._connect()
-        
-    def _connect(self):
-        import requests
-        try:
-            self.stream = requests.get(self.url, stream=True, timeout=5)
-            self.iterator = self.stream.iter_content(chunk_size=8192)
-            self.opened = True
-        except:
-            self.opened = False
-            
-    def isOpened(self):
-        return self.opened
-        
-    def read(self):
-        import cv2
-        import numpy as np
-        if not self.opened:
-            return False, None
-        try:
-            while True:
-                a = self.bytes.find(b'\xff\xd8')
-                b = self.bytes.find(b'\xff\xd9')
-                if a != -1 and b != -1:
-                    if b < a:
-                        self.bytes = self.bytes[b+2:]
-                        continue
-                    jpg = self.bytes[a:b+2]
-                    self.bytes = self.bytes[b+2:]
-                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
-                        return True, frame
-                chunk = next(self.iterator)
-                self.bytes += chunk
-        except StopIteration:
-            self.opened = False
-            return False, None
-        except Exception as e:
-            self.opened = False
-            return False, None
-            
-    def release(self):
-        self.opened = False
-        if self.stream:
-            self.stream.close()
-            
-    def get(self, prop_id):
-        return 0
+# One keep-alive session and sender thread for the Node API; per-frame updates coalesce per detection id
+update_sender = DetectionUpdateSender()
 
 def create_new_detection_sync(image_path="Live Stream"):
-    try:
-        r = requests.post("http://127.0.0.1:3000/api/detections/new", json={"image_path": image_path}, timeout=0.3)
-        if r.status_code == 200:
-            return r.json().get("id")
-    except Exception as e:
-        print(f"Error creating DB record: {e}")
-    return None
-
-def make_api_call_async(url, payload):
-    def run():
-        try:
-            requests.post(url, json=payload, timeout=0.5)
-        except Exception as e:
-            pass
-    threading.Thread(target=run, daemon=True).start()
+    return update_sender.create_detection(image_path)
 
 
 # Initialize Flask App
@@ -152,15 +41,9 @@ CORS(app)
 
 # Constants
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODELS_DIR = os.path.join(BASE_DIR, 'models')
 
 # Model Paths
-YOLO_BALL_PATH = os.path.join(MODELS_DIR, "yolo_ball_best.pt")
-YOLO_PITCH_PATH = os.path.join(MODELS_DIR, "yolo_pitch_best.pt")
-YOLO_STUMP_PATH = os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system", "runs", "detect", "train", "weights", "best.pt")
-SHOT_MODEL_PATH = os.path.join(MODELS_DIR, "lstm_shot_v2.onnx")
-SCALER_PATH     = os.path.join(MODELS_DIR, "scaler_v2.save")
-LABEL_MAP_PATH  = os.path.join(MODELS_DIR, "label_map_v2.json")
+from model_registry import YOLO_BALL_PATH, YOLO_PITCH_PATH, YOLO_STUMP_PATH, SHOT_MODEL_PATH, SCALER_PATH, LABEL_MAP_PATH
 
 # Config
 SEQ_LEN = 30
@@ -168,52 +51,143 @@ CONF_THRESHOLD = 0.70
 IGNORE_LABELS  = {"Batsman", "Pose"}
 SHOT_DISPLAY_FRAMES = 120
 MAX_MISSING_FRAMES = 30
+TARGET_WIDTH = 1000  # Inference width; MJPEG cameras decode straight to about this size
 
-# Global State (Models Loaded on Startup)
+# Global State (Models Loaded on Startup, shared by every camera session)
+models = ModelPool()
 print("--- PRE-LOADING MODELS FOR INSTANT START ---")
-import onnxruntime as ort
-import joblib
-import json
-
 try:
-    ball_model = YOLO(YOLO_BALL_PATH)
-    pitch_model = YOLO(YOLO_PITCH_PATH)
-    stump_model = YOLO(YOLO_STUMP_PATH)
-    shot_model = ort.InferenceSession(SHOT_MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    with open(LABEL_MAP_PATH, "r") as f:
-        classes = json.load(f)["classes"]
+    ball_model = models.yolo(YOLO_BALL_PATH, warmup=True)
+    pitch_model = models.yolo(YOLO_PITCH_PATH, warmup=True)
+    stump_model = models.yolo(YOLO_STUMP_PATH, warmup=True)
+    # Ball-model frames of all cameras go through one batched pass per tick
+    detections = DetectionScheduler(ball_model, verbose=False, conf=0.15)
+    shot_classifier = load_shot_classifier(SHOT_MODEL_PATH, SCALER_PATH, seq_len=SEQ_LEN, warmup=True)
+    classes = registry.labels(LABEL_MAP_PATH)
     
     mp_pose = mp.solutions.pose
     mp_drawing = mp.solutions.drawing_utils
-    pose = mp_pose.Pose(static_image_mode=False, min_detection_confidence=0.5, min_tracking_confidence=0.5, model_complexity=1)
+    registry.pose(model_complexity=1, warmup=True)
+    print(registry.format_load_report())
     print("--- MODELS READY ---")
 except Exception as e:
     print(f"CRITICAL: Model Loading Error: {e}")
+    shot_classifier = None
+
+
+class BallSession(LiveSession):
+    """Camera, tracking and game state of one live camera."""
+
+    recording_prefix = "live_recording"
+    pipeline_name = "live-pipeline"
+
+    def __init__(self, session_id):
+        super().__init__(session_id, target_width=TARGET_WIDTH)
+        # MediaPipe tracks across frames: the default camera keeps the warmed-up instance, others get their own
+        self.owns_pose = session_id != DEFAULT_SESSION
+        self.pose = registry.new_pose(model_complexity=1) if self.owns_pose else registry.pose(model_complexity=1)
+        self.shot_classifier = shot_classifier.clone() if shot_classifier else None
+        self.current_frame_idx = 0
+
+        # Tracking State
+        self.frames_without_ball = 0
+        self.latched_shot_label = None
+        self.latched_shot_conf = 0.0
+        self.shot_display_countdown = 0
+        self.pitch_refresh = StaticSceneScheduler("pitch")
+        self.stump_refresh = StaticSceneScheduler("stumps")
+        self.scene = SceneChangeDetector()
+        self.scene.subscribe(self.pitch_refresh.on_scene_change)
+        self.scene.subscribe(self.stump_refresh.on_scene_change)
+        self.motion_gate = MotionGate()
+        self.scene.subscribe(self.motion_gate.wake)
+        self.pose_features = PoseFeatureExtractor()
+        self.batsman_tracker = BatsmanTracker()
+        self.scene.subscribe(self.batsman_tracker.on_scene_change)
+
+        # Game State
+        self.game_score = 0
+        self.last_hit_frame = -1
+        self.reset()
+
+    def close(self):
+        stopped = super().close()
+        if stopped and self.owns_pose:
+            self.pose.close()  # The shared default instance stays open
+        return stopped
+
+    def reset(self):
+        super().reset()
+        self.ball_track = []
+        self.ball_hit_bat = False
+        if self.shot_classifier: self.shot_classifier.reset()
+        self.batsman_tracker.reset()
+        self.pitch_refresh.reset()
+        self.stump_refresh.reset()
+        self.scene.reset()
+        self.motion_gate.reset()
+
+    def frames(self):
+        return generate_frames(self)
+
+    def status(self):
+        return dict(super().status(),
+                    refresh={"pitch": self.pitch_refresh.stats(), "stumps": self.stump_refresh.stats()},
+                    scene_changes=self.scene.stats(), motion_gate=self.motion_gate.stats(),
+                    batsman_tracker=self.batsman_tracker.stats())
+
+
+sessions = LiveSessions(BallSession)
+sessions.get(DEFAULT_SESSION)
+
+def detect_pitch_boxes(frame):
+    results_pitch = pitch_model.predict(frame, conf=0.75, verbose=False)
+    best_pitch = None
+    best_conf = 0
+    for res in results_pitch:
+        for box in res.boxes:
+            if int(box.cls[0]) == 1:
+                conf = float(box.conf[0])
+                if conf > best_conf:
+                    best_conf = conf
+                    best_pitch = tuple(map(int, box.xyxy[0].tolist()))
+    return ([best_pitch] if best_pitch else None), best_pitch, best_conf
+
+def detect_stump_boxes(frame):
+    results_stumps = stump_model.predict(frame, conf=0.60, verbose=False)
+    stumps = []
+    best_stump = None
+    best_conf = 0
+    for res in results_stumps:
+        for box in res.boxes:
+            if int(box.cls[0]) == 0:
+                stump = tuple(map(int, box.xyxy[0].tolist()))
+                stumps.append(stump)
+                conf = float(box.conf[0])
+                if conf > best_conf:
+                    best_conf = conf
+                    best_stump = stump
+    return (stumps or None), best_stump, best_conf
+
+def select_batsman(all_batsmen, all_bats, pitch_boxes, manual_pitch=None):
+    """Active batsman: first person on the pitch with a bat next to him."""
+    for bman in all_batsmen:
+        cx, cy = (bman[0]+bman[2])//2, (bman[1]+bman[3])//2
+        # Exact pitch filter logic matching process_video.py
+        if manual_pitch and len(manual_pitch) == 4:
+            pts = np.array(manual_pitch, np.int32)
+            on_pitch = cv2.pointPolygonTest(pts, (float(cx), float(cy)), False) >= 0
+        elif pitch_boxes:
+            on_pitch = any(px1 <= cx <= px2 and py1 <= cy <= py2 for (px1, py1, px2, py2) in pitch_boxes)
+        else:
+            on_pitch = False
 
-# Camera State
-camera = None
-connection_status = "Not Connected"
-current_ip = ""
-current_frame_idx = 0
-manual_pitch_pts = None
-session_log = []
-show_landmarks_flag = False
-
-# Tracking State
-ball_track = []
-frames_without_ball = 0
-ball_hit_bat = False
-pose_buffer = []
-latched_shot_label = None
-latched_shot_conf = 0.0
-shot_display_countdown = 0
-current_db_id = None
-
-
-# Global Game State
-game_score = 0
-last_hit_frame = -1
+        if not on_pitch: continue
+
+        has_bat = any((bman[0]-20) <= (bat[0]+bat[2])//2 <= (bman[2]+20) and (bman[1]-20) <= (bat[1]+bat[3])//2 <= (bman[3]+20) for bat in all_bats)
+        if has_bat:
+            return bman
+    return None
 
 def draw_trail(frame, track):
     if len(track) < 2: return frame
@@ -233,39 +207,15 @@ def draw_trail(frame, track):
 
 @app.route('/api/connect', methods=['POST'])
 def connect_camera():
-    global camera, connection_status, current_ip, ball_track, ball_hit_bat, pose_buffer, manual_pitch_pts, show_landmarks_flag, session_log, current_db_id
+    s = session_for_request(sessions, request, create=True)
     data = request.json
     ip = data.get('ip', '')
-    manual_pitch_pts = data.get('manual_pitch', None)
-    show_landmarks_flag = data.get('showLandmarks', False)
+    s.manual_pitch_pts = data.get('manual_pitch', None)
+    s.show_landmarks_flag = data.get('showLandmarks', False)
     
     # Reset tracking state
-    ball_track = []
-    ball_hit_bat = False
-    pose_buffer = []
-    session_log = []
-    ball_hit_bat = False
-    current_db_id = None
-    global frame_queue, stop_reader, reader_thread
-    stop_reader = True
-    if reader_thread:
-        reader_thread.join(timeout=1.0)
-    
-    while not frame_queue.empty():
-        try:
-            frame_queue.get_nowait()
-        except:
-            pass
-            
-    stop_reader = False
+    s.reset()
 
-    
-    with camera_lock:
-        if camera: camera.release()
-        global video_writer
-        if video_writer: video_writer.release(); video_writer = None
-    
-    global is_video_file
     is_video_file = False
     video_source = ip
     if str(ip).isdigit():
@@ -274,125 +224,117 @@ def connect_camera():
         video_source = os.path.join(os.path.dirname(BASE_DIR), 'shared', ip.lstrip('/'))
         is_video_file = True
 
-    print(f"Connecting to: {video_source}")
-    with camera_lock:
-        if camera: camera.release()
-        if isinstance(video_source, str) and (video_source.startswith("http://") or video_source.startswith("https://")):
-            print(f"Using HTTPMJPEGStream for {video_source}")
-            camera = HTTPMJPEGStream(video_source)
-        elif isinstance(video_source, int) and os.name == 'nt':
-            camera = cv2.VideoCapture(video_source, cv2.CAP_DSHOW)
-        else:
-            camera = cv2.VideoCapture(video_source)
-            
-    if camera and camera.isOpened():
-        connection_status = "Connected"
-        current_ip = ip
-        
-        # Read a frame to get size for VideoWriter
-        success, frame = camera.read()
-        if success:
-            h, w = frame.shape[:2]
-            fps = 30.0
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            upload_dir = os.path.join(os.path.dirname(BASE_DIR), 'shared', 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
-            save_path = os.path.join(upload_dir, f"live_recording_{timestamp}.mp4")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(save_path, fourcc, fps, (w, h))
-            if not frame_queue.full():
-                frame_queue.put(frame)
-                
-        reader_thread = threading.Thread(target=camera_reader, daemon=True)
-        reader_thread.start()
-        return jsonify({"status": "success", "message": "Connected"})
+    if s.connect(video_source, ip, is_video_file):
+        return jsonify({"status": "success", "message": "Connected", "session": s.id})
     else:
-        connection_status = "Connection Failed"
         return jsonify({"status": "error", "message": f"Failed to open camera: {video_source}"}), 500
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    return jsonify({"status": connection_status, "ip": current_ip})
+    return jsonify(session_for_request(sessions, request).status())
+
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify({"sessions": [s.status() for s in sessions.all()], "max_sessions": sessions.max_sessions})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({"detection_updates": update_sender.stats(), "models": models.stats(), "detection_scheduler": detections.stats(),
+                    "video_feed": {s.id: s.broadcaster.stats() for s in sessions.all()}})
+
+@app.route('/api/latency', methods=['GET'])
+def get_latency():
+    # Frame age at each stage (capture -> queue / inference / encode), p50 / p95 / p99 in ms
+    if request.args.get('session') == 'all':
+        return jsonify({"sessions": [s.latency_report() for s in sessions.all()]})
+    return jsonify(session_for_request(sessions, request).latency_report())
 
 @app.route('/reset_score', methods=['POST'])
 def reset_score():
-    global game_score, ball_track, ball_hit_bat, pose_buffer, session_log, current_db_id
-    game_score = 0
-    ball_track = []
-    ball_hit_bat = False
-    pose_buffer = []
-    session_log = []
-    current_db_id = None
+    s = session_for_request(sessions, request)
+    s.game_score = 0
+    s.ball_track = []
+    s.ball_hit_bat = False
+    if s.shot_classifier: s.shot_classifier.reset()
+    s.session_log = []
+    s.current_db_id = None
     return jsonify({"status": "success", "score": 0})
 
 @app.route('/get_score')
 def get_score():
-    global latched_shot_label, latched_shot_conf, shot_display_countdown
+    s = session_for_request(sessions, request)
     return jsonify({
-        "score": game_score,
-        "shot_label": latched_shot_label if shot_display_countdown > 0 else None,
-        "shot_conf": latched_shot_conf if shot_display_countdown > 0 else None
+        "score": s.game_score,
+        "shot_label": s.latched_shot_label if s.shot_display_countdown > 0 else None,
+        "shot_conf": s.latched_shot_conf if s.shot_display_countdown > 0 else None
     })
 
 @app.route('/get_log')
 def get_log():
-    return jsonify({"log": session_log})
+    return jsonify({"log": session_for_request(sessions, request).session_log})
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # One pipeline per camera for every viewer: each response only streams the newest annotated frame
+    s = session_for_request(sessions, request, create=True)
+    return Response(s.watch(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-def generate_frames():
-    global camera, ball_model, pitch_model, stump_model, shot_model, scaler, classes, mp_drawing, pose, mp_pose, ball_track, frames_without_ball, ball_hit_bat, pose_buffer, latched_shot_label, latched_shot_conf, shot_display_countdown, connection_status, game_score, last_hit_frame, current_frame_idx, manual_pitch_pts, current_ip, show_landmarks_flag, session_log, current_db_id
+def generate_frames(s):
+    """The inference loop of one camera session: yields each annotated frame as JPEG bytes (run by s.worker)."""
 
     tracked_trajectory = []
     last_shot_label = None
 
     current_chunk_cap = None
-    pitch_boxes_cache = []
-    stump_boxes_cache = []
 
     current_chunk_file = None
 
     while True:
-        current_frame_idx += 1
+        s.current_frame_idx += 1
         try:
-            frame = frame_queue.get(timeout=0.1)
+            captured_at, frame = s.next_frame(timeout=0.1)
         except queue.Empty:
-            with camera_lock:
-                is_camera_none = camera is None
-                is_connected = connection_status == "Connected"
+            with s.camera_lock:
+                is_camera_none = s.camera is None
+                is_connected = s.connection_status == "Connected"
             
             if is_camera_none and not is_connected:
-                msg = connection_status
+                msg = s.connection_status
             else:
                 msg = "Buffering Live Stream..."
                 
             blank_frame = np.zeros((480, 640, 3), dtype=np.uint8)
             cv2.putText(blank_frame, msg, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
             ret, buffer = cv2.imencode('.jpg', blank_frame)
-            frame_bytes = buffer.tobytes()
-            yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+            yield buffer.tobytes()
             continue
 
         # Flip frame horizontally to fix mirroring (Left -> Right, Right -> Left)
         # frame = cv2.flip(frame, 1)
 
         # Scale down frame to speed up AI inference massively
-        target_width = 1000
-        orig_h, orig_w = frame.shape[:2]
+        # (orig_* is the camera resolution: MJPEG frames may already be DCT-reduced)
+        target_width = TARGET_WIDTH
+        orig_w, orig_h = source_size(s.camera, frame)
         scaled_manual_pitch = []
         if orig_w > target_width:
             target_height = int(orig_h * (target_width / orig_w))
-            frame = cv2.resize(frame, (target_width, target_height))
+            if frame.shape[:2] != (target_height, target_width):
+                frame = cv2.resize(frame, (target_width, target_height))
             scale_x = target_width / orig_w
             scale_y = target_height / orig_h
-            if manual_pitch_pts:
-                scaled_manual_pitch = [[p[0]*scale_x, p[1]*scale_y] for p in manual_pitch_pts]
+            if s.manual_pitch_pts:
+                scaled_manual_pitch = [[p[0]*scale_x, p[1]*scale_y] for p in s.manual_pitch_pts]
         else:
-            scaled_manual_pitch = list(manual_pitch_pts) if manual_pitch_pts else []
+            scaled_manual_pitch = list(s.manual_pitch_pts) if s.manual_pitch_pts else []
 
         h, w = frame.shape[:2]
+
+        # Camera cut: the old ball track belongs to another view
+        if s.scene.update(frame, s.current_frame_idx) == CUT:
+            s.ball_track = []
+            s.frames_without_ball = 0
+            s.ball_hit_bat = False
         
         # Keep original frame for AI processing
         annotated_frame = frame.copy()
@@ -405,40 +347,24 @@ def generate_frames():
             px1, py1, px2, py2 = min(xs), min(ys), max(xs), max(ys)
             pitch_boxes.append((px1, py1, px2, py2))
         else:
-            if current_frame_idx % 30 == 0 or not pitch_boxes_cache:
-                results_pitch = pitch_model.predict(frame, conf=0.75, verbose=False)
-                best_pitch = None
-                best_conf = 0
-                for res in results_pitch:
-                    for box in res.boxes:
-                        if int(box.cls[0]) == 1:
-                            conf = float(box.conf[0])
-                            if conf > best_conf:
-                                best_conf = conf
-                                best_pitch = tuple(map(int, box.xyxy[0].tolist()))
-                if best_pitch:
-                    pitch_boxes_cache = [best_pitch]
-            pitch_boxes = pitch_boxes_cache
-
-        stump_boxes = []
-        if current_frame_idx % 15 == 0 or not stump_boxes_cache:
-            results_stumps = stump_model.predict(frame, conf=0.60, verbose=False)
-            cache_stumps = []
-            for res in results_stumps:
-                for box in res.boxes:
-                    if int(box.cls[0]) == 0:
-                        cache_stumps.append(tuple(map(int, box.xyxy[0].tolist())))
-            if cache_stumps:
-                stump_boxes_cache = cache_stumps
-        stump_boxes = stump_boxes_cache
-
-        results_ball = ball_model(frame, verbose=False, conf=0.15)
+            pitch_boxes = s.pitch_refresh.get(s.current_frame_idx, lambda: detect_pitch_boxes(frame)) or []
+
+        stump_boxes = s.stump_refresh.get(s.current_frame_idx, lambda: detect_stump_boxes(frame)) or []
+
+        # Off-pitch detections are discarded below, so only run the ball model on the pitch crop
+        roi_rect = pitch_crop_rect(frame.shape, pitch_roi=pitch_boxes)
+        # Idle pitch: skip the ball model and MediaPipe (no batsman -> no pose)
+        gate_open = s.motion_gate.update(frame, roi_rect or (pitch_boxes[0] if pitch_boxes else None))
+        if gate_open:
+            ball_boxes = detections.detect(s.id, frame, roi_rect).boxes
+        else:
+            ball_boxes = []
         all_batsmen = []
         all_bats = []
         current_ball_box = None
         
         # Just collect the boxes first
-        for box in results_ball[0].boxes:
+        for box in ball_boxes:
             cls_id = int(box.cls[0])
             cls_name = ball_model.names[cls_id].lower()
             conf = float(box.conf[0])
@@ -449,88 +375,61 @@ def generate_frames():
             elif cls_name == 'ball' or cls_id == 0: current_ball_box = (x1, y1, x2, y2, cls_name, conf)
             elif cls_name == 'bat' or cls_id == 1: all_bats.append((x1, y1, x2, y2, cls_name, conf))
 
-        # Logic: Find Active Batsman
+        # Logic: Find Active Batsman (or keep the crop tracked from the last pose)
         batsman_box = None
-        if all_batsmen:
-            for bman in all_batsmen:
-                cx, cy = (bman[0]+bman[2])//2, (bman[1]+bman[3])//2
-                # Exact pitch filter logic matching process_video.py
-                if scaled_manual_pitch and len(scaled_manual_pitch) == 4:
-                    import numpy as np
-                    import cv2
-                    pts = np.array(scaled_manual_pitch, np.int32)
-                    on_pitch = cv2.pointPolygonTest(pts, (float(cx), float(cy)), False) >= 0
-                elif pitch_boxes:
-                    on_pitch = any(px1 <= cx <= px2 and py1 <= cy <= py2 for (px1, py1, px2, py2) in pitch_boxes)
-                else:
-                    on_pitch = False
-                
-                if not on_pitch: continue
-                
-                has_bat = any((bman[0]-20) <= (bat[0]+bat[2])//2 <= (bman[2]+20) and (bman[1]-20) <= (bat[1]+bat[3])//2 <= (bman[3]+20) for bat in all_bats)
-                if has_bat:
-                    batsman_box = bman; break
+        if gate_open:
+            batsman_box = s.batsman_tracker.select(lambda: select_batsman(all_batsmen, all_bats, pitch_boxes, scaled_manual_pitch))
 
         current_shot_label = "Waiting..."
         current_shot_conf = 0.0
 
         if batsman_box:
-            bx1, by1, bx2, by2, _, _ = batsman_box
+            bx1, by1, bx2, by2 = batsman_box[:4]
             bx1, by1, bx2, by2 = max(0, int(bx1)), max(0, int(by1)), min(w, int(bx2)), min(h, int(by2))
             crop = frame[by1:by2, bx1:bx2]
             if crop.size > 0:
-                res_pose = pose.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+                res_pose = s.pose.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+                s.batsman_tracker.update(s.pose_features.read(res_pose.pose_landmarks, (bx1, by1, bx2, by2)) if res_pose.pose_landmarks else None, frame.shape)
                 if res_pose.pose_landmarks:
-                    cw, ch = bx2-bx1, by2-by1
-                    feat = []
-                    for p in res_pose.pose_landmarks.landmark:
-                        feat.extend([(p.x * cw + bx1)/w, (p.y * ch + by1)/h, p.z, p.visibility])
+                    feat = s.pose_features.features((w, h))
                     
-                    if show_landmarks_flag:
+                    if s.show_landmarks_flag:
                         mp_drawing.draw_landmarks(crop, res_pose.pose_landmarks, mp_pose.POSE_CONNECTIONS)
                         annotated_frame[by1:by2, bx1:bx2] = crop
                         
-                    pose_buffer.append(feat)
-                    if len(pose_buffer) > SEQ_LEN: pose_buffer.pop(0)
-                    
-                    if len(pose_buffer) == SEQ_LEN and shot_model:
-                        X = np.array(pose_buffer, dtype=np.float32)
-                        X_scaled = scaler.transform(X).reshape(1, SEQ_LEN, -1).astype(np.float32)
-                        ort_inputs = {shot_model.get_inputs()[0].name: X_scaled}
-                        preds = shot_model.run(None, ort_inputs)[0]
-                        idx = np.argmax(preds[0])
-                        if classes[idx] not in IGNORE_LABELS and preds[0][idx] >= 0.70:
-                            current_shot_label, current_shot_conf = classes[idx], float(preds[0][idx])
-                            latched_shot_label, latched_shot_conf = current_shot_label, current_shot_conf
-                            shot_display_countdown = SHOT_DISPLAY_FRAMES
-                            pose_buffer.clear()
-                        else:
-                            pose_buffer = pose_buffer[1:]
+                    probs = s.shot_classifier.push(feat) if s.shot_classifier else None
+                    if probs is not None:
+                        idx = np.argmax(probs)
+                        if classes[idx] not in IGNORE_LABELS and probs[idx] >= 0.70:
+                            current_shot_label, current_shot_conf = classes[idx], float(probs[idx])
+                            s.latched_shot_label, s.latched_shot_conf = current_shot_label, current_shot_conf
+                            s.shot_display_countdown = SHOT_DISPLAY_FRAMES
+                            s.shot_classifier.reset()
 
         if current_ball_box:
             x1, y1, x2, y2, cls_name, conf = current_ball_box
             
             # Add to tracking
             bcx, bcy = (x1+x2)/2, (y1+y2)/2
-            ball_track.append((int(bcx), int(bcy)))
-            frames_without_ball = 0
+            s.ball_track.append((int(bcx), int(bcy)))
+            s.frames_without_ball = 0
         else:
-            frames_without_ball += 1
+            s.frames_without_ball += 1
             # Extrapolate ball if missing for a few frames
-            if frames_without_ball <= MAX_MISSING_FRAMES and len(ball_track) >= 2:
-                dx = ball_track[-1][0] - ball_track[-2][0]
-                dy = ball_track[-1][1] - ball_track[-2][1]
-                ball_track.append((int(ball_track[-1][0] + dx), int(ball_track[-1][1] + dy)))
-            if frames_without_ball > MAX_MISSING_FRAMES: ball_track = []; ball_hit_bat = False
+            if s.frames_without_ball <= MAX_MISSING_FRAMES and len(s.ball_track) >= 2:
+                dx = s.ball_track[-1][0] - s.ball_track[-2][0]
+                dy = s.ball_track[-1][1] - s.ball_track[-2][1]
+                s.ball_track.append((int(s.ball_track[-1][0] + dx), int(s.ball_track[-1][1] + dy)))
+            if s.frames_without_ball > MAX_MISSING_FRAMES: s.ball_track = []; s.ball_hit_bat = False
 
         if current_ball_box and batsman_box and all_bats:
             bcx, bcy = (current_ball_box[0]+current_ball_box[2])/2, (current_ball_box[1]+current_ball_box[3])/2
             
             # Verify the ball is actually moving (not a false static detection on the bat/glove)
             is_moving = False
-            if len(ball_track) >= 3:
-                dx = ball_track[-1][0] - ball_track[0][0]
-                dy = ball_track[-1][1] - ball_track[0][1]
+            if len(s.ball_track) >= 3:
+                dx = s.ball_track[-1][0] - s.ball_track[0][0]
+                dy = s.ball_track[-1][1] - s.ball_track[0][1]
                 if abs(dx) > 10 or abs(dy) > 10:
                     is_moving = True
 
@@ -545,23 +444,25 @@ def generate_frames():
                             break
                             
                 if ball_touched_bat:
-                    if not ball_hit_bat:
+                    if not s.ball_hit_bat:
                         # NEW HIT! Increment score
-                        game_score += 1
-                        last_hit_frame = current_frame_idx
-                        if latched_shot_label and latched_shot_label != "Waiting...":
-                            speed = estimate_speed(ball_track)
-                            ball_type = get_ball_type(ball_track, speed)
-                            session_log.append({
+                        s.game_score += 1
+                        s.last_hit_frame = s.current_frame_idx
+                        if s.latched_shot_label and s.latched_shot_label != "Waiting...":
+                            speed = estimate_speed(s.ball_track)
+                            ball_type = get_ball_type(s.ball_track, speed)
+                            s.session_log.append({
                                 "time": time.strftime("%I:%M:%S %p"),
                                 "type": "shot",
-                                "label": latched_shot_label,
-                                "conf": latched_shot_conf,
+                                "label": s.latched_shot_label,
+                                "conf": s.latched_shot_conf,
                                 "speed": speed,
                                 "ball_type": ball_type
                             })
                     
-                    ball_hit_bat = True
+                    s.ball_hit_bat = True
+
+        s.latency.record("inference", captured_at)
 
         # Draw Pitch
         if scaled_manual_pitch and len(scaled_manual_pitch) == 4:
@@ -575,7 +476,7 @@ def generate_frames():
                 cv2.putText(annotated_frame, "AUTO PITCH", (int(px1), int(py1) - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.4, (255, 255, 255), 1)
         
         # Draw Balls, Batsmen, Bats
-        if show_landmarks_flag:
+        if s.show_landmarks_flag:
             for item in all_batsmen + all_bats + ([current_ball_box] if current_ball_box else []):
                 bx1, by1, bx2, by2, cls_name, conf = item
                 color = (0, 255, 0) if cls_name == 'batsman' else (255, 0, 0) if cls_name == 'ball' else (0, 0, 255)
@@ -587,24 +488,24 @@ def generate_frames():
                 cv2.putText(annotated_frame, "STUMPS", (int(sx1), int(sy1) - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
 
         # Trail & Physics
-        annotated_frame = draw_trail(annotated_frame, ball_track)
+        annotated_frame = draw_trail(annotated_frame, s.ball_track)
         
         # Hawk-Eye Stats
-        speed = estimate_speed(ball_track)
-        swing = swing_amount(ball_track)
-        spin = spin_intensity(ball_track)
-        ball_type = get_ball_type(ball_track, speed)
-
-        if len(ball_track) > 0:
-            tracked_trajectory = list(ball_track)
-
-        if current_db_id is not None:
-            shot_changed = (latched_shot_label != last_shot_label)
-            if current_frame_idx % 3 == 0 or shot_changed:
-                last_shot_label = latched_shot_label
+        speed = estimate_speed(s.ball_track)
+        swing = swing_amount(s.ball_track)
+        spin = spin_intensity(s.ball_track)
+        ball_type = get_ball_type(s.ball_track, speed)
+
+        if len(s.ball_track) > 0:
+            tracked_trajectory = list(s.ball_track)
+
+        if s.current_db_id is not None:
+            shot_changed = (s.latched_shot_label != last_shot_label)
+            if s.current_frame_idx % 3 == 0 or shot_changed:
+                last_shot_label = s.latched_shot_label
                 results_data = [{
-                    "class_name": latched_shot_label if latched_shot_label else "Waiting...",
-                    "conf": latched_shot_conf if latched_shot_label else 0.0,
+                    "class_name": s.latched_shot_label if s.latched_shot_label else "Waiting...",
+                    "conf": s.latched_shot_conf if s.latched_shot_label else 0.0,
                     "speed": speed if speed else 0,
                     "swing": swing if swing else 0,
                     "spin": spin if spin else "Low",
@@ -612,15 +513,15 @@ def generate_frames():
                     "trajectory": tracked_trajectory,
                     "type": "live_ball"
                 }]
-                make_api_call_async("http://127.0.0.1:3000/api/detections/update", {"id": current_db_id, "results": results_data})
-
-        if shot_display_countdown > 0:
-            shot_display_countdown -= 1
-            if shot_display_countdown == 0:
-                latched_shot_label = None
-                latched_shot_conf = 0.0
-                ball_track = []
-                frames_without_ball = 0
+                update_sender.update(s.current_db_id, results_data)
+
+        if s.shot_display_countdown > 0:
+            s.shot_display_countdown -= 1
+            if s.shot_display_countdown == 0:
+                s.latched_shot_label = None
+                s.latched_shot_conf = 0.0
+                s.ball_track = []
+                s.frames_without_ball = 0
         cv2.rectangle(annotated_frame, (20, 20), (450, 130), (0, 0, 0), -1)
         cv2.putText(annotated_frame, f"TYPE: {ball_type}", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
         cv2.putText(annotated_frame, f"SPEED: {speed} km/h", (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
@@ -630,18 +531,17 @@ def generate_frames():
 
         ret, buffer = cv2.imencode('.jpg', frame)
         if not ret: continue
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+        s.latency.record("encode", captured_at)
+        yield buffer.tobytes()
 
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect_camera():
-    global camera, connection_status, video_writer
-    if camera:
-        camera.release()
-        camera = None
-    if video_writer:
-        video_writer.release()
-        video_writer = None
-    connection_status = "Disconnected"
+    s = session_for_request(sessions, request)
+    detections.forget(s.id)
+    if s.id == DEFAULT_SESSION:
+        s.disconnect()
+    else:
+        sessions.close(s.id)  # Extra cameras free their pipeline and pose graph
     return jsonify({"status": "success", "message": "Camera disconnected"})
 
 def main():
@@ -0,0 +1,395 @@
+"""
+live_session.py
+===============
+Per-camera sessions for the live servers: one process, N cameras.
+
+Both live servers kept everything in module globals (one camera, one
+frame_queue, one ball track / pose buffer / LBW logic / pitch ROI / session
+log / current_db_id), so a second camera meant a second process with its own
+copy of every model. Now:
+
+  * LiveSession holds one camera: the capture, its reader thread and frame
+    queue, the recording, the connect options and its own FrameBroadcaster /
+    BroadcastWorker pipeline. Each server subclasses it with its tracking
+    state and implements frames() (its generate_frames loop).
+  * Frames are queued as (captured_at, frame). next_frame() applies the
+    session's DropPolicy and LatencyMonitor records the frame age at each
+    stage (see latency.py).
+  * LiveSessions maps session ids to sessions. Every route takes the id as
+    ?session=<id> (or "session" in the JSON body); without one it uses
+    "default", so existing clients keep working. CRICKET_MAX_SESSIONS caps
+    the number of cameras per process (default 8).
+  * ModelPool shares one copy of every detector between the sessions. Each
+    model is wrapped in SharedModel, whose calls are scheduled first come,
+    first served (TurnLock), so a busy camera cannot starve the others and
+    backends that are not thread-safe are never entered concurrently.
+    stats() reports per-model calls, queueing and busy time.
+
+Stateful models (MediaPipe Pose, the streaming shot classifier) stay per
+session: registry.new_pose() and ShotClassifier.clone(), which keeps the
+shared ONNX session (batched across cameras with CRICKET_SHOT_BATCHER=local).
+
+Usage:
+    models = ModelPool()
+    ball_model = models.yolo(YOLO_BALL_PATH, warmup=True)
+
+    class BallSession(LiveSession):
+        def frames(self):
+            return generate_frames(self)
+
+    sessions = LiveSessions(BallSession)
+
+    @app.route('/video_feed')
+    def video_feed():
+        s = session_for_request(sessions, request, create=True)
+        return Response(s.watch(), mimetype='multipart/x-mixed-replace; boundary=frame')
+"""
+
+import os
+import queue
+import re
+import threading
+import time
+
+import cv2
+
+import model_registry as registry
+from frame_broadcaster import FrameBroadcaster, BroadcastWorker
+from latency import LatencyMonitor, DropPolicy, now
+from mjpeg_stream import HTTPMJPEGStream
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+UPLOAD_DIR = os.path.join(os.path.dirname(BASE_DIR), 'shared', 'uploads')
+DEFAULT_SESSION = "default"
+MAX_SESSIONS_ENV = "CRICKET_MAX_SESSIONS"
+DEFAULT_MAX_SESSIONS = 8
+RECORDING_FPS = 30.0
+
+_SESSION_ID = re.compile(r"^[A-Za-z0-9_.-]{1,64}$")
+
+
+class TurnLock:
+    """Lock granted in arrival order (threading.Lock makes no fairness promise)."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next = 0
+        self._serving = 0
+
+    def __enter__(self):
+        with self._cond:
+            ticket = self._next
+            self._next += 1
+            self._cond.wait_for(lambda: self._serving == ticket)
+        return self
+
+    def __exit__(self, *exc):
+        with self._cond:
+            self._serving += 1
+            self._cond.notify_all()
+
+    @property
+    def waiting(self):
+        with self._cond:
+            return max(0, self._next - self._serving - 1)
+
+
+class SharedModel:
+    """A model used by several sessions: calls take turns, everything else passes through."""
+
+    def __init__(self, model, name):
+        self.model = model
+        self.name = name
+        self.turn = TurnLock()
+        self.calls = 0
+        self.wait_s = 0.0
+        self.busy_s = 0.0
+
+    def _run(self, fn, args, kwargs):
+        t0 = time.perf_counter()
+        with self.turn:
+            t1 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.calls += 1
+                self.wait_s += t1 - t0
+                self.busy_s += time.perf_counter() - t1
+
+    def __call__(self, *args, **kwargs):
+        return self._run(self.model, args, kwargs)
+
+    def predict(self, *args, **kwargs):
+        return self._run(self.model.predict, args, kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+    def stats(self):
+        calls = max(self.calls, 1)
+        return {'calls': self.calls, 'waiting': self.turn.waiting,
+                'avg_wait_ms': round(self.wait_s * 1000 / calls, 2), 'avg_busy_ms': round(self.busy_s * 1000 / calls, 2)}
+
+
+class ModelPool:
+    """One SharedModel per loaded model, for every session of the process."""
+
+    def __init__(self):
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def share(self, model, name=None):
+        with self._lock:
+            if id(model) not in self._models:
+                self._models[id(model)] = SharedModel(model, name or type(model).__name__)
+            return self._models[id(model)]
+
+    def yolo(self, path, warmup=None):
+        return self.share(registry.yolo(path, warmup=warmup), os.path.basename(path))
+
+    def stats(self):
+        with self._lock:
+            return {m.name: m.stats() for m in self._models.values()}
+
+
+class LiveSession:
+    """One camera: capture, reader thread, frame queue, recording and broadcast pipeline."""
+
+    recording_prefix = "live_recording"
+    pipeline_name = "live-pipeline"
+
+    def __init__(self, session_id, target_width=None):
+        self.id = session_id
+        self.target_width = target_width
+        self.camera = None
+        self.camera_lock = threading.Lock()
+        self.frame_queue = queue.Queue(maxsize=2)  # (captured_at, frame)
+        self.drop_policy = DropPolicy.from_env()
+        self.latency = LatencyMonitor(self.drop_policy.max_age * 1000)
+        self.video_writer = None
+        self.is_video_file = False
+        self.connection_status = "Not Connected"
+        self.current_ip = ""
+        self.manual_pitch_pts = None
+        self.show_landmarks_flag = False
+        self.session_log = []
+        self.current_db_id = None
+        self._reader = None
+        self._stop_reader = False
+        self.broadcaster = FrameBroadcaster()
+        self.worker = BroadcastWorker(self.frames, self.broadcaster, name=f"{self.pipeline_name}-{session_id}")
+
+    def frames(self):
+        """The server's inference loop for this session: yields JPEG bytes."""
+        raise NotImplementedError
+
+    def reset(self):
+        """Clears the tracking state on (re)connect."""
+        self.session_log = []
+        self.current_db_id = None
+
+    # Camera
+    def connect(self, video_source, ip, is_video_file=False):
+        """Opens video_source and starts reading it; False when it cannot be opened."""
+        self._stop()
+        with self.camera_lock:
+            self._release()
+            self.is_video_file = is_video_file
+            print(f"[{self.id}] Connecting to: {video_source}")
+            try:
+                if isinstance(video_source, str) and video_source.startswith(("http://", "https://")):
+                    print(f"Using HTTPMJPEGStream for {video_source}")
+                    self.camera = HTTPMJPEGStream(video_source, target_width=self.target_width)
+                elif isinstance(video_source, int) and os.name == 'nt':
+                    self.camera = cv2.VideoCapture(video_source, cv2.CAP_DSHOW)
+                else:
+                    self.camera = cv2.VideoCapture(video_source)
+            except Exception as e:
+                print(f"OpenCV Error opening camera: {e}")
+                self.camera = None
+
+            if not (self.camera and self.camera.isOpened()):
+                self.connection_status = "Connection Failed"
+                return False
+            self.connection_status = "Connected"
+            self.current_ip = ip
+
+            # Read a frame to get size for VideoWriter
+            success, frame = self.camera.read()
+            if success:
+                h, w = frame.shape[:2]
+                timestamp = time.strftime("%Y%m%d_%H%M%S")
+                os.makedirs(UPLOAD_DIR, exist_ok=True)
+                save_path = os.path.join(UPLOAD_DIR, f"{self.recording_prefix}_{self.id}_{timestamp}.mp4"
+                                         if self.id != DEFAULT_SESSION else f"{self.recording_prefix}_{timestamp}.mp4")
+                self.video_writer = cv2.VideoWriter(save_path, cv2.VideoWriter_fourcc(*'mp4v'), RECORDING_FPS, (w, h))
+                if not self.frame_queue.full():
+                    self.frame_queue.put((now(), frame))
+
+        self.latency.reset()
+        self._stop_reader = False
+        self._reader = threading.Thread(target=self._read_loop, name=f"camera-{self.id}", daemon=True)
+        self._reader.start()
+        return True
+
+    def disconnect(self):
+        self._stop()
+        with self.camera_lock:
+            self._release()
+            self.connection_status = "Disconnected"
+
+    def _release(self):
+        if self.camera:
+            self.camera.release()
+            self.camera = None
+        if self.video_writer:
+            self.video_writer.release()
+            self.video_writer = None
+
+    def _stop(self):
+        self._stop_reader = True
+        if self._reader is not None:
+            # A video-file reader may be blocked on a full queue: make room so it sees the flag
+            while self._reader.is_alive():
+                self._drain()
+                self._reader.join(timeout=0.1)
+            self._reader = None
+        self._drain()
+
+    def _drain(self):
+        while not self.frame_queue.empty():
+            try:
+                self.frame_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+    def _read_loop(self):
+        while not self._stop_reader:
+            with self.camera_lock:
+                if self.camera is None or not self.camera.isOpened():
+                    success, frame = None, None
+                else:
+                    success, frame = self.camera.read()
+            captured_at = now()
+            if success is None:
+                time.sleep(0.01)
+                continue
+
+            if success:
+                if self.video_writer is not None:
+                    try:
+                        self.video_writer.write(frame)
+                    except Exception as e:
+                        print(f"Error writing to video: {e}")
+
+                if self.is_video_file:
+                    # Block until there is space in the queue to avoid dropping frames for video files
+                    while not self._stop_reader:
+                        try:
+                            self.frame_queue.put((captured_at, frame), timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                else:
+                    # For live webcams, drop oldest frame to maintain realtime
+                    if self.frame_queue.full():
+                        try:
+                            self.frame_queue.get_nowait()
+                            self.latency.drop("queue_full")
+                        except queue.Empty:
+                            pass
+                    self.frame_queue.put((captured_at, frame))
+            else:
+                with self.camera_lock:
+                    self.connection_status = "Video Finished / Interrupted"
+                    self._release()
+                time.sleep(0.1)
+
+    # Pipeline
+    def next_frame(self, timeout=0.1):
+        """(captured_at, frame) the inference loop should process next; raises queue.Empty.
+
+        Uploaded video files are analysed frame by frame, live cameras follow the drop policy.
+        """
+        captured_at, frame = self.frame_queue.get(timeout=timeout)
+        if not self.is_video_file:
+            captured_at, frame = self.drop_policy.select(self.frame_queue, captured_at, frame, self.latency)
+        self.latency.record("queue", captured_at)
+        return captured_at, frame
+
+    def latency_report(self):
+        policy = self.drop_policy.describe() if not self.is_video_file else {'policy': 'fifo (video file)'}
+        return dict(self.latency.snapshot(), session=self.id, **policy)
+
+    def watch(self):
+        """multipart body for one /video_feed viewer; starts the pipeline if needed."""
+        self.worker.ensure_running()
+        return self.broadcaster.stream()
+
+    def close(self):
+        """Disconnects and stops the pipeline; True once nothing uses the session's models any more."""
+        self.disconnect()
+        stopped = self.worker.stop()
+        self.broadcaster.close()
+        return stopped
+
+    def status(self):
+        return {"session": self.id, "status": self.connection_status, "ip": self.current_ip,
+                "video_feed": self.broadcaster.stats()}
+
+
+class LiveSessions:
+    """Session id -> LiveSession, created on first use up to max_sessions."""
+
+    def __init__(self, factory, max_sessions=None):
+        self.factory = factory
+        self.max_sessions = max_sessions or int(os.environ.get(MAX_SESSIONS_ENV, DEFAULT_MAX_SESSIONS))
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def find(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def get(self, session_id):
+        """Existing session or a new one; None when the process is at max_sessions."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                if len(self._sessions) >= self.max_sessions:
+                    return None
+                session = self._sessions[session_id] = self.factory(session_id)
+            return session
+
+    def close(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.close()
+        return session is not None
+
+    def all(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+
+def request_session_id(req):
+    """Session id of a Flask request: ?session=, then the JSON body, else the default session."""
+    sid = req.args.get("session")
+    if not sid and req.is_json:
+        sid = (req.get_json(silent=True) or {}).get("session")
+    return str(sid) if sid else DEFAULT_SESSION
+
+
+def session_for_request(sessions, req, create=False):
+    """The request's session; aborts with 400 (bad id), 404 (unknown id) or 429 (too many cameras)."""
+    from flask import abort
+    sid = request_session_id(req)
+    if not _SESSION_ID.match(sid):
+        abort(400, description=f"Invalid session id: {sid!r}")
+    session = sessions.get(sid) if create else sessions.find(sid)
+    if session is None:
+        if create:
+            abort(429, description=f"Session limit reached ({sessions.max_sessions} cameras per process)")
+        abort(404, description=f"Unknown session: {sid}")
+    return session
@@ -3,10 +3,10 @@ import cv2
 import numpy as np
 import os
 import json
-import joblib
 import mediapipe as mp
-from tensorflow.keras.models import load_model
 import time
+from pose_features import PoseFeatureExtractor
+import model_registry as registry
 
 # ---------------------------
 # SHOT DETECTION CONFIG (from pose_detection/deep2.py)
@@ -20,9 +20,8 @@ SEQ_LEN = 30
 CONF_THRESHOLD = 0.70          # only show predictions above this confidence
 IGNORE_LABELS  = {"Batsman"}   # labels to suppress (background/idle class)
 
-# Load LSTM Model + Scaler + Labels
-shot_model = load_model(SHOT_MODEL_PATH)
-scaler = joblib.load(SCALER_PATH)
+# Load LSTM Model + Scaler + Labels (lstm_final.onnx when exported, TensorFlow only for the .keras fallback)
+shot_model, scaler = registry.shot_classifier(SHOT_MODEL_PATH, SCALER_PATH)
 
 with open(LABEL_MAP_PATH, "r") as f:
     classes = json.load(f)["classes"]
@@ -32,6 +31,7 @@ mp_pose = mp.solutions.pose
 mp_drawing = mp.solutions.drawing_utils
 pose = mp_pose.Pose(min_detection_confidence=0.5, min_tracking_confidence=0.5)
 pose_buffer = []
+pose_features = PoseFeatureExtractor()
 
 # ---------------------------
 # BALL & PITCH MODELS (from main.py)
@@ -178,26 +178,14 @@ while True:
             img_rgb.flags.writeable = True
 
             if res_pose.pose_landmarks:
-                # 1. Adjust landmarks back to global coordinates for drawing
-                # Landmarks are normalized [0,1] relative to the crop
-                crop_w = bx2 - bx1
-                crop_h = by2 - by1
-                
-                # Clone landmarks to modify them for global display without affecting the original feature extraction
-                # Actually, we need global normalized landmarks for the LSTM (likely)
-                feat = []
-                for p in res_pose.pose_landmarks.landmark:
-                    # Global pixel coordinates
-                    gx = (p.x * crop_w + bx1)
-                    gy = (p.y * crop_h + by1)
-                    # Global normalized coordinates [0, 1]
-                    gnx = gx / width
-                    gny = gy / height
-                    
-                    feat.extend([gnx, gny, p.z, p.visibility])
-                    
-                    # Update landmarks in-place for mp_drawing (which uses normalized [0,1] of whatever frame it draws on)
-                    # Since annotated_frame is full width/height, we set them to gnx, gny
+                # 1. Adjust landmarks back to global coordinates
+                # Landmarks are normalized [0,1] relative to the crop; the LSTM uses global normalized ones
+                landmarks = pose_features.read(res_pose.pose_landmarks, (bx1, by1, bx2, by2)).frame_landmarks((width, height))
+                feat = landmarks.reshape(-1)
+
+                # Update landmarks in-place for mp_drawing (which uses normalized [0,1] of whatever frame it draws on)
+                # Since annotated_frame is full width/height, we set them to gnx, gny
+                for p, (gnx, gny) in zip(res_pose.pose_landmarks.landmark, landmarks[:, :2].tolist()):
                     p.x = gnx
                     p.y = gny
 
@@ -215,10 +203,10 @@ while True:
                 # LSTM Prediction
                 if len(pose_buffer) == SEQ_LEN:
                     X = np.array(pose_buffer, dtype=np.float32)
-                    X_scaled = scaler.transform(X)
-                    X_scaled = X_scaled.reshape(1, SEQ_LEN, -1)
+                    X_scaled = scaler.transform(X) if scaler is not None else X
+                    X_scaled = X_scaled.reshape(1, SEQ_LEN, -1).astype(np.float32)
 
-                    preds = shot_model.predict(X_scaled, verbose=0)
+                    preds = registry.predict_shot(shot_model, X_scaled)
                     pred_idx = np.argmax(preds[0])
                     label = classes[pred_idx]
                     conf = float(preds[0][pred_idx])
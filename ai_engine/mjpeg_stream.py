@@ -0,0 +1,324 @@
+"""
+mjpeg_stream.py
+===============
+HTTP MJPEG camera source shared by the live servers.
+
+HTTPMJPEGStream.read() used to append every 8 KB chunk to a bytes object and
+search it for the JPEG start / end markers from the beginning, so a 1080p
+frame of a few hundred KB was rescanned and copied dozens of times before it
+was complete. MJPEGParser keeps one bytearray and remembers where it stopped:
+
+  * marker searches resume from the last scanned offset
+  * when the multipart part header carries Content-Length, the frame end is
+    known as soon as the SOI is found and the JPEG body is never scanned (a
+    length that does not land on an EOI marker falls back to scanning)
+  * complete frames are handed out as memoryview slices of the buffer and
+    decoded in place by cv2.imdecode; consumed bytes are dropped from the
+    front of the buffer only when the next chunk arrives
+
+HTTPMJPEGStream keeps the cv2.VideoCapture-like surface the servers use
+(isOpened / read / release / get).
+
+With target_width set (the width the pipeline resizes to), frames from a
+camera at least twice as wide are decoded at 1/2, 1/4 or 1/8 size by
+libjpeg's DCT scaling (IMREAD_REDUCED_COLOR_*), never below target_width.
+That skips most of the decode and leaves a much smaller resize. The image
+size is read from the JPEG SOF header; source_size / decode_scale tell the
+servers what the frame was reduced from, so manual pitch points given in
+camera pixels keep mapping onto the pipeline frame (see source_size()).
+
+Usage:
+    camera = HTTPMJPEGStream("http://192.168.1.20:8080/video", target_width=1000)
+    ok, frame = camera.read()
+    orig_w, orig_h = source_size(camera, frame)
+
+    python mjpeg_stream.py --bench          # parser vs. the old find-from-start loop
+    python mjpeg_stream.py --bench-decode   # full decode + resize vs. reduced decode + resize
+"""
+
+import argparse
+import re
+import time
+
+import numpy as np
+
+SOI = b"\xff\xd8"
+EOI = b"\xff\xd9"
+CHUNK_SIZE = 64 * 1024
+MAX_BUFFER = 32 << 20  # Drop the buffer if no frame completes within this many bytes
+
+_LENGTH = re.compile(rb"content-length:[ \t]*(\d+)", re.IGNORECASE)
+_SOF_MARKERS = frozenset((0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF))
+REDUCTION_FACTORS = (8, 4, 2)  # libjpeg DCT scaling supported by cv2.imdecode
+
+
+class MJPEGParser:
+    """Incremental JPEG extraction from a multipart/x-mixed-replace byte stream."""
+
+    def __init__(self):
+        self.buf = bytearray()
+        self.pos = 0          # Everything before pos has been consumed
+        self.start = -1       # SOI offset of the frame being assembled
+        self.length = None    # Its Content-Length, when the part header had one
+        self.scan = 0         # Where the next marker search resumes
+        self._view = None
+        self.frames = 0
+        self.length_frames = 0
+
+    def feed(self, chunk):
+        self._release()
+        if self.pos:
+            # bytearray drops a prefix without moving the remaining bytes
+            del self.buf[:self.pos]
+            self.scan -= self.pos
+            if self.start >= 0:
+                self.start -= self.pos
+            self.pos = 0
+        if len(self.buf) > MAX_BUFFER:
+            self.buf.clear()
+            self.start, self.length, self.scan = -1, None, 0
+        self.buf += chunk
+
+    def next_frame(self):
+        """memoryview of the next complete JPEG (valid until the next call / feed), or None."""
+        self._release()
+        buf = self.buf
+        if self.start < 0:
+            soi = buf.find(SOI, self.scan)
+            if soi < 0:
+                self.scan = max(self.pos, len(buf) - 1)  # A trailing 0xFF may start the next SOI
+                return None
+            header = None
+            for header in _LENGTH.finditer(buf, self.pos, soi):
+                pass  # Last Content-Length before the SOI belongs to this part
+            self.start, self.scan = soi, soi + 2
+            self.length = int(header.group(1)) if header else None
+
+        if self.length:
+            end = self.start + self.length
+            if len(buf) < end:
+                return None
+            if buf[end - 2:end] == EOI:
+                self.length_frames += 1
+                return self._emit(end)
+            self.length = None  # Length does not end on an EOI: scan instead
+
+        eoi = buf.find(EOI, self.scan)
+        if eoi < 0:
+            self.scan = max(self.start + 2, len(buf) - 1)
+            return None
+        return self._emit(eoi + 2)
+
+    def _emit(self, end):
+        self._view = memoryview(self.buf)[self.start:end]
+        self.pos = self.scan = end
+        self.start, self.length = -1, None
+        self.frames += 1
+        return self._view
+
+    def _release(self):
+        # The bytearray cannot be resized while a view of it is exported
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+
+
+def jpeg_size(data):
+    """(width, height) from the SOF segment of a JPEG, or None. Walks the header segments only."""
+    i, n = 2, len(data)
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # Fill byte
+            i += 1
+            continue
+        if marker in _SOF_MARKERS:
+            return (data[i + 7] << 8) | data[i + 8], (data[i + 5] << 8) | data[i + 6]
+        if marker == 0xDA:  # Start of scan: no SOF before the image data
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+def reduction_factor(width, target_width):
+    """Largest DCT scale that keeps the decoded width at or above target_width (1 = full size)."""
+    for factor in REDUCTION_FACTORS:
+        if width >= factor * target_width:
+            return factor
+    return 1
+
+
+def reduced_flags(factor):
+    import cv2
+    return getattr(cv2, f"IMREAD_REDUCED_COLOR_{factor}") if factor > 1 else cv2.IMREAD_COLOR
+
+
+def source_size(camera, frame):
+    """(width, height) of the camera image a frame was decoded from, before any DCT reduction."""
+    if getattr(camera, "decode_scale", 1) > 1 and getattr(camera, "source_size", None):
+        return camera.source_size
+    return frame.shape[1], frame.shape[0]
+
+
+def decode_jpeg(view, flags=None):
+    import cv2
+    data = np.frombuffer(view, dtype=np.uint8)
+    frame = cv2.imdecode(data, cv2.IMREAD_COLOR if flags is None else flags)
+    del data
+    return frame
+
+
+class HTTPMJPEGStream:
+    def __init__(self, url, chunk_size=CHUNK_SIZE, target_width=None):
+        self.url = url
+        self.chunk_size = chunk_size
+        self.target_width = target_width
+        self.source_size = None
+        self.decode_scale = 1
+        self._flags = None
+        self.stream = None
+        self.iterator = None
+        self.parser = MJPEGParser()
+        self.opened = False
+        self._connect()
+
+    def _connect(self):
+        import requests
+        try:
+            self.stream = requests.get(self.url, stream=True, timeout=5)
+            self.iterator = self.stream.iter_content(chunk_size=self.chunk_size)
+            self.opened = True
+        except Exception:
+            self.opened = False
+
+    def isOpened(self):
+        return self.opened
+
+    def read(self):
+        if not self.opened:
+            return False, None
+        try:
+            while True:
+                view = self.parser.next_frame()
+                if view is None:
+                    self.parser.feed(next(self.iterator))
+                    continue
+                frame = decode_jpeg(view, self._decode_flags(view))
+                if frame is not None:
+                    return True, frame
+        except StopIteration:
+            self.opened = False
+            return False, None
+        except Exception:
+            self.opened = False
+            return False, None
+
+    def _decode_flags(self, view):
+        if not self.target_width:
+            return None
+        size = jpeg_size(view)
+        if size and size != self.source_size:
+            # New camera resolution: pick the reduction again
+            self.source_size = size
+            self.decode_scale = reduction_factor(size[0], self.target_width)
+            self._flags = reduced_flags(self.decode_scale)
+        return self._flags
+
+    def release(self):
+        self.opened = False
+        if self.stream:
+            self.stream.close()
+
+    def get(self, prop_id):
+        return 0
+
+
+def _legacy_frames(chunks):
+    """The find-from-start loop this module replaces (benchmark / parity reference)."""
+    data = b''
+    for chunk in chunks:
+        data += chunk
+        while True:
+            a = data.find(SOI)
+            b = data.find(EOI)
+            if a == -1 or b == -1:
+                break
+            if b < a:
+                data = data[b + 2:]
+                continue
+            yield data[a:b + 2]
+            data = data[b + 2:]
+
+
+def _parser_frames(chunks):
+    parser = MJPEGParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        view = parser.next_frame()
+        while view is not None:
+            yield bytes(view)
+            view = parser.next_frame()
+
+
+def _synthetic_stream(frames=60, frame_bytes=250_000, chunk=8192, content_length=True, seed=0):
+    rng = np.random.default_rng(seed)
+    parts, jpegs = [], []
+    for _ in range(frames):
+        body = rng.integers(0, 0xFF, frame_bytes, dtype=np.uint8).tobytes()  # No 0xFF: no stray markers
+        jpeg = SOI + body + EOI
+        header = b"--frame\r\nContent-Type: image/jpeg\r\n"
+        if content_length:
+            header += b"Content-Length: %d\r\n" % len(jpeg)
+        parts.append(header + b"\r\n" + jpeg + b"\r\n")
+        jpegs.append(jpeg)
+    stream = b"".join(parts)
+    return [stream[i:i + chunk] for i in range(0, len(stream), chunk)], jpegs
+
+
+def bench(frames=60, frame_bytes=250_000):
+    for content_length in (False, True):
+        chunks, jpegs = _synthetic_stream(frames, frame_bytes, content_length=content_length)
+        print(f"{frames} frames x {frame_bytes // 1000} KB, 8 KB chunks, Content-Length {'on' if content_length else 'off'}")
+        for name, fn in (("legacy", _legacy_frames), ("parser", _parser_frames)):
+            t0 = time.perf_counter()
+            out = list(fn(chunks))
+            ms = (time.perf_counter() - t0) * 1000 / frames
+            print(f"  {name:7s} {ms:7.3f} ms / frame  parity {'OK' if out == jpegs else 'MISMATCH'}")
+
+
+def bench_decode(width=3840, height=2160, target_width=1000, runs=20):
+    import cv2
+    yy, xx = np.mgrid[0:height, 0:width]
+    image = np.dstack([(xx * 255 // width), (yy * 255 // height), ((xx + yy) % 256)]).astype(np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 85])
+    view = memoryview(encoded.tobytes())
+    assert jpeg_size(view) == (width, height)
+    target_height = int(height * target_width / width)
+    factor = reduction_factor(width, target_width)
+
+    def run(flags):
+        frame = decode_jpeg(view, flags)
+        if frame.shape[1] != target_width:
+            frame = cv2.resize(frame, (target_width, target_height))
+        return frame
+
+    print(f"{width}x{height} -> {target_width} px wide, reduction 1/{factor}")
+    for name, flags in (("full", None), (f"reduced_{factor}", reduced_flags(factor))):
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            run(flags)
+        print(f"  {name:10s} {(time.perf_counter() - t0) * 1000 / runs:7.2f} ms / frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", action="store_true", help="Compare the parser with the old find-from-start loop")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--frame-kb", type=int, default=250)
+    parser.add_argument("--bench-decode", action="store_true", help="Time full vs. DCT-reduced decode of a 4K JPEG")
+    args = parser.parse_args()
+    if args.bench_decode:
+        bench_decode()
+    else:
+        bench(args.frames, args.frame_kb * 1000)
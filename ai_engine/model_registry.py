@@ -0,0 +1,197 @@
+"""
+model_registry.py
+=================
+One place that loads, caches and warms up every model the entry points use.
+
+Models are loaded on first request and cached per process under
+(kind, path, options), so the API server, live servers and offline
+processors share a single copy instead of each module loading its own at
+import time. Heavy frameworks (ultralytics, onnxruntime, TensorFlow,
+MediaPipe) are only imported when a model that needs them is requested.
+
+Warm-up runs one dummy inference right after loading so the first real frame
+does not pay for graph compilation and allocations. It is enabled per call
+(warmup=True) or globally with CRICKET_MODEL_WARMUP=1.
+
+load_report() returns the load / warm-up time of every model loaded so far.
+
+Usage:
+    import model_registry as registry
+    ball_model = registry.yolo(registry.YOLO_BALL_PATH, warmup=True)
+    shot_model = registry.shot_model()
+    scaler = registry.shot_scaler()
+    model, scaler = registry.shot_classifier("lstm_final.keras", "scaler.save")  # lstm_final.onnx if exported
+    print(registry.format_load_report())
+"""
+
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+
+# Model Paths
+YOLO_BALL_PATH = os.path.join(MODELS_DIR, "yolo_ball_best.pt")
+YOLO_PITCH_PATH = os.path.join(MODELS_DIR, "yolo_pitch_best.pt")
+YOLO_STUMP_PATH = os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system", "runs", "detect", "train", "weights", "best.pt")
+SHOT_MODEL_PATH = os.path.join(MODELS_DIR, "lstm_shot_v2.onnx")
+SCALER_PATH     = os.path.join(MODELS_DIR, "scaler_v2.save")
+LABEL_MAP_PATH  = os.path.join(MODELS_DIR, "label_map_v2.json")
+
+WARMUP_ENV = "CRICKET_MODEL_WARMUP"
+WARMUP_SHAPE = (640, 640, 3)
+
+_cache = {}
+_report = {}
+_lock = threading.RLock()
+
+
+def _default_warmup():
+    return os.environ.get(WARMUP_ENV, "0").lower() in ("1", "true", "yes")
+
+
+def _get(kind, key, loader, warmer=None, warmup=None):
+    cache_key = (kind,) + key
+    with _lock:
+        if cache_key in _cache:
+            return _cache[cache_key]
+        t0 = time.perf_counter()
+        model = loader()
+        load_ms = (time.perf_counter() - t0) * 1000
+        warmup_ms = None
+        if warmer is not None and (_default_warmup() if warmup is None else warmup):
+            t0 = time.perf_counter()
+            try:
+                warmer(model)
+                warmup_ms = (time.perf_counter() - t0) * 1000
+            except Exception as e:
+                print(f"[registry] warm-up failed for {kind} {key[0]}: {e}")
+        _cache[cache_key] = model
+        _report[cache_key] = {'kind': kind, 'path': key[0], 'load_ms': round(load_ms, 1),
+                              'warmup_ms': round(warmup_ms, 1) if warmup_ms is not None else None}
+        return model
+
+
+def _warm_yolo(model):
+    model(np.zeros(WARMUP_SHAPE, dtype=np.uint8), verbose=False)
+
+
+def _warm_session(session):
+    feeds = {}
+    for inp in session.get_inputs():  # Step models also take state inputs
+        shape = [d if isinstance(d, int) and d > 0 else 1 for d in inp.shape]
+        feeds[inp.name] = np.zeros(shape, dtype=np.float32)
+    session.run(None, feeds)
+
+
+def _warm_pose(pose):
+    pose.process(np.zeros((256, 256, 3), dtype=np.uint8))
+
+
+def yolo(path, warmup=None, backend=None):
+    """YOLO detector on the configured inference backend (see inference_backend)."""
+    def load():
+        from inference_backend import load_yolo
+        return load_yolo(path, backend=backend)
+    return _get("yolo", (path, backend), load, _warm_yolo, warmup)
+
+
+def shot_model(path=SHOT_MODEL_PATH, warmup=None):
+    """ONNX Runtime session for the shot classifier (precision-aware, optionally batched)."""
+    def load():
+        from shot_batcher import load_shot_session
+        return load_shot_session(path)
+    return _get("shot", (path,), load, _warm_session, warmup)
+
+
+def keras_model(path, warmup=None):
+    def load():
+        from tensorflow.keras.models import load_model
+        return load_model(path)
+
+    def warm(model):
+        shape = [d if d else 1 for d in model.input_shape]
+        model.predict(np.zeros(shape, dtype=np.float32), verbose=0)
+    return _get("keras", (path,), load, warm, warmup)
+
+
+def scaler(path=SCALER_PATH):
+    def load():
+        import joblib
+        return joblib.load(path)
+    return _get("scaler", (path,), load)
+
+
+def shot_scaler(model_path=SHOT_MODEL_PATH, path=SCALER_PATH):
+    """Scaler to apply before the shot model; None when it is fused into the graph.
+
+    With a remote shot batcher the server picks the variant, so its answer decides.
+    """
+    from shot_batcher import remote_address
+    if remote_address():
+        fused = shot_model(model_path).scaler_fused
+    else:
+        from inference_backend import scaler_fused
+        fused = scaler_fused(model_path)
+    return None if fused else scaler(path)
+
+
+def onnx_export_path(path):
+    """<stem>.onnx next to a .keras shot model when it has been exported, else path itself."""
+    onnx_path = os.path.splitext(path)[0] + ".onnx"
+    return onnx_path if path.endswith(".keras") and os.path.exists(onnx_path) else path
+
+
+def shot_classifier(path=SHOT_MODEL_PATH, scaler_path=SCALER_PATH, warmup=None):
+    """(model, scaler) for a shot classifier; the ONNX export wins over .keras so TensorFlow stays unloaded."""
+    path = onnx_export_path(path)
+    if path.endswith(".keras"):
+        print(f"[registry] no ONNX export of {os.path.basename(path)}, loading it with TensorFlow "
+              f"(python shot_stream.py --export-window {path})")
+        return keras_model(path, warmup), scaler(scaler_path)
+    return shot_model(path, warmup), shot_scaler(path, scaler_path)
+
+
+def predict_shot(model, window):
+    """(batch, classes) probabilities from an ONNX session or a Keras model."""
+    if hasattr(model, "get_inputs"):
+        return model.run(None, {model.get_inputs()[0].name: window})[0]
+    return model.predict(window, verbose=0)
+
+
+def labels(path=LABEL_MAP_PATH):
+    def load():
+        with open(path, "r") as f:
+            return json.load(f)["classes"]
+    return _get("labels", (path,), load)
+
+
+def new_pose(static_image_mode=False, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+    """Fresh MediaPipe Pose (not cached: it carries per-stream tracking state)."""
+    import mediapipe as mp
+    return mp.solutions.pose.Pose(static_image_mode=static_image_mode, model_complexity=model_complexity,
+                                  min_detection_confidence=min_detection_confidence,
+                                  min_tracking_confidence=min_tracking_confidence)
+
+
+def pose(static_image_mode=False, model_complexity=1, min_detection_confidence=0.5, min_tracking_confidence=0.5, warmup=None):
+    """Shared MediaPipe Pose for callers that already used one process-wide instance."""
+    opts = (static_image_mode, model_complexity, min_detection_confidence, min_tracking_confidence)
+    return _get("pose", ("mediapipe",) + opts, lambda: new_pose(*opts), _warm_pose, warmup)
+
+
+def load_report():
+    with _lock:
+        return [dict(entry) for entry in _report.values()]
+
+
+def format_load_report():
+    lines = []
+    for entry in load_report():
+        warm = f"{entry['warmup_ms']:.0f} ms" if entry['warmup_ms'] is not None else "-"
+        lines.append(f"  {entry['kind']:7s} {os.path.basename(str(entry['path'])):28s} load {entry['load_ms']:8.0f} ms   warm-up {warm}")
+    return "Model load report:\n" + "\n".join(lines) if lines else "Model load report: no models loaded"
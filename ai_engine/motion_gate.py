@@ -0,0 +1,79 @@
+"""
+motion_gate.py
+==============
+Frame-differencing motion gate for the live servers.
+
+Between deliveries the camera watches a still pitch, yet the ball model and
+MediaPipe ran on every frame. The gate diffs a blurred, downscaled grayscale
+copy of each frame against the previous one inside the pitch region. While
+nothing moves it reports idle and the caller skips the detector stack; as
+soon as enough pixels change it reports active and keeps doing so for
+hold_frames after the motion stops, so a delivery is never cut short.
+
+Usage:
+    gate = MotionGate()
+    if gate.update(frame, roi_rect):
+        ... run ball model / pose ...
+"""
+
+import cv2
+
+# Config
+THUMB_WIDTH = 160           # Width of the differencing thumbnail
+DIFF_THRESHOLD = 20         # Per-pixel grey-level change that counts as motion
+MIN_MOTION_FRAC = 0.003     # Fraction of ROI pixels that must change
+HOLD_FRAMES = 45            # Frames to stay active after the last motion
+
+
+class MotionGate:
+    def __init__(self, thumb_width=THUMB_WIDTH, diff_threshold=DIFF_THRESHOLD,
+                 min_motion_frac=MIN_MOTION_FRAC, hold_frames=HOLD_FRAMES):
+        self.thumb_width = thumb_width
+        self.diff_threshold = diff_threshold
+        self.min_motion_frac = min_motion_frac
+        self.hold_frames = hold_frames
+        self.frames = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        self.prev = None
+        self.hold = self.hold_frames  # Start active so the first detections run
+        self.active = True
+
+    def wake(self, *args):
+        """Force full inference for the next hold_frames (e.g. on a scene change)."""
+        self.hold = self.hold_frames
+        self.active = True
+
+    def update(self, frame, roi_rect=None):
+        """True when the detector stack should run on this frame."""
+        h, w = frame.shape[:2]
+        scale = self.thumb_width / w
+        thumb = cv2.resize(frame, (self.thumb_width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        moving = False
+        if self.prev is not None and self.prev.shape == gray.shape:
+            diff = cv2.absdiff(gray, self.prev)
+            if roi_rect:
+                x1, y1, x2, y2 = [int(v * scale) for v in roi_rect]
+                diff = diff[max(0, y1):y2, max(0, x1):x2]
+            if diff.size:
+                changed = cv2.countNonZero(cv2.threshold(diff, self.diff_threshold, 255, cv2.THRESH_BINARY)[1])
+                moving = changed >= self.min_motion_frac * diff.size
+        self.prev = gray
+
+        if moving:
+            self.hold = self.hold_frames
+        elif self.hold > 0:
+            self.hold -= 1
+        self.active = moving or self.hold > 0
+
+        self.frames += 1
+        if not self.active:
+            self.skipped += 1
+        return self.active
+
+    def stats(self):
+        return {'frames': self.frames, 'skipped': self.skipped, 'active': self.active}
@@ -0,0 +1,251 @@
+"""
+pose_cache.py
+=============
+Persistent per-frame pose cache for offline re-analysis.
+
+Re-running an uploaded video with a new shot model or threshold used to
+repeat YOLO and MediaPipe although only the classifier had changed. The
+offline pipelines now record what the classifier consumes on every frame:
+
+  * boxes      (N, 4) int32        crop MediaPipe ran on, -1 = no pose
+  * landmarks  (N, 33, 4) float32  raw landmarks, normalised to the crop
+  * contact    (N,) uint8          ball-on-batsman / bat event of that frame
+  * meta.json  frame count, frame size, fps, versions, pipeline extras
+
+MediaPipe returns float32 landmarks, so the cached arrays rebuild the exact
+feature vectors through PoseFeatureExtractor. The arrays are written and read
+as memory-mapped .npy files: a full match is replayed without loading it.
+
+Entries live in CRICKET_POSE_CACHE (default ai_engine/cache/pose), one
+directory per key. The key is the sha256 of the video content plus the
+versions of everything upstream of the classifier (detector weights,
+backend, MediaPipe, pipeline options); the shot model is deliberately not
+part of it. An entry is written to a temporary directory and renamed into
+place only when the pass completes, so aborted runs never leave a partial
+entry behind.
+
+Usage:
+    versions = {'pipeline': 'process_video', 'ball': model_version(YOLO_BALL_PATH), ...}
+    writer = PoseCacheWriter(video_path, versions, frame_count, (width, height), fps)
+    writer.append(crop_rect or None, landmarks or None, contact)
+    writer.commit(); writer.close()
+
+    cache = open_cache(video_path, versions)
+    for i, feat, contact in cache.iter_features(): ...
+
+    python pose_cache.py --list
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from pose_features import NUM_LANDMARKS, PoseFeatureExtractor
+
+CACHE_ENV = "CRICKET_POSE_CACHE"
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "pose")
+FEATURE_VERSION = 1          # Bump when the cached arrays change meaning
+CHUNK_SIZE = 4 << 20
+ARRAYS = (                   # name, dtype, per-frame shape
+    ("boxes", np.int32, (4,)),
+    ("landmarks", np.float32, (NUM_LANDMARKS, 4)),
+    ("contact", np.uint8, ()),
+)
+
+_hashes = {}
+
+
+def cache_root():
+    return os.environ.get(CACHE_ENV) or DEFAULT_CACHE_DIR
+
+
+def file_sha256(path):
+    """Content hash, memoised per (path, size, mtime) for the life of the process."""
+    st = os.stat(path)
+    memo = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if memo not in _hashes:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        _hashes[memo] = digest.hexdigest()
+    return _hashes[memo]
+
+
+def model_version(path):
+    """Identity of a weights file: name plus content hash ('missing' if absent)."""
+    if not os.path.exists(path):
+        return f"{os.path.basename(path)}:missing"
+    return f"{os.path.basename(path)}:{file_sha256(path)[:16]}"
+
+
+def pose_version(**options):
+    """MediaPipe release plus the Pose options the pipeline created it with."""
+    try:
+        import mediapipe as mp
+        release = getattr(mp, "__version__", "unknown")
+    except ImportError:
+        release = "unavailable"
+    opts = ",".join(f"{k}={options[k]}" for k in sorted(options))
+    return f"mediapipe-{release}({opts})"
+
+
+def detector_env():
+    """Backend / precision settings that change the YOLO detections."""
+    from inference_backend import BACKEND_ENV, PRECISION_ENV
+    return {name: os.environ.get(name, "") for name in (BACKEND_ENV, PRECISION_ENV)}
+
+
+def cache_key(video_path, versions):
+    payload = json.dumps({'video': file_sha256(video_path), 'features': FEATURE_VERSION, 'versions': versions},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class PoseCache:
+    """Read-only view of one cache entry (arrays are memory-mapped)."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        n, files = self.meta['frames'], self.meta['files']
+        self.boxes = np.load(os.path.join(path, files['boxes']), mmap_mode="r")[:n]
+        self.landmarks = np.load(os.path.join(path, files['landmarks']), mmap_mode="r")[:n]
+        self.contact = np.load(os.path.join(path, files['contact']), mmap_mode="r")[:n]
+
+    def __len__(self):
+        return self.meta['frames']
+
+    @property
+    def frame_size(self):
+        return tuple(self.meta['frame_size'])
+
+    @property
+    def extras(self):
+        return self.meta.get('extras', {})
+
+    def iter_features(self, frame_size=None):
+        """(frame index, (132,) features or None, contact) for every cached frame."""
+        frame_size = frame_size or self.frame_size
+        extractor = PoseFeatureExtractor()
+        has_pose = self.boxes[:, 0] >= 0
+        for i in range(len(self)):
+            feat = None
+            if has_pose[i]:
+                extractor.load(self.landmarks[i], self.boxes[i].tolist())
+                feat = extractor.features(frame_size)
+            yield i, feat, bool(self.contact[i])
+
+
+def open_cache(video_path, versions):
+    """PoseCache for this video and versions, or None on a miss."""
+    path = os.path.join(cache_root(), cache_key(video_path, versions))
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return PoseCache(path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"[pose-cache] ignoring unreadable entry {path}: {e}")
+        return None
+
+
+class PoseCacheWriter:
+    """Appends one row per frame into memory-mapped arrays, published by commit()."""
+
+    def __init__(self, video_path, versions, frame_count, frame_size, fps):
+        self.key = cache_key(video_path, versions)
+        self.root = cache_root()
+        os.makedirs(self.root, exist_ok=True)
+        self.tmp = tempfile.mkdtemp(prefix=f".{self.key[:12]}-", dir=self.root)
+        self.meta = {'video': os.path.basename(video_path), 'versions': versions, 'feature_version': FEATURE_VERSION,
+                     'frame_size': [int(v) for v in frame_size], 'fps': fps}
+        self.frames = 0
+        self.committed = False
+        self.arrays = {}
+        self.files = {}
+        self._alloc(max(1, int(frame_count)))
+
+    def _alloc(self, capacity):
+        """(Re)create the arrays with room for capacity frames, keeping the rows written so far."""
+        arrays, files = {}, {}
+        for name, dtype, shape in ARRAYS:
+            files[name] = f"{name}.{capacity}.npy"
+            arrays[name] = np.lib.format.open_memmap(os.path.join(self.tmp, files[name]), "w+", dtype, (capacity,) + shape)
+            if name in self.arrays:
+                # CAP_PROP_FRAME_COUNT was short: carry the rows over to the larger file
+                arrays[name][:self.frames] = self.arrays[name][:self.frames]
+        arrays["boxes"][self.frames:] = -1
+        old = [os.path.join(self.tmp, f) for f in self.files.values()]
+        self.arrays, self.files, self.capacity = arrays, files, capacity
+        for path in old:
+            try:
+                os.remove(path)
+            except OSError:
+                pass  # Still mapped (Windows); removed with the directory
+
+    def append(self, crop_rect, landmarks, contact=False):
+        """One frame: crop_rect / landmarks are None when no pose was found."""
+        if self.frames == self.capacity:
+            self._alloc(self.capacity * 2)
+        i = self.frames
+        if crop_rect is not None and landmarks is not None:
+            self.arrays["boxes"][i] = crop_rect
+            self.arrays["landmarks"][i] = landmarks
+        self.arrays["contact"][i] = bool(contact)
+        self.frames += 1
+
+    def commit(self, extras=None):
+        """Publish the entry (atomic rename of the temporary directory)."""
+        for arr in self.arrays.values():
+            arr.flush()
+        self.arrays = {}
+        self.meta.update(frames=self.frames, files=self.files, extras=extras or {})
+        with open(os.path.join(self.tmp, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+        final = os.path.join(self.root, self.key)
+        try:
+            os.rename(self.tmp, final)
+        except OSError:
+            # Another run of the same video published first; keep theirs
+            shutil.rmtree(self.tmp, ignore_errors=True)
+        self.committed = True
+        return final
+
+    def close(self):
+        """Drop the temporary files of an uncommitted (aborted) pass."""
+        if not self.committed:
+            self.arrays = {}
+            shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def list_entries(root=None):
+    root = root or cache_root()
+    if not os.path.isdir(root):
+        return
+    for name in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, name, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            size = sum(e.stat().st_size for e in os.scandir(os.path.join(root, name)))
+            print(f"{name[:16]}  {meta['video']:30s} {meta['frames']:7d} frames  {size / 1e6:8.1f} MB  "
+                  f"{meta['versions'].get('pipeline', '?')}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--list", action="store_true", help="List cache entries")
+    parser.add_argument("--clear", action="store_true", help="Delete every cache entry")
+    args = parser.parse_args()
+
+    if args.clear:
+        shutil.rmtree(cache_root(), ignore_errors=True)
+        print(f"Cleared {cache_root()}")
+    else:
+        list_entries()
@@ -0,0 +1,126 @@
+"""
+pose_features.py
+================
+One landmark-to-feature path for every pose consumer.
+
+The shot pipelines each walked res_pose.pose_landmarks.landmark in Python,
+extending a list with four floats per landmark, and BatsmanPoseDetector had
+its own per-landmark loop for the leg keypoints. PoseFeatureExtractor reads
+the 33 landmarks into a (33, 4) array in a single pass and does the
+crop-to-frame mapping with NumPy broadcasting. The same read serves both the
+132-value LSTM feature vector and the knee / ankle pixel positions.
+
+Feature layout (unchanged): [x, y, z, visibility] per landmark, with x / y
+mapped from the batsman crop to the full frame and normalised to [0, 1].
+
+Usage:
+    extractor = PoseFeatureExtractor()
+    extractor.read(res_pose.pose_landmarks, (bx1, by1, bx2, by2))
+    feat = extractor.features((width, height))   # (132,) float32
+    legs = extractor.points()                    # [(x, y), ...] knee / ankle pixels
+
+    python pose_features.py --bench
+"""
+
+import argparse
+import timeit
+
+import numpy as np
+
+NUM_LANDMARKS = 33
+LEG_LANDMARKS = (25, 26, 27, 28)  # Knees and ankles
+
+
+class PoseFeatureExtractor:
+    def __init__(self):
+        self.landmarks = None  # (33, 4) float64, x / y normalised to the crop
+        self._size = np.ones(2)
+        self._origin = np.zeros(2)
+
+    def read(self, pose_landmarks, crop_rect):
+        """Single pass over a MediaPipe landmark list detected on crop_rect = (x1, y1, x2, y2)."""
+        lms = pose_landmarks.landmark
+        landmarks = np.fromiter((v for p in lms for v in (p.x, p.y, p.z, p.visibility)),
+                                dtype=np.float64, count=4 * len(lms)).reshape(-1, 4)
+        return self.load(landmarks, crop_rect)
+
+    def load(self, landmarks, crop_rect):
+        """Same as read() from a (33, 4) array already in crop coordinates (e.g. the pose cache)."""
+        self.landmarks = np.asarray(landmarks, dtype=np.float64)
+        x1, y1, x2, y2 = crop_rect
+        self._size = np.array((x2 - x1, y2 - y1), dtype=np.float64)
+        self._origin = np.array((x1, y1), dtype=np.float64)
+        return self
+
+    def frame_landmarks(self, frame_size):
+        """(33, 4) float32 with x / y normalised to a frame of frame_size = (width, height)."""
+        out = self.landmarks.copy()
+        out[:, :2] = (out[:, :2] * self._size + self._origin) / np.asarray(frame_size, dtype=np.float64)
+        return out.astype(np.float32)
+
+    def features(self, frame_size):
+        """Flat (132,) LSTM feature vector."""
+        return self.frame_landmarks(frame_size).reshape(-1)
+
+    def pixels(self):
+        """(33, 2) float landmark positions in full-frame pixels."""
+        return self.landmarks[:, :2] * self._size + self._origin
+
+    def points(self, indices=LEG_LANDMARKS):
+        """Pixel positions in the full frame (truncated like int(lm.x * crop_w) + x1)."""
+        px = np.trunc(self.landmarks[list(indices), :2] * self._size).astype(int) + self._origin.astype(int)
+        return [tuple(p) for p in px.tolist()]
+
+
+def _legacy(pose_landmarks, crop_rect, frame_size):
+    """The per-landmark loops this module replaces (benchmark / parity reference)."""
+    bx1, by1, bx2, by2 = crop_rect
+    cw, ch = bx2 - bx1, by2 - by1
+    width, height = frame_size
+    feat = []
+    for p in pose_landmarks.landmark:
+        feat.extend([(p.x * cw + bx1) / width, (p.y * ch + by1) / height, p.z, p.visibility])
+    legs = []
+    for idx in LEG_LANDMARKS:
+        lm = pose_landmarks.landmark[idx]
+        legs.append((int(lm.x * cw) + bx1, int(lm.y * ch) + by1))
+    return np.array(feat, dtype=np.float32), legs
+
+
+def _sample_landmarks(seed=0):
+    rng = np.random.default_rng(seed)
+    values = rng.uniform(-0.1, 1.1, (NUM_LANDMARKS, 4))
+    try:
+        from mediapipe.framework.formats import landmark_pb2
+        result = landmark_pb2.NormalizedLandmarkList()
+        for x, y, z, vis in values:
+            result.landmark.add(x=x, y=y, z=z, visibility=vis)
+        return result
+    except ImportError:
+        from types import SimpleNamespace
+        return SimpleNamespace(landmark=[SimpleNamespace(x=x, y=y, z=z, visibility=vis) for x, y, z, vis in values])
+
+
+def bench(runs=20000):
+    landmarks = _sample_landmarks()
+    crop, frame_size = (412, 180, 583, 471), (1000, 562)
+    extractor = PoseFeatureExtractor()
+
+    def new():
+        extractor.read(landmarks, crop)
+        return extractor.features(frame_size), extractor.points()
+
+    ref_feat, ref_legs = _legacy(landmarks, crop, frame_size)
+    feat, legs = new()
+    print(f"parity: max |diff| {np.abs(ref_feat - feat).max():.1e}, legs equal {ref_legs == legs}")
+    for name, fn in (("loops", lambda: _legacy(landmarks, crop, frame_size)), ("extractor", new)):
+        us = min(timeit.repeat(fn, number=runs, repeat=3)) / runs * 1e6
+        print(f"  {name:9s} {us:7.2f} us / frame")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bench", action="store_true", help="Time the extractor against the per-landmark loops")
+    parser.add_argument("--runs", type=int, default=20000)
+    args = parser.parse_args()
+    bench(args.runs)
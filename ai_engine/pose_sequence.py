@@ -0,0 +1,81 @@
+"""
+pose_sequence.py
+================
+Fixed-length pose sequence buffer feeding the LSTM shot classifier.
+
+The entry points kept the last 30 feature rows in a Python list, popped the
+front on every frame and rebuilt + rescaled the whole (30, 132) array before
+each classifier call. PoseSequenceBuffer preallocates the storage once,
+scales every row a single time when it is appended, and hands out the
+window as a contiguous (1, 30, 132) float32 view that can go straight into
+session.run() / model.predict() without a copy.
+
+The ring is stored twice over (2 * seq_len rows, each row written at i and
+i + seq_len), so the oldest-to-newest window is always one contiguous slice.
+
+Usage:
+    buf = PoseSequenceBuffer(SEQ_LEN, scaler=scaler)
+    buf.append(feat)
+    if buf.full:
+        preds = shot_model.run(None, {input_name: buf.window()})
+"""
+
+import numpy as np
+
+SEQ_LEN = 30
+NUM_FEATURES = 33 * 4  # MediaPipe landmarks x (x, y, z, visibility)
+
+
+class PoseSequenceBuffer:
+    def __init__(self, seq_len=SEQ_LEN, num_features=NUM_FEATURES, scaler=None):
+        self.seq_len = seq_len
+        self.num_features = num_features
+        self._rows = np.zeros((2 * seq_len, num_features), dtype=np.float32)
+        self._head = 0   # Slot the next row is written to
+        self._count = 0  # Valid rows ending at _head
+        self.set_scaler(scaler)
+
+    def set_scaler(self, scaler):
+        """Fit-time scaler applied per row on insert (None = rows stored as given)."""
+        self.scaler = scaler
+        self._mean = self._scale = None
+        if scaler is None:
+            return
+        # StandardScaler: (x - mean_) / scale_ on one row is exactly what transform() does
+        mean, scale = getattr(scaler, "mean_", None), getattr(scaler, "scale_", None)
+        if scale is not None or mean is not None:
+            self._mean = np.asarray(mean if mean is not None else 0.0, dtype=np.float32)
+            self._scale = np.asarray(scale if scale is not None else 1.0, dtype=np.float32)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def full(self):
+        return self._count == self.seq_len
+
+    def append(self, feat):
+        """Scale one feature row and push it, evicting the oldest row when full."""
+        row = self._rows[self._head]
+        row[:] = feat
+        if self._scale is not None:
+            row -= self._mean
+            row /= self._scale
+        elif self.scaler is not None:
+            row[:] = self.scaler.transform(row[None])[0]
+        self._rows[self._head + self.seq_len] = row
+        self._head = (self._head + 1) % self.seq_len
+        self._count = min(self._count + 1, self.seq_len)
+
+    def window(self):
+        """Scaled rows oldest->newest as a (1, seq_len, F) view; valid until the next append."""
+        if not self.full:
+            raise ValueError(f"pose sequence has {self._count}/{self.seq_len} rows")
+        return self._rows[self._head:self._head + self.seq_len][None]
+
+    def drop_oldest(self, n=1):
+        """Forget the n oldest rows (the old `pose_buffer = pose_buffer[1:]`)."""
+        self._count = max(0, self._count - n)
+
+    def clear(self):
+        self._count = 0
@@ -1,28 +1,28 @@
 import cv2
 import sys
-import os
 import argparse
+import base64
 import numpy as np
-import mediapipe as mp
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
+from lazy_imports import lazy_import, preload
+mp = lazy_import("mediapipe")
+mp_drawing = lazy_import("mediapipe", "solutions.drawing_utils")
+mp_pose = lazy_import("mediapipe", "solutions.pose")
 import warnings
-from ultralytics import YOLO
 from hawk_eye_engine import estimate_speed, swing_amount, spin_intensity, get_ball_type
+from frame_pipeline import StagePipeline
+from scene_change import SceneChangeDetector, CUT
+from roi_inference import pitch_crop_rect, predict_in_rois
+from pose_sequence import PoseSequenceBuffer
+from pose_features import PoseFeatureExtractor
+from batsman_tracker import BatsmanTracker
+from pose_cache import PoseCacheWriter, open_cache, model_version, pose_version, detector_env
+import model_registry as registry
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
 
-# Constants
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODELS_DIR = os.path.join(BASE_DIR, 'models')
-
 # Model Paths
-YOLO_BALL_PATH = os.path.join(MODELS_DIR, "yolo_ball_best.pt")
-YOLO_PITCH_PATH = os.path.join(MODELS_DIR, "yolo_pitch_best.pt")
-SHOT_MODEL_PATH = os.path.join(MODELS_DIR, "lstm_shot_v2.onnx")
-SCALER_PATH     = os.path.join(MODELS_DIR, "scaler_v2.save")
-LABEL_MAP_PATH  = os.path.join(MODELS_DIR, "label_map_v2.json")
+from model_registry import YOLO_BALL_PATH, YOLO_PITCH_PATH, SHOT_MODEL_PATH, SCALER_PATH, LABEL_MAP_PATH
 
 # Config
 SEQ_LEN = 30
@@ -30,6 +30,7 @@ CONF_THRESHOLD = 0.70
 IGNORE_LABELS  = {"Batsman"}
 SHOT_DISPLAY_FRAMES = 15
 MAX_MISSING_FRAMES = 10
+BATCH_SIZE = 8  # Frames decoded ahead and sent to the ball model in one call (1 = per-frame)
 
 
 def draw_trail(frame, track):
@@ -46,8 +47,145 @@ def draw_trail(frame, track):
         cv2.circle(frame, pt, r, (0, 255, 255), -1)
     return frame
 
-def process_video(input_path, output_path, mode="mediapipe", models_dict=None):
+def read_batch(cap, batch_size):
+    frames = []
+    while len(frames) < batch_size:
+        ret, frame = cap.read()
+        if not ret: break
+        frames.append(frame)
+    return frames
+
+def iter_batches(cap, batch_size, frame_limit=None):
+    remaining = frame_limit
+    while cap.isOpened():
+        if remaining is not None:
+            if remaining <= 0: break
+            batch_size = min(batch_size, remaining)
+        frames = read_batch(cap, batch_size)
+        if not frames: break
+        if remaining is not None:
+            remaining -= len(frames)
+        yield frames
+
+def parse_ball_results(result, names):
+    all_batsmen = []
+    all_bats = []
+    ball_box = None
+    for box in result.boxes:
+        cls_id = int(box.cls[0])
+        cls_name = names[cls_id].lower()
+        x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+        
+        if cls_name == 'batsman' or cls_id == 2: 
+            all_batsmen.append([x1, y1, x2, y2])
+        elif cls_name == 'bat' or cls_id == 1: 
+            all_bats.append([x1, y1, x2, y2])
+        elif cls_name == 'ball' or cls_id == 0: 
+            ball_box = [x1, y1, x2, y2]
+    return all_batsmen, all_bats, ball_box
+
+def bat_near(bman, all_bats, pad=20):
+    """First bat whose center is within (or close to) the person box."""
+    for bat in all_bats:
+        bat_cx, bat_cy = (bat[0]+bat[2])//2, (bat[1]+bat[3])//2
+        if (bman[0]-pad) <= bat_cx <= (bman[2]+pad) and (bman[1]-pad) <= bat_cy <= (bman[3]+pad):
+            return bat
+    return None
+
+def select_batsman(all_batsmen, all_bats, pitch_boxes):
+    """The REAL Batsman: first person on the pitch with a bat next to him."""
+    for bman in all_batsmen:
+        # 1. Check if on Pitch
+        cx, cy = (bman[0]+bman[2])//2, (bman[1]+bman[3])//2
+        on_pitch = False
+        for pbox in pitch_boxes:
+            if isinstance(pbox[0], (list, tuple)):
+                px1, py1, px2, py2 = min(p[0] for p in pbox), min(p[1] for p in pbox), max(p[0] for p in pbox), max(p[1] for p in pbox)
+            else:
+                px1, py1, px2, py2 = pbox
+            if px1 <= cx <= px2 and py1 <= cy <= py2:
+                on_pitch = True; break
+
+        # 2. Check if has Bat (proximity check)
+        if on_pitch and bat_near(bman, all_bats):
+            return bman
+    return None
+
+POSE_COMPLEXITY = 2
+
+def new_pose_detector():
+    return registry.new_pose(model_complexity=POSE_COMPLEXITY)
+
+def load_models(warmup=None, pose=True):
+    """pose=False leaves 'pose_detector' to the caller (chunk workers build one per chunk)."""
+    return {
+        'ball_model': registry.yolo(YOLO_BALL_PATH, warmup=warmup),
+        'pitch_model': registry.yolo(YOLO_PITCH_PATH, warmup=warmup),
+        'shot_model': registry.shot_model(SHOT_MODEL_PATH, warmup=warmup),
+        'scaler': registry.shot_scaler(SHOT_MODEL_PATH, SCALER_PATH),
+        'classes': registry.labels(LABEL_MAP_PATH),
+        'pose_detector': new_pose_detector() if pose else None,
+    }
+
+def cache_versions(mode, roi_crop):
+    """Everything upstream of the shot classifier that the cached poses depend on."""
+    return {'pipeline': 'process_video', 'ball': model_version(YOLO_BALL_PATH), 'pitch': model_version(YOLO_PITCH_PATH),
+            'pose': pose_version(model_complexity=POSE_COMPLEXITY), 'detector': detector_env(),
+            'mode': mode, 'roi_crop': roi_crop}
+
+def classify_shot(shot_model, pose_buffer, classes):
+    """Run the LSTM on a full buffer: (label, conf) of an accepted shot (buffer cleared) or ("", 0.0)."""
+    ort_inputs = {shot_model.get_inputs()[0].name: pose_buffer.window()}
+    preds = shot_model.run(None, ort_inputs)[0]
+    idx = np.argmax(preds[0])
+    if classes[idx] not in IGNORE_LABELS and preds[0][idx] >= CONF_THRESHOLD:
+        pose_buffer.clear()
+        return classes[idx], float(preds[0][idx])
+    return "", 0.0
+
+def rescore_video(cache, models_dict=None):
+    """Shot classification replayed from a pose cache entry: no decoding, YOLO or MediaPipe."""
+    import json
+    if not models_dict:
+        models_dict = {'shot_model': registry.shot_model(SHOT_MODEL_PATH),
+                       'scaler': registry.shot_scaler(SHOT_MODEL_PATH, SCALER_PATH),
+                       'classes': registry.labels(LABEL_MAP_PATH)}
+    shot_model, classes = models_dict['shot_model'], models_dict['classes']
+    pose_buffer = PoseSequenceBuffer(SEQ_LEN, scaler=models_dict.get('scaler'))
+    latched_shot_label = None
+    latched_shot_conf = 0.0
+    shot_display_countdown = 0
+    total = len(cache)
+    yield f"data: {json.dumps({'progress': f'Re-scoring {total} cached frames'})}\n\n"
+
+    # Same shot / latch logic as analyse_stage, fed from the cached landmarks
+    for i, feat, contact in cache.iter_features():
+        current_shot_label, current_shot_conf = "", 0.0
+        if feat is not None:
+            pose_buffer.append(feat)
+            if pose_buffer.full:
+                current_shot_label, current_shot_conf = classify_shot(shot_model, pose_buffer, classes)
+        if contact and current_shot_label:
+            latched_shot_label, latched_shot_conf = current_shot_label, current_shot_conf
+            shot_display_countdown = SHOT_DISPLAY_FRAMES
+        if shot_display_countdown > 0:
+            shot_display_countdown -= 1
+            if shot_display_countdown == 0:
+                latched_shot_label = None
+        if (i + 1) % 1000 == 0:
+            yield f"data: {json.dumps({'progress': f'Frame {i + 1}/{total}'})}\n\n"
+
+    if latched_shot_label:
+        final_res = {"class_name": latched_shot_label, "conf": latched_shot_conf}
+        yield f"data: {json.dumps({'final_result': final_res})}\n\n"
+
+    yield f"data: {json.dumps({'progress': 'Re-scoring complete (no output video).'})}\n\n"
+
+def process_video(input_path, output_path, mode="mediapipe", models_dict=None, batch_size=BATCH_SIZE, pipelined=True,
+                  start_frame=0, end_frame=None, warmup_frames=0, roi_crop=True, pose_cache=True, rescore=False):
     import json
+    if not models_dict and not rescore:
+        preload("ultralytics", "mediapipe")  # Overlap the framework imports with opening / hashing the video
     yield f"data: {json.dumps({'progress': f'Starting analysis: {input_path} with mode {mode}'})}\n\n"
     
     manual_pitch_pts = []
@@ -65,33 +203,26 @@ def process_video(input_path, output_path, mode="mediapipe", models_dict=None):
     width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
     height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = int(cap.get(cv2.CAP_PROP_FPS)) or 30
+
+    # Full-video runs record the poses; rescore replays them when the vision models have not changed
+    full_run = start_frame == 0 and end_frame is None
+    versions = cache_versions(mode, roi_crop) if (pose_cache and full_run) or rescore else None
+    if rescore:
+        cache = open_cache(input_path, versions)
+        if cache is not None:
+            cap.release()
+            yield from rescore_video(cache, models_dict)
+            return
+        yield f"data: {json.dumps({'progress': 'No pose cache for this video yet, running the full analysis'})}\n\n"
     
     # Load Models or use provided
     mp_pose = mp.solutions.pose
     
-    if models_dict:
-        ball_model = models_dict.get('ball_model')
-        pitch_model = models_dict.get('pitch_model')
-        shot_model = models_dict.get('shot_model')
-        scaler = models_dict.get('scaler')
-        classes = models_dict.get('classes')
-        pose = models_dict.get('pose_detector')
-        if hasattr(pose, 'pose'):
-            pose = pose.pose
-    else:
+    if not models_dict:
         try:
-            import onnxruntime as ort
-            import joblib
-            
             yield f"data: {json.dumps({'progress': 'Loading Models...'})}\n\n"
-            ball_model = YOLO(YOLO_BALL_PATH, task='detect')
-            pitch_model = YOLO(YOLO_PITCH_PATH, task='detect')
-            shot_model = ort.InferenceSession(SHOT_MODEL_PATH)
-            scaler = joblib.load(SCALER_PATH)
-            with open(LABEL_MAP_PATH, "r") as f:
-                classes = json.load(f)["classes"]
-                
-            pose = mp_pose.Pose(static_image_mode=False, min_detection_confidence=0.5, min_tracking_confidence=0.5, model_complexity=2)
+            models_dict = load_models()
+            yield f"data: {json.dumps({'progress': registry.format_load_report()})}\n\n"
         except Exception as e:
             import traceback
             err_msg = str(e)
@@ -99,6 +230,22 @@ def process_video(input_path, output_path, mode="mediapipe", models_dict=None):
             yield f"data: {json.dumps({'error': f'Init Error: {err_msg}'})}\n\n"
             return
 
+    ball_model = models_dict.get('ball_model')
+    pitch_model = models_dict.get('pitch_model')
+    shot_model = models_dict.get('shot_model')
+    scaler = models_dict.get('scaler')
+    classes = models_dict.get('classes')
+    pose = models_dict.get('pose_detector')
+    if hasattr(pose, 'pose'):
+        pose = pose.pose
+
+    # Frame range (chunked mode): warm-up frames before start_frame rebuild the
+    # tracking state but are not written to the output
+    read_start = max(0, start_frame - warmup_frames)
+    if read_start > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, read_start)
+    frame_limit = None if end_frame is None else max(0, end_frame - read_start)
+
     # Use 'avc1' for H264 (better browser support)
     fourcc = cv2.VideoWriter_fourcc(*'avc1')
     out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
@@ -109,7 +256,25 @@ def process_video(input_path, output_path, mode="mediapipe", models_dict=None):
         fourcc = cv2.VideoWriter_fourcc(*'mp4v')
         out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
 
-    pose_buffer = []
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    batch_size = max(1, int(batch_size))
+
+    cache_writer = None
+    if pose_cache and full_run:
+        try:
+            cache_writer = PoseCacheWriter(input_path, versions, total_frames, (width, height), fps)
+        except OSError as e:
+            print(f"[pose-cache] not writing a cache entry: {e}", flush=True)
+
+    # Detection state (owned by the detect stage)
+    detect_frame_idx = read_start
+    pitch_boxes = []
+    scene = SceneChangeDetector()
+
+    # Tracking state (owned by the analyse stage)
+    pose_buffer = PoseSequenceBuffer(SEQ_LEN, scaler=scaler)
+    pose_features = PoseFeatureExtractor()
+    batsman_tracker = BatsmanTracker()
     ball_track = []
     frames_without_ball = 0
     ball_hit_bat = False
@@ -117,223 +282,229 @@ def process_video(input_path, output_path, mode="mediapipe", models_dict=None):
     latched_shot_label = None
     latched_shot_conf = 0.0
     shot_display_countdown = 0
-    
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frame_idx = 0
+    frame_idx = read_start
+
+    def detect_stage(frames):
+        nonlocal detect_frame_idx, pitch_boxes
 
-    pitch_boxes = []
-    
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret: break
-        frame_idx += 1
-        
-        if frame_idx % 10 == 0: 
-            import json
-            yield f"data: {json.dumps({'progress': f'Frame {frame_idx}/{total_frames}'})}\n\n"
-        
         # 1. Pitch Detection (Optimized: Detect every 100 frames since it's static)
-        if (frame_idx == 1 or frame_idx % 100 == 0) and (mode == "auto" or mode == "mediapipe"):
-            res_pitch = pitch_model.predict(frame, conf=0.5, verbose=False)
-            pitch_boxes = []
-            for res in res_pitch:
-                for box in res.boxes:
-                    if int(box.cls[0]) == 1:
-                        px1, py1, px2, py2 = box.xyxy[0].tolist()
-                        pitch_boxes.append((px1, py1, px2, py2))
-        elif manual_pitch_pts and not pitch_boxes:
-            pitch_boxes = [tuple(manual_pitch_pts)]
-        
-        # Draw pitch boxes
-        for pbox in pitch_boxes:
-            if len(pbox) == 4 and isinstance(pbox[0], (list, tuple)): # 4 points
-                pts = np.array(pbox, np.int32).reshape((-1, 1, 2))
-                cv2.polylines(frame, [pts], isClosed=True, color=(255, 255, 0), thickness=2)
-            elif len(pbox) == 4:
-                cv2.rectangle(frame, (int(pbox[0]), int(pbox[1])), (int(pbox[2]), int(pbox[3])), (255, 255, 0), 2)
-
-        # Strict Pitch Validation
-        pitch_valid = len(pitch_boxes) > 0
-
-        all_batsmen = []
-        all_bats = []
-        ball_box = None
-        best_bat = None
-        best_batsman = None
-
-        if pitch_valid:
-            # 2. YOLO Ball, Bat, Batsman
-            results_ball = ball_model(frame, verbose=False, conf=0.15)
+        batch_pitch_boxes = []
+        batch_scene_events = []
+        for frame in frames:
+            detect_frame_idx += 1
+            # Cuts and pans move the pitch: re-detect straight away instead of waiting for the next refresh
+            scene_event = scene.update(frame, detect_frame_idx)
+            batch_scene_events.append(scene_event)
+            if (detect_frame_idx == read_start + 1 or detect_frame_idx % 100 == 0 or scene_event) and (mode == "auto" or mode == "mediapipe"):
+                res_pitch = pitch_model.predict(frame, conf=0.5, verbose=False)
+                pitch_boxes = []
+                for res in res_pitch:
+                    for box in res.boxes:
+                        if int(box.cls[0]) == 1:
+                            px1, py1, px2, py2 = box.xyxy[0].tolist()
+                            pitch_boxes.append((px1, py1, px2, py2))
+            elif manual_pitch_pts and not pitch_boxes:
+                pitch_boxes = [tuple(manual_pitch_pts)]
             
-            for box in results_ball[0].boxes:
-                cls_id = int(box.cls[0])
-                cls_name = ball_model.names[cls_id].lower()
-                conf = float(box.conf[0])
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
+            # Draw pitch boxes
+            for pbox in pitch_boxes:
+                if len(pbox) == 4 and isinstance(pbox[0], (list, tuple)): # 4 points
+                    pts = np.array(pbox, np.int32).reshape((-1, 1, 2))
+                    cv2.polylines(frame, [pts], isClosed=True, color=(255, 255, 0), thickness=2)
+                elif len(pbox) == 4:
+                    cv2.rectangle(frame, (int(pbox[0]), int(pbox[1])), (int(pbox[2]), int(pbox[3])), (255, 255, 0), 2)
+            batch_pitch_boxes.append(pitch_boxes)
+
+        # 2. YOLO Ball, Bat, Batsman (one call for every frame of the batch on a valid pitch, cropped to the pitch)
+        batch_results = [None] * len(frames)
+        valid_offsets = [i for i, boxes in enumerate(batch_pitch_boxes) if len(boxes) > 0]
+        if valid_offsets:
+            rects = [pitch_crop_rect(frames[i].shape, pitch_roi=batch_pitch_boxes[i]) if roi_crop else None for i in valid_offsets]
+            results_ball = predict_in_rois(ball_model, [frames[i] for i in valid_offsets], rects, verbose=False, conf=0.15)
+            for i, res in zip(valid_offsets, results_ball):
+                batch_results[i] = res
+        return list(zip(frames, batch_pitch_boxes, batch_results, batch_scene_events))
+
+    def analyse_stage(batch):
+        nonlocal ball_track, frames_without_ball, ball_hit_bat, latched_shot_label, latched_shot_conf, shot_display_countdown, frame_idx
+        records = []
+
+        # Replay tracking, pose and hit-detection state over the batch in frame order
+        for frame, pitch_boxes, res_ball, scene_event in batch:
+            frame_idx += 1
+
+            # A camera cut breaks the ball track: positions from the old view are meaningless
+            if scene_event == CUT:
+                ball_track = []
+                frames_without_ball = 0
+                ball_hit_bat = False
+                batsman_tracker.reset()
+
+            # Strict Pitch Validation
+            pitch_valid = len(pitch_boxes) > 0
+
+            all_batsmen = []
+            all_bats = []
+            ball_box = None
+            best_bat = None
+            best_batsman = None
+
+            if pitch_valid and res_ball is not None:
+                all_batsmen, all_bats, ball_box = parse_ball_results(res_ball, ball_model.names)
+                
+            # 3. Logic: Find the REAL Batsman (Person with Bat inside Pitch), or keep the crop tracked from the last pose
+            batsman_box = None
+            if pitch_valid:
+                batsman_box = batsman_tracker.select(lambda: select_batsman(all_batsmen, all_bats, pitch_boxes))
+                best_batsman = batsman_box
+                best_bat = bat_near(batsman_box, all_bats) if batsman_box else None
+
+            if all_batsmen or batsman_box:
+                # Draw best batsman
+                if best_batsman:
+                    cv2.rectangle(frame, (best_batsman[0], best_batsman[1]), (best_batsman[2], best_batsman[3]), (0, 255, 0), 2)
+                    cv2.putText(frame, "Batsman", (best_batsman[0], best_batsman[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
                 
-                if cls_name == 'batsman' or cls_id == 2: 
-                    all_batsmen.append([x1, y1, x2, y2])
-                elif cls_name == 'bat' or cls_id == 1: 
-                    all_bats.append([x1, y1, x2, y2])
-                elif cls_name == 'ball' or cls_id == 0: 
-                    ball_box = [x1, y1, x2, y2]
+                # Draw bat
+                if best_bat:
+                    cv2.rectangle(frame, (best_bat[0], best_bat[1]), (best_bat[2], best_bat[3]), (0, 165, 255), 2)
+                    cv2.putText(frame, "Bat", (best_bat[0], best_bat[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 165, 255), 2)
                 
-        # 3. Logic: Find the REAL Batsman (Person with Bat inside Pitch)
-        batsman_box = None
-        if all_batsmen:
-            for bman in all_batsmen:
-                # 1. Check if on Pitch
-                cx, cy = (bman[0]+bman[2])//2, (bman[1]+bman[3])//2
-                on_pitch = False
+                # Draw ball
+                if ball_box:
+                    cv2.rectangle(frame, (ball_box[0], ball_box[1]), (ball_box[2], ball_box[3]), (0, 0, 255), 2)
+
+            # 4. Pose & Shot Analysis (Only for the Batsman)
+            current_shot_label = ""
+            current_shot_conf = 0.0
+            pose_rect = None
+            contact = False
+            if batsman_box:
+                bx1, by1, bx2, by2 = map(int, batsman_box)
+                bx1, by1, bx2, by2 = max(0, bx1), max(0, by1), min(width, bx2), min(height, by2)
+                crop = frame[by1:by2, bx1:bx2]
+                if crop.size > 0:
+                    res_pose = pose.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
+                    if not res_pose.pose_landmarks:
+                        batsman_tracker.update(None, frame.shape)
+                    else:
+                        mp_drawing.draw_landmarks(crop, res_pose.pose_landmarks, mp_pose.POSE_CONNECTIONS)
+                        pose_rect = (bx1, by1, bx2, by2)
+                        pose_features.read(res_pose.pose_landmarks, pose_rect)
+                        batsman_tracker.update(pose_features, frame.shape)
+                        pose_buffer.append(pose_features.features((width, height)))
+                        if pose_buffer.full:
+                            current_shot_label, current_shot_conf = classify_shot(shot_model, pose_buffer, classes)
+
+            # 5. Ball Tracking (Only if inside Pitch)
+            if ball_box:
+                x1, y1, x2, y2 = ball_box
+                cx, cy = int((x1+x2)/2), int((y1+y2)/2)
+            
+                # Constraint: Must be near pitch
+                near_pitch = False
                 for pbox in pitch_boxes:
                     if isinstance(pbox[0], (list, tuple)):
                         px1, py1, px2, py2 = min(p[0] for p in pbox), min(p[1] for p in pbox), max(p[0] for p in pbox), max(p[1] for p in pbox)
                     else:
                         px1, py1, px2, py2 = pbox
-                    if px1 <= cx <= px2 and py1 <= cy <= py2:
-                        on_pitch = True; break
-                
-                if not on_pitch: continue # Skip if not on pitch
-                
-                # 2. Check if has Bat (proximity check)
-                has_bat = False
-                for bat in all_bats:
-                    # If bat center is within person box or close
-                    bat_cx, bat_cy = (bat[0]+bat[2])//2, (bat[1]+bat[3])//2
-                    if (bman[0]-20) <= bat_cx <= (bman[2]+20) and (bman[1]-20) <= bat_cy <= (bman[3]+20):
-                        has_bat = True; best_bat = bat; break
-                
-                if has_bat:
-                    best_batsman = bman
-                    break # Found him!
-            
-            batsman_box = best_batsman
-
-            # Draw best batsman
-            if best_batsman:
-                cv2.rectangle(frame, (best_batsman[0], best_batsman[1]), (best_batsman[2], best_batsman[3]), (0, 255, 0), 2)
-                cv2.putText(frame, "Batsman", (best_batsman[0], best_batsman[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 2)
-                
-            # Draw bat
-            if best_bat:
-                cv2.rectangle(frame, (best_bat[0], best_bat[1]), (best_bat[2], best_bat[3]), (0, 165, 255), 2)
-                cv2.putText(frame, "Bat", (best_bat[0], best_bat[1]-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 165, 255), 2)
-                
-            # Draw ball
-            if ball_box:
-                cv2.rectangle(frame, (ball_box[0], ball_box[1]), (ball_box[2], ball_box[3]), (0, 0, 255), 2)
-
-        # 4. Pose & Shot Analysis (Only for the Batsman)
-        current_shot_label = ""
-        current_shot_conf = 0.0
-        if batsman_box:
-            bx1, by1, bx2, by2 = map(int, batsman_box)
-            bx1, by1, bx2, by2 = max(0, bx1), max(0, by1), min(width, bx2), min(height, by2)
-            crop = frame[by1:by2, bx1:bx2]
-            if crop.size > 0:
-                res_pose = pose.process(cv2.cvtColor(crop, cv2.COLOR_BGR2RGB))
-                if res_pose.pose_landmarks:
-                    mp_drawing.draw_landmarks(crop, res_pose.pose_landmarks, mp_pose.POSE_CONNECTIONS)
-                    cw, ch = bx2-bx1, by2-by1
-                    feat = []
-                    for p in res_pose.pose_landmarks.landmark:
-                        feat.extend([(p.x * cw + bx1)/width, (p.y * ch + by1)/height, p.z, p.visibility])
-                    pose_buffer.append(feat)
-                    if len(pose_buffer) > SEQ_LEN: pose_buffer.pop(0)
-                    if len(pose_buffer) == SEQ_LEN:
-                        X = np.array(pose_buffer, dtype=np.float32)
-                        X_scaled = scaler.transform(X).reshape(1, SEQ_LEN, -1).astype(np.float32)
-                        ort_inputs = {shot_model.get_inputs()[0].name: X_scaled}
-                        preds = shot_model.run(None, ort_inputs)[0]
-                        idx = np.argmax(preds[0])
-                        if classes[idx] not in IGNORE_LABELS and preds[0][idx] >= CONF_THRESHOLD:
-                            current_shot_label, current_shot_conf = classes[idx], float(preds[0][idx])
-                            pose_buffer.clear()
-
-        # 5. Ball Tracking (Only if inside Pitch)
-        if ball_box:
-            x1, y1, x2, y2 = ball_box
-            cx, cy = int((x1+x2)/2), int((y1+y2)/2)
+                    if (px1-100) <= cx <= (px2+100) and (py1-100) <= cy <= (py2+100):
+                        near_pitch = True; break
             
-            # Constraint: Must be near pitch
-            near_pitch = False
-            for pbox in pitch_boxes:
-                if isinstance(pbox[0], (list, tuple)):
-                    px1, py1, px2, py2 = min(p[0] for p in pbox), min(p[1] for p in pbox), max(p[0] for p in pbox), max(p[1] for p in pbox)
+                if near_pitch:
+                    ball_track.append((cx, cy))
+                    frames_without_ball = 0
                 else:
-                    px1, py1, px2, py2 = pbox
-                if (px1-100) <= cx <= (px2+100) and (py1-100) <= cy <= (py2+100):
-                    near_pitch = True; break
-            
-            if near_pitch:
-                ball_track.append((cx, cy))
-                frames_without_ball = 0
+                    frames_without_ball += 1
+                    if frames_without_ball <= MAX_MISSING_FRAMES and len(ball_track) >= 2:
+                        dx = ball_track[-1][0] - ball_track[-2][0]
+                        dy = ball_track[-1][1] - ball_track[-2][1]
+                        ball_track.append((int(ball_track[-1][0] + dx), int(ball_track[-1][1] + dy)))
             else:
                 frames_without_ball += 1
                 if frames_without_ball <= MAX_MISSING_FRAMES and len(ball_track) >= 2:
                     dx = ball_track[-1][0] - ball_track[-2][0]
                     dy = ball_track[-1][1] - ball_track[-2][1]
                     ball_track.append((int(ball_track[-1][0] + dx), int(ball_track[-1][1] + dy)))
-        else:
-            frames_without_ball += 1
-            if frames_without_ball <= MAX_MISSING_FRAMES and len(ball_track) >= 2:
-                dx = ball_track[-1][0] - ball_track[-2][0]
-                dy = ball_track[-1][1] - ball_track[-2][1]
-                ball_track.append((int(ball_track[-1][0] + dx), int(ball_track[-1][1] + dy)))
-            if frames_without_ball > MAX_MISSING_FRAMES: ball_track = []; ball_hit_bat = False
+                if frames_without_ball > MAX_MISSING_FRAMES: ball_track = []; ball_hit_bat = False
             
-        # 6. Hit Detection (Only if qualified batsman exists)
-        if ball_box and batsman_box:
-            bcx, bcy = (ball_box[0]+ball_box[2])/2, (ball_box[1]+ball_box[3])/2
-            # Use batsman proximity to ball as hit indicator if bat not detected separately
-            # or if we want to be more robust
-            if (batsman_box[0]-50) <= bcx <= (batsman_box[2]+50) and (batsman_box[1]-50) <= bcy <= (batsman_box[3]+50):
-                ball_hit_bat = True
-                if current_shot_label:
-                    latched_shot_label, latched_shot_conf = current_shot_label, current_shot_conf
-                    shot_display_countdown = SHOT_DISPLAY_FRAMES
-
-        # 6. Advanced Rendering
-        frame = draw_trail(frame, ball_track)
+            # 6. Hit Detection (Only if qualified batsman exists)
+            if ball_box and batsman_box:
+                bcx, bcy = (ball_box[0]+ball_box[2])/2, (ball_box[1]+ball_box[3])/2
+                # Use batsman proximity to ball as hit indicator if bat not detected separately
+                # or if we want to be more robust
+                if (batsman_box[0]-50) <= bcx <= (batsman_box[2]+50) and (batsman_box[1]-50) <= bcy <= (batsman_box[3]+50):
+                    ball_hit_bat = True
+                    contact = True
+                    if current_shot_label:
+                        latched_shot_label, latched_shot_conf = current_shot_label, current_shot_conf
+                        shot_display_countdown = SHOT_DISPLAY_FRAMES
+
+            # 6. Advanced Rendering
+            frame = draw_trail(frame, ball_track)
+
+            if cache_writer:
+                cache_writer.append(pose_rect, pose_features.landmarks if pose_rect else None, contact)
         
-        # 7. Hawk-Eye Physics
-        speed = estimate_speed(ball_track, fps=fps)
-        swing = swing_amount(ball_track)
-        spin = spin_intensity(ball_track)
-        ball_type = get_ball_type(ball_track, speed)
+            # 7. Hawk-Eye Physics
+            speed = estimate_speed(ball_track, fps=fps)
+            swing = swing_amount(ball_track)
+            spin = spin_intensity(ball_track)
+            ball_type = get_ball_type(ball_track, speed)
 
-        if shot_display_countdown > 0:
-            shot_display_countdown -= 1
-            if shot_display_countdown == 0:
-                latched_shot_label = None
+            if shot_display_countdown > 0:
+                shot_display_countdown -= 1
+                if shot_display_countdown == 0:
+                    latched_shot_label = None
 
-        cv2.rectangle(frame, (20, 20), (450, 160), (0, 0, 0), -1)
-        cv2.putText(frame, f"TYPE: {ball_type}", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
-        cv2.putText(frame, f"SPEED: {speed} km/h", (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
-        cv2.putText(frame, f"SWING: {swing}px | SPIN: {spin}", (30, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
+            cv2.rectangle(frame, (20, 20), (450, 160), (0, 0, 0), -1)
+            cv2.putText(frame, f"TYPE: {ball_type}", (30, 50), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+            cv2.putText(frame, f"SPEED: {speed} km/h", (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
+            cv2.putText(frame, f"SWING: {swing}px | SPIN: {spin}", (30, 110), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 2)
         
-        # Shot text rendering removed at user request (now handled by React UI overlay)
-        if frame_idx % 50 == 0:
-            print(f"Writing frame {frame_idx} to VideoWriter", flush=True)
+            stats = {'shot_label': latched_shot_label or current_shot_label, 'shot_conf': latched_shot_conf or current_shot_conf}
+            records.append((frame_idx, frame, stats))
+        return records
+
+    def encode_stage(records):
+        messages = []
+        for idx, frame, stats in records:
+            if idx <= start_frame:
+                continue  # Warm-up frame owned by the previous chunk
+            if idx % 10 == 0: 
+                messages.append(f"data: {json.dumps({'progress': f'Frame {idx}/{total_frames}'})}\n\n")
+
+            # Shot text rendering removed at user request (now handled by React UI overlay)
+            if idx % 50 == 0:
+                print(f"Writing frame {idx} to VideoWriter", flush=True)
             
-        out.write(frame)
+            out.write(frame)
         
-        if frame_idx % 3 == 0:
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 40])
-            if ret:
-                import base64
-                b64 = base64.b64encode(buffer).decode('utf-8')
-                import json
-                stats = {'shot_label': latched_shot_label or current_shot_label, 'shot_conf': latched_shot_conf or current_shot_conf}
-                yield f"data: {json.dumps({'frame': b64, 'stats': stats})}\n\n"
-
-    cap.release(); out.release()
+            if idx % 3 == 0:
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 40])
+                if ret:
+                    b64 = base64.b64encode(buffer).decode('utf-8')
+                    messages.append(f"data: {json.dumps({'frame': b64, 'stats': stats})}\n\n")
+        return messages
+
+    # Decode -> detect -> analyse/annotate -> encode, each stage on its own thread
+    pipeline = StagePipeline(iter_batches(cap, batch_size, frame_limit), [detect_stage, analyse_stage, encode_stage], threaded=pipelined)
+    try:
+        for messages in pipeline:
+            for message in messages:
+                yield message
+        if cache_writer:
+            cache_writer.commit()
+    finally:
+        pipeline.close()
+        cap.release(); out.release()
+        if cache_writer:
+            cache_writer.close()
+
     if latched_shot_label:
-        import json
         final_res = {"class_name": latched_shot_label, "conf": latched_shot_conf}
         yield f"data: {json.dumps({'final_result': final_res})}\n\n"
     
-    import json
     yield f"data: {json.dumps({'progress': 'Video processing complete.'})}\n\n"
 
 if __name__ == "__main__":
@@ -341,9 +512,22 @@ if __name__ == "__main__":
     parser.add_argument("--input", required=True)
     parser.add_argument("--output", required=True)
     parser.add_argument('--mode', type=str, default="mediapipe", help='Analysis mode or manual pitch JSON array')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Frames per batched ball-model call (1 disables batching)')
+    parser.add_argument('--serial', action='store_true', help='Run decode/inference/encode stages on one thread')
+    parser.add_argument('--full-frame', action='store_true', help='Run the ball model on the whole frame instead of the pitch crop')
+    parser.add_argument('--workers', type=int, default=1, help='Split the video into chunks analysed by N worker processes')
+    parser.add_argument('--no-pose-cache', action='store_true', help='Do not record poses for later re-scoring')
+    parser.add_argument('--rescore', action='store_true', help='Re-run only the shot classifier from the pose cache when one exists')
     args = parser.parse_args()
 
-    for output in process_video(args.input, args.output, args.mode):
+    if args.workers > 1:
+        from chunked_video import process_video_chunked
+        outputs = process_video_chunked(args.input, args.output, args.mode, workers=args.workers, batch_size=args.batch_size)
+    else:
+        outputs = process_video(args.input, args.output, args.mode, batch_size=args.batch_size, pipelined=not args.serial,
+                                roi_crop=not args.full_frame, pose_cache=not args.no_pose_cache, rescore=args.rescore)
+
+    for output in outputs:
         # When run standalone, we just print the SSE string or extract the progress
         import json
         if output.startswith("data: "):
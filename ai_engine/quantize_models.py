@@ -0,0 +1,399 @@
+"""
+quantize_models.py
+==================
+Builds FP16 / INT8 variants of the detectors and the shot classifier and
+checks that they do not change what the pipelines decide.
+
+  1. Samples frames from local videos. Odd frames calibrate INT8, even frames
+     are held out for the comparison.
+  2. Exports the ball, pitch and stump YOLO models to OpenVINO FP16
+     (<stem>_fp16_openvino_model/) and INT8 (<stem>_int8_openvino_model/,
+     NNCF post-training quantization on the calibration frames).
+  3. Quantizes lstm_shot_v2.onnx with ONNX Runtime dynamic INT8
+     (lstm_shot_v2_int8.onnx).
+  4. Compares every variant against FP32:
+       - detections: precision / recall / F1 and mean IoU of the variant's
+         boxes, with the FP32 boxes as ground truth (a mAP proxy);
+       - shot labels: arg-max agreement on the pose windows the FP32 pipeline
+         actually fed the shot model;
+       - end to end: per-frame shot labels and LBW decisions, plus the final
+         results, of process_video / process_lbw_video;
+       - median latency per model.
+  5. Writes models/quantization_report.json. A precision is marked approved
+     only if every gate passes, together with the path and content hashes
+     of every model (weights and variant) that was evaluated. The runtime
+     (inference_backend) refuses variants that are not approved for those
+     exact files, even when CRICKET_MODEL_PRECISION asks for them.
+
+Usage:
+    python quantize_models.py --videos ../shared/uploads/*.mp4
+    python quantize_models.py --videos clip.mp4 --precisions int8 --skip-export
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from inference_backend import (DEFAULT_MODELS, QUANT_REPORT_PATH, approval_key, export_path, int8_shot_path,
+                               is_available, load_export, model_fingerprint)
+from refresh_scheduler import box_iou
+import model_registry as registry
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(BASE_DIR, "models")
+SHOT_MODEL_PATH = os.path.join(MODELS_DIR, "lstm_shot_v2.onnx")
+DEFAULT_VIDEOS = os.path.join(os.path.dirname(BASE_DIR), "shared", "uploads", "*.mp4")
+
+if os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system") not in sys.path:
+    sys.path.append(os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system"))
+
+# Gates
+MIN_DETECTION_F1 = 0.95
+MIN_SHOT_AGREEMENT = 0.98
+MIN_FRAME_AGREEMENT = 0.98
+MATCH_IOU = 0.5
+
+
+# 1. Calibration / evaluation frames
+def sample_frames(video_paths, n_frames):
+    per_video = max(1, n_frames // max(1, len(video_paths)))
+    frames = []
+    for path in video_paths:
+        cap = cv2.VideoCapture(path)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        for idx in np.linspace(0, max(0, total - 1), per_video).astype(int):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
+            ret, frame = cap.read()
+            if ret:
+                frames.append(frame)
+        cap.release()
+    return frames[1::2], frames[0::2]
+
+
+def write_calibration_set(frames, names, out_dir):
+    """Image folder + data yaml in the layout the ultralytics INT8 export expects."""
+    img_dir = os.path.join(out_dir, "images")
+    os.makedirs(img_dir, exist_ok=True)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(img_dir, f"calib_{i:05d}.jpg"), frame)
+    data_yaml = os.path.join(out_dir, "calib.yaml")
+    with open(data_yaml, "w") as f:
+        f.write(f"path: {out_dir}\ntrain: images\nval: images\nnames:\n")
+        for cls_id, name in sorted(names.items()):
+            f.write(f"  {cls_id}: {name}\n")
+    return data_yaml
+
+
+# 2./3. Export
+def export_yolo_variant(pt_path, precision, data_yaml):
+    from ultralytics import YOLO
+    model = YOLO(pt_path, task="detect")
+    fp32_dir = export_path(pt_path, "openvino")
+    backup = fp32_dir + ".fp32_backup"
+    if precision == "fp16" and os.path.isdir(fp32_dir):
+        # ultralytics writes FP16 to the plain <stem>_openvino_model/ dir; keep the FP32 export
+        shutil.move(fp32_dir, backup)
+    try:
+        if precision == "int8":
+            out = model.export(format="openvino", int8=True, data=data_yaml, dynamic=True)
+        else:
+            out = model.export(format="openvino", half=True, dynamic=True)
+        target = export_path(pt_path, "openvino", precision)
+        out = str(out).rstrip("/\\")
+        if os.path.abspath(out) != os.path.abspath(target):
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.move(out, target)
+    finally:
+        if os.path.isdir(backup):
+            shutil.move(backup, fp32_dir)
+    return target
+
+
+def quantize_shot_model(onnx_path):
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    out = int8_shot_path(onnx_path)
+    quantize_dynamic(onnx_path, out, weight_type=QuantType.QInt8)
+    return out
+
+
+# 4. Comparison
+_variants = {}
+
+
+def load_variant(pt_path, precision):
+    key = (pt_path, precision)
+    if key not in _variants:
+        backend = "pytorch" if precision == "fp32" else "openvino"
+        _variants[key] = load_export(pt_path, backend, precision=precision)
+    return _variants[key]
+
+
+def boxes_of(result):
+    return [(int(b.cls[0]), b.xyxy[0].tolist()) for b in result.boxes]
+
+
+def compare_detections(ref_model, var_model, frames, conf=0.25):
+    tp = fp = fn = 0
+    ious = []
+    ref_ms, var_ms = [], []
+    for frame in frames:
+        t0 = time.perf_counter()
+        ref = boxes_of(ref_model(frame, verbose=False, conf=conf)[0])
+        t1 = time.perf_counter()
+        var = boxes_of(var_model(frame, verbose=False, conf=conf)[0])
+        t2 = time.perf_counter()
+        ref_ms.append((t1 - t0) * 1000)
+        var_ms.append((t2 - t1) * 1000)
+
+        # Greedy same-class matching, FP32 boxes act as ground truth
+        unmatched = list(ref)
+        for cls, box in var:
+            best, best_iou = None, MATCH_IOU
+            for cand in unmatched:
+                if cand[0] == cls:
+                    iou = box_iou(cand[1], box)
+                    if iou >= best_iou:
+                        best, best_iou = cand, iou
+            if best is None:
+                fp += 1
+            else:
+                tp += 1
+                ious.append(best_iou)
+                unmatched.remove(best)
+        fn += len(unmatched)
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        'precision': round(precision, 4),
+        'recall': round(recall, 4),
+        'f1': round(f1, 4),
+        'mean_iou': round(float(np.mean(ious)), 4) if ious else None,
+        'fp32_ms': round(float(np.median(ref_ms)), 2) if ref_ms else None,
+        'variant_ms': round(float(np.median(var_ms)), 2) if var_ms else None,
+    }
+
+
+class RecordingSession:
+    """Duck-typed InferenceSession that keeps every window the pipeline classifies."""
+
+    def __init__(self, session):
+        self.session = session
+        self.windows = []
+
+    def get_inputs(self):
+        return self.session.get_inputs()
+
+    def run(self, output_names, feeds):
+        self.windows.append(next(iter(feeds.values())).copy())
+        return self.session.run(output_names, feeds)
+
+
+def compare_shot_models(ref_session, var_session, windows):
+    if not windows:
+        return {'windows': 0, 'agreement': None}
+    name_ref = ref_session.get_inputs()[0].name
+    name_var = var_session.get_inputs()[0].name
+    agree = 0
+    ref_ms, var_ms = [], []
+    for X in windows:
+        t0 = time.perf_counter()
+        ref = ref_session.run(None, {name_ref: X})[0]
+        t1 = time.perf_counter()
+        var = var_session.run(None, {name_var: X})[0]
+        t2 = time.perf_counter()
+        ref_ms.append((t1 - t0) * 1000)
+        var_ms.append((t2 - t1) * 1000)
+        agree += int(np.argmax(ref[0]) == np.argmax(var[0]))
+    return {
+        'windows': len(windows),
+        'agreement': round(agree / len(windows), 4),
+        'fp32_ms': round(float(np.median(ref_ms)), 3),
+        'variant_ms': round(float(np.median(var_ms)), 3),
+    }
+
+
+def run_shot_pipeline(video, models_dict, max_frames, tmp_dir):
+    from process_video import process_video
+    labels, final = [], None
+    out_path = os.path.join(tmp_dir, "shot_eval.mp4")
+    for output in process_video(video, out_path, "mediapipe", models_dict, end_frame=max_frames):
+        data = json.loads(output[6:])
+        if 'stats' in data:
+            labels.append(data['stats'].get('shot_label'))
+        elif 'final_result' in data:
+            final = data['final_result'].get('class_name')
+    return labels, final
+
+
+def run_lbw_pipeline(video, models_dict, max_frames, tmp_dir):
+    from process_lbw_video import process_video as process_lbw_video
+    decisions, final = [], None
+    out_path = os.path.join(tmp_dir, "lbw_eval.mp4")
+    for output in process_lbw_video(video, out_path, "auto", models_dict, end_frame=max_frames):
+        data = json.loads(output[6:])
+        if 'stats' in data:
+            decisions.append(data['stats'].get('decision'))
+        elif 'final_result' in data:
+            final = data['final_result'].get('decision')
+    return decisions, final
+
+
+def agreement(a, b):
+    n = min(len(a), len(b))
+    if n == 0:
+        return None
+    return round(sum(1 for x, y in zip(a[:n], b[:n]) if x == y) / n, 4)
+
+
+_base_models = {}
+
+
+def build_models_dict(yolo_paths, precision, shot_session):
+    from process_video import load_models, new_pose_detector
+    ball_pt, pitch_pt, stump_pt = yolo_paths
+    if not _base_models:
+        _base_models.update(load_models())  # scaler / classes; the rest is replaced below
+    models = dict(_base_models)
+    models.update({
+        'ball_model': load_variant(ball_pt, precision),
+        'pitch_model': load_variant(pitch_pt, precision),
+        'stump_model': load_variant(stump_pt, precision),
+        'shot_model': shot_session,
+        'scaler': registry.scaler(),  # Sessions compared here take scaled features, never the fused model
+        'pose_detector': new_pose_detector(),
+    })
+    return models
+
+
+def evaluate_end_to_end(videos, yolo_paths, precision, var_shot, max_frames, tmp_dir):
+    import onnxruntime as ort
+    results = {'videos': []}
+    windows = []
+    for video in videos:
+        ref_shot = RecordingSession(ort.InferenceSession(SHOT_MODEL_PATH))
+        ref_labels, ref_final = run_shot_pipeline(video, build_models_dict(yolo_paths, "fp32", ref_shot), max_frames, tmp_dir)
+        windows.extend(ref_shot.windows)
+        var_labels, var_final = run_shot_pipeline(video, build_models_dict(yolo_paths, precision, var_shot), max_frames, tmp_dir)
+
+        ref_dec, ref_lbw = run_lbw_pipeline(video, build_models_dict(yolo_paths, "fp32", ref_shot.session), max_frames, tmp_dir)
+        var_dec, var_lbw = run_lbw_pipeline(video, build_models_dict(yolo_paths, precision, var_shot), max_frames, tmp_dir)
+
+        results['videos'].append({
+            'video': os.path.basename(video),
+            'shot_frame_agreement': agreement(ref_labels, var_labels),
+            'shot_final_match': ref_final == var_final,
+            'lbw_frame_agreement': agreement(ref_dec, var_dec),
+            'lbw_final_match': ref_lbw == var_lbw,
+        })
+    return results, windows
+
+
+def gate(variant):
+    failures = []
+    for name, det in variant['detectors'].items():
+        if det['f1'] < MIN_DETECTION_F1:
+            failures.append(f"{name} detection F1 {det['f1']} < {MIN_DETECTION_F1}")
+    shot = variant.get('shot_model')
+    if shot and shot['agreement'] is not None and shot['agreement'] < MIN_SHOT_AGREEMENT:
+        failures.append(f"shot label agreement {shot['agreement']} < {MIN_SHOT_AGREEMENT}")
+    for v in variant['end_to_end']['videos']:
+        for key in ('shot_frame_agreement', 'lbw_frame_agreement'):
+            if v[key] is not None and v[key] < MIN_FRAME_AGREEMENT:
+                failures.append(f"{v['video']}: {key} {v[key]} < {MIN_FRAME_AGREEMENT}")
+        for key in ('shot_final_match', 'lbw_final_match'):
+            if not v[key]:
+                failures.append(f"{v['video']}: {key.replace('_match', '')} decision changed")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--videos", nargs="+", default=sorted(glob.glob(DEFAULT_VIDEOS)), help="Local videos for calibration and evaluation")
+    parser.add_argument("--models", nargs=3, default=DEFAULT_MODELS, metavar=("BALL", "PITCH", "STUMP"), help="YOLO .pt weights")
+    parser.add_argument("--precisions", nargs="+", default=["int8", "fp16"], choices=["int8", "fp16"])
+    parser.add_argument("--frames", type=int, default=300, help="Frames sampled for calibration + detection checks")
+    parser.add_argument("--max-frames", type=int, default=600, help="Frames per video for the end-to-end checks")
+    parser.add_argument("--skip-export", action="store_true", help="Only evaluate existing variants")
+    args = parser.parse_args()
+
+    if not args.videos:
+        print("ERROR: no videos found, pass --videos")
+        sys.exit(2)
+
+    import onnxruntime as ort
+
+    calib_frames, eval_frames = sample_frames(args.videos, args.frames)
+    print(f"Sampled {len(calib_frames)} calibration / {len(eval_frames)} evaluation frames from {len(args.videos)} videos")
+
+    report = {'created': time.strftime("%Y-%m-%d %H:%M:%S"), 'videos': [os.path.basename(v) for v in args.videos],
+              'gates': {'min_detection_f1': MIN_DETECTION_F1, 'min_shot_agreement': MIN_SHOT_AGREEMENT,
+                        'min_frame_agreement': MIN_FRAME_AGREEMENT},
+              'variants': {}}
+    if os.path.exists(QUANT_REPORT_PATH):
+        with open(QUANT_REPORT_PATH) as f:
+            report['variants'] = json.load(f).get('variants', {})
+
+    tmp_dir = tempfile.mkdtemp(prefix="quant_")
+    try:
+        for precision in args.precisions:
+            print(f"\n=== {precision.upper()} ===")
+            ref_models = {os.path.basename(p): load_variant(p, "fp32") for p in args.models}
+
+            if not args.skip_export:
+                for pt_path in args.models:
+                    names = ref_models[os.path.basename(pt_path)].names
+                    data_yaml = write_calibration_set(calib_frames, names, os.path.join(tmp_dir, os.path.basename(pt_path)))
+                    print(f"Exported {export_yolo_variant(pt_path, precision, data_yaml)}")
+                if precision == "int8":
+                    print(f"Exported {quantize_shot_model(SHOT_MODEL_PATH)}")
+
+            missing = [p for p in args.models if not is_available(p, "openvino", precision)]
+            if missing:
+                print(f"ERROR: missing {precision} exports for {missing}")
+                sys.exit(2)
+
+            variant = {'detectors': {}}
+            for pt_path in args.models:
+                name = os.path.basename(pt_path)
+                variant['detectors'][name] = compare_detections(ref_models[name], load_variant(pt_path, precision), eval_frames)
+                print(f"{name}: {variant['detectors'][name]}")
+
+            int8_shot = int8_shot_path(SHOT_MODEL_PATH)
+            shot_evaluated = precision == "int8" and os.path.exists(int8_shot)
+            var_shot = ort.InferenceSession(int8_shot if shot_evaluated else SHOT_MODEL_PATH)
+            variant['end_to_end'], windows = evaluate_end_to_end(args.videos, args.models, precision, var_shot, args.max_frames, tmp_dir)
+            if precision == "int8":
+                variant['shot_model'] = compare_shot_models(ort.InferenceSession(SHOT_MODEL_PATH), var_shot, windows)
+                print(f"shot model: {variant['shot_model']}")
+            for v in variant['end_to_end']['videos']:
+                print(f"{v['video']}: {v}")
+
+            failures = gate(variant)
+            variant['approved'] = not failures
+            variant['failures'] = failures
+            # The approval only covers these exact files (see inference_backend.is_approved)
+            evaluated = list(args.models) + ([SHOT_MODEL_PATH] if shot_evaluated else [])
+            variant['models'] = {approval_key(p): model_fingerprint(p, precision) for p in evaluated}
+            report['variants'][precision] = variant
+            print("APPROVED" if not failures else "REJECTED:\n  " + "\n  ".join(failures))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    with open(QUANT_REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {QUANT_REPORT_PATH}")
+    sys.exit(0 if all(report['variants'][p]['approved'] for p in args.precisions) else 1)
+
+
+if __name__ == "__main__":
+    main()
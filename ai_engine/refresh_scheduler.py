@@ -0,0 +1,122 @@
+"""
+refresh_scheduler.py
+====================
+Adaptive refresh scheduling for static-scene models (pitch, stumps).
+
+The pitch and the stumps barely move during a delivery, so re-running their
+detectors on every frame wastes a YOLO pass per model. The scheduler keeps the
+last detection and only re-runs the model when it is due:
+
+  * the refresh interval doubles after every run that confirms the cached box
+    (same place, similar confidence), up to max_interval;
+  * it falls back to min_interval when the box jumps, the confidence drops or
+    the object is missed;
+  * invalidate() forces a run on the next frame (e.g. on a scene change).
+
+Usage:
+    pitch_refresh = StaticSceneScheduler("pitch")
+    pitch_roi = pitch_refresh.get(frame_idx, lambda: detector.detect_pitch(frame, with_conf=True))
+"""
+
+# Config
+MIN_INTERVAL = 5        # Frames between runs right after a change
+MAX_INTERVAL = 60       # Frames between runs once the scene is stable
+IOU_THRESHOLD = 0.85    # Below this the box counts as moved
+CONF_DROP = 0.15        # Confidence loss that counts as degraded
+
+
+def box_iou(a, b):
+    ax1, ay1, ax2, ay2 = a[:4]
+    bx1, by1, bx2, by2 = b[:4]
+    ix1, iy1 = max(ax1, bx1), max(ay1, by1)
+    ix2, iy2 = min(ax2, bx2), min(ay2, by2)
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return inter / union if union > 0 else 0.0
+
+
+class StaticSceneScheduler:
+    def __init__(self, name, min_interval=MIN_INTERVAL, max_interval=MAX_INTERVAL,
+                 iou_threshold=IOU_THRESHOLD, conf_drop=CONF_DROP):
+        self.name = name
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.iou_threshold = iou_threshold
+        self.conf_drop = conf_drop
+        self.frames = 0
+        self.runs = 0
+        self.invalidations = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the cached detection (new source / new session). Counters are kept."""
+        self.value = None
+        self.box = None
+        self.conf = 0.0
+        self.interval = self.min_interval
+        self.last_run = None
+        self.force = True
+
+    def invalidate(self):
+        """Re-run the model on the next frame, e.g. after a camera cut."""
+        self.force = True
+        self.interval = self.min_interval
+        self.invalidations += 1
+
+    def on_scene_change(self, event, frame_idx=None):
+        """SceneChangeDetector subscriber: any cut or pan makes the cached box stale."""
+        self.invalidate()
+
+    def due(self, frame_idx):
+        if self.force or self.value is None or self.last_run is None:
+            return True
+        return frame_idx - self.last_run >= self.interval
+
+    def update(self, frame_idx, value, box=None, conf=0.0):
+        """Record a model run. value is what get() hands back, box/conf drive the stability checks."""
+        self.runs += 1
+        self.last_run = frame_idx
+        self.force = False
+
+        if value is None:
+            # Missed: keep the old detection but check again soon
+            self.interval = self.min_interval
+            return
+
+        box = box if box is not None else value
+        stable = (
+            self.box is not None
+            and box_iou(self.box, box) >= self.iou_threshold
+            and conf >= self.conf - self.conf_drop
+        )
+        if stable:
+            self.interval = min(self.interval * 2, self.max_interval)
+        else:
+            self.interval = self.min_interval
+        self.value, self.box, self.conf = value, box, conf
+
+    def get(self, frame_idx, detect):
+        """Cached detection for this frame. detect() returns (value, conf) or (value, box, conf)."""
+        self.frames += 1
+        if self.due(frame_idx):
+            res = detect()
+            if len(res) == 2:
+                value, conf = res
+                box = value
+            else:
+                value, box, conf = res
+            self.update(frame_idx, value, box, conf)
+        return self.value
+
+    @property
+    def saved(self):
+        return self.frames - self.runs
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'runs': self.runs,
+            'saved': self.saved,
+            'invalidations': self.invalidations,
+            'interval': self.interval,
+        }
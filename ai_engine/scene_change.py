@@ -0,0 +1,89 @@
+"""
+scene_change.py
+===============
+Cheap per-frame camera-cut and pan detection.
+
+Every frame is shrunk to a thumbnail (64x36 by default) before it is compared,
+so the check costs a fraction of a millisecond next to the YOLO passes it
+gates:
+
+  * cut  - the colour histogram (HSV hue/saturation) differs sharply from the
+           previous frame (Bhattacharyya distance);
+  * pan  - phase correlation against the last reference thumbnail shows the
+           view has shifted by more than a fraction of the frame.
+
+Events are returned by update() and pushed to subscribers, so the pitch/stump
+caches can be invalidated and the ball trackers reset only when the scene
+actually changed.
+
+Usage:
+    scene = SceneChangeDetector()
+    scene.subscribe(pitch_refresh.on_scene_change)
+    event = scene.update(frame, frame_idx)   # None, "cut" or "pan"
+"""
+
+import cv2
+import numpy as np
+
+# Config
+THUMB_SIZE = (64, 36)   # (w, h) of the comparison thumbnail
+CUT_THRESHOLD = 0.45    # Bhattacharyya distance between consecutive frames
+PAN_THRESHOLD = 0.08    # Shift vs. reference, as a fraction of the thumbnail width
+MIN_PAN_RESPONSE = 0.1  # Ignore phase-correlation peaks weaker than this
+
+CUT = "cut"
+PAN = "pan"
+
+
+class SceneChangeDetector:
+    def __init__(self, thumb_size=THUMB_SIZE, cut_threshold=CUT_THRESHOLD, pan_threshold=PAN_THRESHOLD):
+        self.thumb_size = thumb_size
+        self.cut_threshold = cut_threshold
+        self.pan_threshold = pan_threshold
+        self.subscribers = []
+        self.counts = {CUT: 0, PAN: 0}
+        self.reset()
+
+    def reset(self):
+        self.prev_hist = None
+        self.ref_gray = None
+        self.last_event = None
+
+    def subscribe(self, callback):
+        """callback(event, frame_idx) is called for every cut / pan."""
+        self.subscribers.append(callback)
+
+    def _signature(self, frame):
+        thumb = cv2.resize(frame, self.thumb_size, interpolation=cv2.INTER_AREA)
+        hsv = cv2.cvtColor(thumb, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [16, 16], [0, 180, 0, 256])
+        cv2.normalize(hist, hist)
+        gray = cv2.cvtColor(thumb, cv2.COLOR_BGR2GRAY).astype(np.float32)
+        return hist, gray
+
+    def update(self, frame, frame_idx=None):
+        hist, gray = self._signature(frame)
+        event = None
+
+        if self.prev_hist is not None:
+            if cv2.compareHist(self.prev_hist, hist, cv2.HISTCMP_BHATTACHARYYA) > self.cut_threshold:
+                event = CUT
+            else:
+                (dx, dy), response = cv2.phaseCorrelate(self.ref_gray, gray)
+                if response >= MIN_PAN_RESPONSE and np.hypot(dx, dy) > self.pan_threshold * self.thumb_size[0]:
+                    event = PAN
+
+        self.prev_hist = hist
+        if event or self.ref_gray is None:
+            # New reference view; small drifts accumulate against it until they count as a pan
+            self.ref_gray = gray
+
+        if event:
+            self.counts[event] += 1
+            self.last_event = (event, frame_idx)
+            for callback in self.subscribers:
+                callback(event, frame_idx)
+        return event
+
+    def stats(self):
+        return dict(self.counts)
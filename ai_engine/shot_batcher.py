@@ -0,0 +1,369 @@
+"""
+shot_batcher.py
+===============
+Micro-batching for the shot classifier across threads and processes.
+
+With several live streams and offline jobs on one host, every caller runs
+the LSTM with a batch of one. ShotBatcher queues the pending requests,
+waits at most max_wait_ms for more to arrive (or until max_batch rows are
+collected), runs them through ONNX Runtime as one batch and hands each
+caller its own slice back.
+
+ShotBatcher and RemoteShotModel both look like an InferenceSession
+(get_inputs() / get_outputs() / run()), so WindowShotClassifier,
+StepShotClassifier and process_video use them unchanged. All inputs are
+concatenated on the batch axis, which also covers the state inputs of step
+models. A batch never grows past max_batch rows; exports with a static batch
+dimension get their partial batches padded to it.
+
+CRICKET_SHOT_BATCHER controls what registry.shot_model() returns:
+  * unset      - a plain InferenceSession (default)
+  * local      - an in-process ShotBatcher shared by every thread
+  * host:port  - a client of a batching server started with --serve, shared
+                 by every process on the host
+
+In host:port mode the server resolves the model variant (precision, fused
+scaler) in its own environment and reports it to the clients, so
+registry.shot_scaler() scales features exactly when the server's model
+expects it.
+
+The server and its clients share a secret in CRICKET_SHOT_BATCHER_KEY.
+multiprocessing.connection unpickles whatever it receives, so neither side
+starts without one. The server only loads the configured shot models (the
+window model and its step export, plus any --allow paths).
+
+Usage:
+    export CRICKET_SHOT_BATCHER_KEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python shot_batcher.py --serve --port 6010 --max-batch 16 --max-wait-ms 2
+    CRICKET_SHOT_BATCHER=127.0.0.1:6010 python live_inference.py
+    python shot_batcher.py --bench --threads 8
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+import numpy as np
+
+BATCHER_ENV = "CRICKET_SHOT_BATCHER"
+AUTHKEY_ENV = "CRICKET_SHOT_BATCHER_KEY"
+DEFAULT_PORT = 6010
+MAX_BATCH = 16
+MAX_WAIT_MS = 2.0
+
+InputInfo = namedtuple("InputInfo", ["name", "shape", "type"])
+
+
+class _Request:
+    __slots__ = ("feeds", "rows", "future")
+
+    def __init__(self, feeds):
+        self.feeds = feeds
+        self.rows = len(next(iter(feeds.values())))
+        self.future = Future()
+
+
+class ShotBatcher:
+    """Collects run() calls from many threads into batched session.run() calls."""
+
+    def __init__(self, session, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        self.session = session
+        batch_dim = session.get_inputs()[0].shape[0]
+        self.static_batch = batch_dim if isinstance(batch_dim, int) and batch_dim > 0 else None
+        if self.static_batch:
+            max_batch = self.static_batch  # Static-batch export: batches are padded to this size
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._output_names = [o.name for o in session.get_outputs()]
+        self._queue = queue.Queue()
+        self.requests = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._loop, name="shot-batcher", daemon=True)
+        self._thread.start()
+
+    def get_inputs(self):
+        return self.session.get_inputs()
+
+    def get_outputs(self):
+        return self.session.get_outputs()
+
+    def submit(self, feeds):
+        """Queue one request; the Future resolves to the list of outputs for its rows."""
+        request = _Request({name: np.asarray(x, dtype=np.float32) for name, x in feeds.items()})
+        if self.static_batch and request.rows > self.static_batch:
+            request.future.set_exception(ValueError(
+                f"{request.rows} rows do not fit the static batch of {self.static_batch} of this export"))
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def run(self, output_names, feeds, run_options=None):
+        outputs = self.submit(feeds).result()
+        if output_names:
+            return [outputs[self._output_names.index(name)] for name in output_names]
+        return outputs
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _loop(self):
+        held = None  # Request that did not fit the previous batch
+        while True:
+            first, held = held or self._queue.get(), None
+            if first is None:
+                return
+            batch, rows = [first], first.rows
+            deadline = time.perf_counter() + self.max_wait
+            while rows < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    self._queue.put(None)  # Finish this batch, stop on the next loop
+                    break
+                if rows + request.rows > self.max_batch:
+                    held = request  # Multi-row (step-lane) request: starts the next batch
+                    break
+                batch.append(request)
+                rows += request.rows
+            self._run_batch(batch, rows)
+
+    def _run_batch(self, batch, rows):
+        try:
+            if len(batch) == 1:
+                feeds = batch[0].feeds
+            else:
+                feeds = {name: np.concatenate([r.feeds[name] for r in batch]) for name in batch[0].feeds}
+            if self.static_batch and rows < self.static_batch:
+                # Zero rows up to the exported batch size; their outputs are never handed out
+                feeds = {name: np.concatenate([x, np.zeros((self.static_batch - rows,) + x.shape[1:], x.dtype)])
+                         for name, x in feeds.items()}
+            outputs = self.session.run(None, feeds)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        start = 0
+        for request in batch:
+            end = start + request.rows
+            request.future.set_result([out[start:end] for out in outputs])
+            start = end
+        self.requests += len(batch)
+        self.batches += 1
+
+    def stats(self):
+        return {'requests': self.requests, 'batches': self.batches,
+                'mean_batch': round(self.requests / self.batches, 2) if self.batches else 0.0}
+
+
+class RemoteShotModel:
+    """Client side of serve(): an InferenceSession look-alike backed by the batching server.
+
+    Every calling thread gets its own connection, so requests from several threads are
+    in flight together and the server can batch them.
+    """
+
+    def __init__(self, address, model_path, authkey=None):
+        self.address = address
+        self.model_path = model_path
+        self._authkey = _authkey(authkey)
+        self._local = threading.local()
+        self._conns = []
+        self._lock = threading.Lock()
+        self._inputs = [InputInfo(*info) for info in self._call("inputs")]
+        self._outputs = [InputInfo(*info) for info in self._call("outputs")]
+        # The server resolves the variant (precision, fused scaler) in its own environment
+        info = self._call("model")
+        self.resolved_model = info['model']
+        self.scaler_fused = info['scaler_fused']
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = Client(self.address, authkey=self._authkey)
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    def _call(self, op, payload=None):
+        conn = self._conn()
+        conn.send((op, self.model_path, payload))
+        status, result = conn.recv()
+        if status != "ok":
+            raise RuntimeError(f"shot batcher at {self.address}: {result}")
+        return result
+
+    def get_inputs(self):
+        return self._inputs
+
+    def get_outputs(self):
+        return self._outputs
+
+    def run(self, output_names, feeds, run_options=None):
+        outputs = self._call("run", feeds)
+        if output_names:
+            names = [o.name for o in self._outputs]
+            return [outputs[names.index(name)] for name in output_names]
+        return outputs
+
+    def close(self):
+        with self._lock:
+            conns, self._conns = self._conns, []
+        for conn in conns:
+            conn.close()
+
+
+def _authkey(authkey=None):
+    key = authkey or os.environ.get(AUTHKEY_ENV)
+    if not key:
+        raise RuntimeError(f"{AUTHKEY_ENV} is not set: the shot batcher needs a shared key to serve or connect")
+    return key.encode() if isinstance(key, str) else key
+
+
+def served_models():
+    """Model files serve() accepts by default: the configured shot model and its step export."""
+    from model_registry import SHOT_MODEL_PATH
+    from shot_stream import step_model_path
+    return [SHOT_MODEL_PATH, step_model_path(SHOT_MODEL_PATH)]
+
+
+def parse_address(value):
+    host, _, port = value.rpartition(":")
+    return (host or "127.0.0.1", int(port or DEFAULT_PORT))
+
+
+def remote_address():
+    """Address of the batching server CRICKET_SHOT_BATCHER points at, None when it is unset or local."""
+    mode = os.environ.get(BATCHER_ENV, "").strip()
+    return parse_address(mode) if mode and mode != "local" else None
+
+
+def load_shot_session(path):
+    """Session, in-process batcher or server client for path, per CRICKET_SHOT_BATCHER."""
+    address = remote_address()
+    if address:
+        return RemoteShotModel(address, path)
+    mode = os.environ.get(BATCHER_ENV, "").strip()
+    from inference_backend import load_shot_model
+    session = load_shot_model(path)
+    return ShotBatcher(session) if mode == "local" else session
+
+
+def serve(address, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, authkey=None, models=None):
+    """Serve batched shot classification to local processes (one batcher per model path).
+
+    Clients may only name a file in models (default: served_models()).
+    """
+    import onnxruntime as ort
+    from inference_backend import fused_path, shot_model_path
+
+    key = _authkey(authkey)
+    allowed = {os.path.realpath(path) for path in (models or served_models())}
+    batchers = {}
+    lock = threading.Lock()
+
+    def batcher_for(path):
+        real = os.path.realpath(path) if isinstance(path, str) else None
+        if real not in allowed:
+            raise ValueError(f"model {path!r} is not served here")
+        with lock:
+            if real not in batchers:
+                resolved = shot_model_path(real)
+                info = {'model': os.path.basename(resolved), 'scaler_fused': resolved == fused_path(real)}
+                batchers[real] = ShotBatcher(ort.InferenceSession(resolved), max_batch, max_wait_ms), info
+                print(f"[shot-batcher] loaded {info['model']} for {os.path.basename(real)}")
+            return batchers[real]
+
+    def handle(conn):
+        with conn:
+            while True:
+                try:
+                    op, path, payload = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    batcher, info = batcher_for(path)
+                    if op == "model":
+                        result = info
+                    elif op == "inputs":
+                        result = [(i.name, list(i.shape), i.type) for i in batcher.get_inputs()]
+                    elif op == "outputs":
+                        result = [(o.name, list(o.shape), o.type) for o in batcher.get_outputs()]
+                    elif op == "run":
+                        result = batcher.submit(payload).result()
+                    else:
+                        raise ValueError(f"unknown op {op!r}")
+                    conn.send(("ok", result))
+                except Exception as e:
+                    conn.send(("error", str(e)))
+
+    with Listener(address, authkey=key) as listener:
+        print(f"[shot-batcher] listening on {address[0]}:{address[1]} (max batch {max_batch}, max wait {max_wait_ms} ms)")
+        while True:
+            try:
+                conn = listener.accept()
+            except (AuthenticationError, OSError):
+                continue  # Wrong key or a dropped handshake: keep serving the others
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+def bench(model_path, threads=8, calls=200, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+    """Throughput of `threads` callers with and without the in-process batcher."""
+    from inference_backend import load_shot_model
+
+    session = load_shot_model(model_path)
+    inp = session.get_inputs()[0]
+    x = np.random.default_rng(0).standard_normal((1, inp.shape[1], inp.shape[2])).astype(np.float32)
+
+    def drive(model):
+        def worker():
+            for _ in range(calls):
+                model.run(None, {inp.name: x})
+        pool = [threading.Thread(target=worker) for _ in range(threads)]
+        t0 = time.perf_counter()
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        return threads * calls / (time.perf_counter() - t0)
+
+    drive(session)  # Warm-up
+    direct = drive(session)
+    batcher = ShotBatcher(session, max_batch, max_wait_ms)
+    batched = drive(batcher)
+    print(f"{threads} threads x {calls} calls")
+    print(f"  direct  {direct:8.1f} seq/s")
+    print(f"  batched {batched:8.1f} seq/s  {batcher.stats()}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    from model_registry import SHOT_MODEL_PATH
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true", help="Run the batching server")
+    parser.add_argument("--bench", action="store_true", help="Compare direct and batched throughput")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--model", default=SHOT_MODEL_PATH, help="Model for --bench")
+    parser.add_argument("--allow", action="append", default=[], help="Extra model file clients may request (repeatable)")
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    if args.bench:
+        bench(args.model, args.threads, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+    if args.serve:
+        serve((args.host, args.port), args.max_batch, args.max_wait_ms, models=served_models() + args.allow)
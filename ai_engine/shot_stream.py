@@ -0,0 +1,260 @@
+"""
+shot_stream.py
+==============
+Streaming shot classification for the live servers.
+
+Once the pose window is full the windowed LSTM (lstm_shot_v2.onnx) is re-run
+over all 30 steps on every frame, repeating 29 steps of recurrent work. A
+step model (<stem>_step.onnx) takes one feature row plus the LSTM hidden and
+cell states and returns the class probabilities and the next states, so a
+frame costs one recurrent step instead of thirty.
+
+A window model sees exactly the last seq_len frames, while a carried state
+keeps the whole stream since the last reset. To stay close to what the
+classifier was trained on, StepShotClassifier runs two state lanes (one
+batched call), each restarted every 2 * seq_len frames with an offset of
+seq_len. Predictions come from the lane whose history is seq_len..2*seq_len-1
+frames long. At exactly seq_len frames that lane matches the window model.
+
+Only forward (unidirectional) LSTMs can be stepped: a bidirectional layer's
+backward pass needs future frames. The shipped lstm_shot_v2 is bidirectional,
+so it keeps running windowed (WindowShotClassifier) until a forward-only model
+is trained and exported. load_shot_classifier() picks the step model whenever
+one sits next to the window model.
+
+Usage:
+    clf = load_shot_classifier(SHOT_MODEL_PATH)
+    probs = clf.push(feat)          # None until seq_len frames were seen
+    if probs is not None and probs.max() > 0.7:
+        clf.reset()
+
+    python shot_stream.py --export lstm_shot.keras --verify
+    python shot_stream.py --verify --window models/lstm_shot.onnx
+    python shot_stream.py --export-window lstm_final.keras    # lstm_final.onnx for the headless CLIs
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+import model_registry as registry
+from pose_sequence import PoseSequenceBuffer, SEQ_LEN, NUM_FEATURES
+
+STEP_SUFFIX = "_step.onnx"
+LANES = 2
+PARITY_TOLERANCE = 1e-4
+
+
+def step_model_path(onnx_path):
+    return os.path.splitext(onnx_path)[0] + STEP_SUFFIX
+
+
+class WindowShotClassifier:
+    """Windowed model: re-run over the last seq_len pose rows on every frame."""
+
+    mode = "window"
+
+    def __init__(self, session, scaler=None, seq_len=SEQ_LEN):
+        self.session = session
+        self.scaler = scaler
+        self.seq_len = seq_len
+        self.buffer = PoseSequenceBuffer(seq_len, scaler=scaler)
+        self._input = session.get_inputs()[0].name
+
+    def clone(self):
+        """Same session and scaler, own pose window (one classifier per camera)."""
+        return type(self)(self.session, self.scaler, self.seq_len)
+
+    def reset(self):
+        self.buffer.clear()
+
+    def push(self, feat):
+        self.buffer.append(feat)
+        if not self.buffer.full:
+            return None
+        return self.session.run(None, {self._input: self.buffer.window()})[0][0]
+
+
+class StepShotClassifier:
+    """Step model: one recurrent step per frame with carried LSTM states.
+
+    The session takes (features, h_0, c_0, h_1, c_1, ...) and returns
+    (probs, h_0, c_0, ...), states in the same order as the inputs.
+    """
+
+    mode = "step"
+
+    def __init__(self, session, scaler=None, seq_len=SEQ_LEN):
+        self.session = session
+        self.scaler = scaler
+        self.seq_len = seq_len
+        self._row = PoseSequenceBuffer(1, scaler=scaler)  # Scales in place, yields a (1, 1, F) view
+        inputs = session.get_inputs()
+        self._input = inputs[0].name
+        self._state_names = [i.name for i in inputs[1:]]
+        self._state_shapes = [(LANES, i.shape[-1]) for i in inputs[1:]]
+        self.reset()
+
+    def clone(self):
+        """Same session and scaler, own LSTM states (one classifier per camera)."""
+        return type(self)(self.session, self.scaler, self.seq_len)
+
+    def reset(self):
+        self.steps = 0
+        self._states = [np.zeros(shape, dtype=np.float32) for shape in self._state_shapes]
+
+    def _lane_age(self, lane, t):
+        """Frames seen by a lane after step t (1-based), 0 if it has not started."""
+        since = t - 1 - lane * self.seq_len
+        return since % (LANES * self.seq_len) + 1 if since >= 0 else 0
+
+    def push(self, feat):
+        self.steps += 1
+        for lane in range(LANES):
+            if self._lane_age(lane, self.steps) == 1:
+                for state in self._states:
+                    state[lane] = 0.0
+
+        self._row.append(feat)
+        feeds = {self._input: np.repeat(self._row.window(), LANES, axis=0)}
+        feeds.update(zip(self._state_names, self._states))
+        outputs = self.session.run(None, feeds)
+        probs, self._states = outputs[0], list(outputs[1:])
+
+        for lane in range(LANES):
+            if self.seq_len <= self._lane_age(lane, self.steps) < 2 * self.seq_len:
+                return probs[lane]
+        return None
+
+
+def load_shot_classifier(onnx_path=registry.SHOT_MODEL_PATH, scaler_path=registry.SCALER_PATH, seq_len=SEQ_LEN, warmup=None):
+    """Step classifier when <stem>_step.onnx exists, windowed otherwise.
+
+    The scaler is only loaded when the chosen model does not have it fused in.
+    """
+    step_path = step_model_path(onnx_path)
+    if os.path.exists(step_path):
+        print(f"[shot] streaming with {os.path.basename(step_path)}")
+        return StepShotClassifier(registry.shot_model(step_path, warmup), registry.shot_scaler(step_path, scaler_path), seq_len)
+    return WindowShotClassifier(registry.shot_model(onnx_path, warmup), registry.shot_scaler(onnx_path, scaler_path), seq_len)
+
+
+def build_step_model(model):
+    """Rebuild a sequential Keras LSTM classifier as a single-step model with explicit states."""
+    from tensorflow import keras
+
+    x_in = keras.Input(shape=(1, model.input_shape[-1]), name="features")
+    inputs, states_out = [x_in], []
+    x = x_in
+    for layer in model.layers:
+        if isinstance(layer, keras.layers.InputLayer):
+            continue
+        if isinstance(layer, keras.layers.Bidirectional):
+            raise ValueError(f"{layer.name} is bidirectional; its backward pass needs future frames, "
+                             "so the model cannot run step-wise. Train a forward-only LSTM.")
+        config = layer.get_config()
+        if isinstance(layer, keras.layers.LSTM):
+            if config.get("go_backwards"):
+                raise ValueError(f"{layer.name} runs backwards and cannot be stepped")
+            config.update(return_state=True, stateful=False)
+            clone = keras.layers.LSTM.from_config(config)
+            h = keras.Input(shape=(layer.units,), name=f"{layer.name}_h")
+            c = keras.Input(shape=(layer.units,), name=f"{layer.name}_c")
+            x, h_out, c_out = clone(x, initial_state=[h, c])
+            inputs += [h, c]
+            states_out += [h_out, c_out]
+        elif isinstance(layer, keras.layers.RNN):
+            raise ValueError(f"{layer.name}: only LSTM layers can be exported step-wise")
+        else:
+            clone = layer.__class__.from_config(config)
+            x = clone(x)
+        clone.set_weights(layer.get_weights())
+    if not states_out:
+        raise ValueError("model has no LSTM layer")
+    if len(x.shape) == 3:  # Last LSTM kept return_sequences: (batch, 1, classes)
+        x = keras.layers.Reshape((x.shape[-1],))(x)
+    return keras.Model(inputs, [x] + states_out)
+
+
+def export_step_model(keras_path, out_path):
+    import tensorflow as tf
+    import tf2onnx
+
+    step = build_step_model(registry.keras_model(keras_path))
+    signature = [tf.TensorSpec(t.shape, tf.float32, name=t.name.split(":")[0]) for t in step.inputs]
+    tf2onnx.convert.from_keras(step, input_signature=signature, output_path=out_path)
+    print(f"Exported step model -> {out_path}")
+
+
+def export_window_model(keras_path, out_path=None, runs=20, seed=0):
+    """Windowed ONNX export of a Keras classifier (<stem>.onnx), checked against Keras on random windows."""
+    import onnxruntime as ort
+    import tensorflow as tf
+    import tf2onnx
+
+    out_path = out_path or os.path.splitext(keras_path)[0] + ".onnx"
+    model = registry.keras_model(keras_path)
+    signature = [tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name="input")]
+    tf2onnx.convert.from_keras(model, input_signature=signature, output_path=out_path)
+
+    session = ort.InferenceSession(out_path)
+    x = np.random.default_rng(seed).standard_normal((runs,) + tuple(model.input_shape[1:])).astype(np.float32)
+    max_diff = float(np.abs(model.predict(x, verbose=0) - session.run(None, {session.get_inputs()[0].name: x})[0]).max())
+    ok = max_diff <= PARITY_TOLERANCE
+    print(f"Exported window model -> {out_path} (max |diff| vs Keras {max_diff:.2e}, {'PASS' if ok else 'FAIL'})")
+    if not ok:
+        os.remove(out_path)
+    return ok
+
+
+def verify_step_model(window_path, step_path, runs=20, seq_len=SEQ_LEN, seed=0):
+    """Compare step and window outputs on random (already scaled) sequences.
+
+    Exact parity is checked whenever the emitting lane has seen exactly seq_len
+    frames; agreement with the sliding window on all other frames is reported.
+    """
+    import onnxruntime as ort
+
+    window = WindowShotClassifier(ort.InferenceSession(window_path), seq_len=seq_len)
+    step = StepShotClassifier(ort.InferenceSession(step_path), seq_len=seq_len)
+    rng = np.random.default_rng(seed)
+    max_diff, agree, total = 0.0, 0, 0
+    for _ in range(runs):
+        window.reset()
+        step.reset()
+        rows = rng.standard_normal((3 * seq_len, NUM_FEATURES)).astype(np.float32)
+        for t, row in enumerate(rows, start=1):
+            p_win, p_step = window.push(row), step.push(row)
+            if p_win is None:
+                continue
+            if t % seq_len == 0:
+                max_diff = max(max_diff, float(np.abs(p_win - p_step).max()))
+            agree += int(np.argmax(p_win) == np.argmax(p_step))
+            total += 1
+    ok = max_diff <= PARITY_TOLERANCE
+    print(f"parity max |diff| = {max_diff:.2e} ({'PASS' if ok else 'FAIL'}, tol {PARITY_TOLERANCE:g})")
+    print(f"argmax agreement with the sliding window: {agree}/{total} = {agree / max(total, 1):.1%}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--export", metavar="KERAS_MODEL", help="Keras source of the windowed classifier")
+    parser.add_argument("--export-window", metavar="KERAS_MODEL", help="Export the windowed classifier itself to <stem>.onnx")
+    parser.add_argument("--window", default=registry.SHOT_MODEL_PATH, help="Windowed ONNX model")
+    parser.add_argument("--out", help="Step model path (default <window>_step.onnx)")
+    parser.add_argument("--verify", action="store_true", help="Check step/window parity")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.export_window:
+        if not export_window_model(args.export_window, args.out):
+            raise SystemExit(1)
+        raise SystemExit(0)
+
+    out_path = args.out or step_model_path(args.window)
+    if args.export:
+        export_step_model(args.export, out_path)
+    if args.verify and not verify_step_model(args.window, out_path, args.runs):
+        raise SystemExit(1)
@@ -0,0 +1,178 @@
+"""
+startup_benchmark.py
+====================
+Cold-start cost of every Python entry point.
+
+The Node server spawns process_video.py / process_lbw_video.py for every
+/api/analyze-existing request and talks to the live servers behind
+/api/start_live, so interpreter start, framework imports and model loading
+are all on the user's clock. Each entry point is started in a fresh
+interpreter (nothing cached between runs) and timed in three phases:
+
+  * import  - importing the entry module (the live servers load and warm
+              their models at import time, so that is included there)
+  * first   - loading whatever the module loads lazily plus one inference on
+              a dummy frame / pose window
+  * spawn   - wall time of the whole child process, interpreter start included
+
+Alongside the times it lists which heavy frameworks ended up loaded (torch,
+tensorflow, mediapipe, onnxruntime, ultralytics) and the deferred import
+times from lazy_imports.import_report().
+
+Usage:
+    python startup_benchmark.py                       # every entry point, 3 runs each
+    python startup_benchmark.py --entries cricket_ai rescore --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LBW_DIR = os.path.join(os.path.dirname(BASE_DIR), "cricket_lbw_system")
+FRAMEWORKS = ("torch", "tensorflow", "mediapipe", "onnxruntime", "ultralytics")
+MARKER = "STARTUP:"
+
+
+def _frame():
+    import numpy as np
+    return np.zeros((562, 1000, 3), dtype=np.uint8)
+
+
+def _window():
+    import numpy as np
+    from pose_sequence import SEQ_LEN, NUM_FEATURES
+    return np.zeros((1, SEQ_LEN, NUM_FEATURES), dtype=np.float32)
+
+
+def probe_process_video(mod):
+    import model_registry as registry
+    models = mod.load_models()
+    models['ball_model'](_frame(), verbose=False)
+    models['pose_detector'].process(_frame()[:256, :256])
+    registry.predict_shot(models['shot_model'], _window())
+
+
+def probe_rescore(mod):
+    import model_registry as registry
+    shot_model, _ = registry.shot_classifier(registry.SHOT_MODEL_PATH, registry.SCALER_PATH)
+    registry.predict_shot(shot_model, _window())
+
+
+def probe_cricket_ai(mod):
+    import model_registry as registry
+    shot_model, _, _ = mod.load_shot_models()
+    registry.predict_shot(shot_model, _window())
+    registry.yolo(mod.BALL_MODEL_PATH)(_frame(), verbose=False)
+
+
+def probe_api(mod):
+    import model_registry as registry
+    mod.load_models()
+    if mod.yolo_model is not None:
+        mod.yolo_model(_frame(), verbose=False)
+    if mod.shot_model is not None:
+        registry.predict_shot(mod.shot_model, _window())
+
+
+def probe_live(mod):
+    mod.ball_model(_frame(), verbose=False)
+    mod.sessions.find(mod.DEFAULT_SESSION).pose.process(_frame()[:256, :256])
+
+
+def probe_process_lbw(mod):
+    from ball_detection import Detector
+    from pose_detection import BatsmanPoseDetector
+    import model_registry as registry
+    Detector().detect_objects(_frame())
+    BatsmanPoseDetector().pose.process(_frame()[:256, :256])
+    registry.predict_shot(registry.shot_model(), _window())
+
+
+def probe_live_lbw(mod):
+    mod.detector.detect_objects(_frame())
+    mod.sessions.find(mod.DEFAULT_SESSION).pose_detector.pose.process(_frame()[:256, :256])
+
+
+# name -> (directory, module, probe)
+ENTRIES = {
+    "process_video": (BASE_DIR, "process_video", probe_process_video),
+    "rescore": (BASE_DIR, "process_video", probe_rescore),
+    "cricket_ai": (BASE_DIR, "cricket_ai", probe_cricket_ai),
+    "api": (BASE_DIR, "api.main", probe_api),
+    "live_inference": (BASE_DIR, "live_inference", probe_live),
+    "process_lbw_video": (LBW_DIR, "process_lbw_video", probe_process_lbw),
+    "live_lbw_inference": (LBW_DIR, "live_lbw_inference", probe_live_lbw),
+}
+
+
+def run_child(name):
+    """Runs inside the spawned interpreter: import, first inference, report."""
+    import importlib
+    t0 = time.perf_counter()
+    directory, module, probe = ENTRIES[name]
+    sys.path[:0] = [directory, BASE_DIR]
+    os.chdir(directory)
+    result = {'entry': name}
+    try:
+        mod = importlib.import_module(module)
+        result['import_s'] = time.perf_counter() - t0
+        t1 = time.perf_counter()
+        probe(mod)
+        result['first_s'] = time.perf_counter() - t1
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    from lazy_imports import import_report
+    result['frameworks'] = [f for f in FRAMEWORKS if f in sys.modules]
+    result['deferred'] = {k: round(v, 3) for k, v in import_report().items()}
+    print(MARKER + json.dumps(result), flush=True)
+
+
+def measure(name, runs=3):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", name],
+                              capture_output=True, text=True, cwd=BASE_DIR)
+        spawn_s = time.perf_counter() - t0
+        lines = [l for l in proc.stdout.splitlines() if l.startswith(MARKER)]
+        if not lines:
+            return {'entry': name, 'error': (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+        result = json.loads(lines[-1][len(MARKER):])
+        result['spawn_s'] = spawn_s
+        samples.append(result)
+        if 'error' in result:
+            return result
+    summary = dict(samples[-1])
+    for key in ('import_s', 'first_s', 'spawn_s'):
+        summary[key] = statistics.median(s[key] for s in samples)
+    return summary
+
+
+def main(entries, runs):
+    print(f"{'entry':20s} {'import':>8s} {'first':>8s} {'spawn':>8s}  frameworks loaded")
+    for name in entries:
+        r = measure(name, runs)
+        if 'error' in r:
+            print(f"{name:20s} {'-':>8s} {'-':>8s} {'-':>8s}  ERROR {r['error']}")
+            continue
+        print(f"{name:20s} {r['import_s']:7.2f}s {r['first_s']:7.2f}s {r['spawn_s']:7.2f}s  {', '.join(r['frameworks']) or '-'}")
+        if r['deferred']:
+            print(f"{'':20s} deferred imports: " + ", ".join(f"{k} {v:.2f}s" for k, v in r['deferred'].items()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", nargs="+", choices=list(ENTRIES), default=list(ENTRIES))
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per entry (median reported)")
+    parser.add_argument("--child", choices=list(ENTRIES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+    else:
+        main(args.entries, args.runs)
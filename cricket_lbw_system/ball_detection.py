@@ -1,28 +1,34 @@
-from ultralytics import YOLO
 import cv2
 import numpy as np
 
 import os
+import sys
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(os.path.dirname(BASE_DIR), "ai_engine") not in sys.path:
+    sys.path.append(os.path.join(os.path.dirname(BASE_DIR), "ai_engine"))
+from roi_inference import pitch_crop_rect, predict_in_roi
+import model_registry as registry
 
 class Detector:
     def __init__(self, 
                  ball_model_path=os.path.join(BASE_DIR, 'models', 'ball_model.pt'), 
                  pitch_model_path=os.path.join(BASE_DIR, 'models', 'pitch.pt'), 
                  stump_model_path=os.path.join(BASE_DIR, 'runs', 'detect', 'train', 'weights', 'best.pt'),
-                 ball_model=None, pitch_model=None, stump_model=None):
-        self.ball_model = ball_model if ball_model else YOLO(ball_model_path)
-        self.pitch_model = pitch_model if pitch_model else YOLO(pitch_model_path)
-        self.stump_model = stump_model if stump_model else YOLO(stump_model_path)
+                 ball_model=None, pitch_model=None, stump_model=None, roi_crop=True, warmup=None):
+        self.roi_crop = roi_crop  # Run the ball model on the pitch crop only
+        self.ball_model = ball_model if ball_model else registry.yolo(ball_model_path, warmup=warmup)
+        self.pitch_model = pitch_model if pitch_model else registry.yolo(pitch_model_path, warmup=warmup)
+        self.stump_model = stump_model if stump_model else registry.yolo(stump_model_path, warmup=warmup)
         
-    def detect_pitch(self, frame):
+    def detect_pitch(self, frame, with_conf=False):
         results = self.pitch_model(frame, verbose=False, conf=0.75)[0]
         for box in results.boxes:
             if int(box.cls[0]) == 1: # Pitch
-                return list(map(int, box.xyxy[0]))
-        return None
+                pitch = list(map(int, box.xyxy[0]))
+                return (pitch, float(box.conf[0])) if with_conf else pitch
+        return (None, 0.0) if with_conf else None
 
-    def detect_stumps(self, frame, conf_threshold=0.60):
+    def detect_stumps(self, frame, conf_threshold=0.60, with_conf=False):
         results = self.stump_model(frame, verbose=False, conf=0.60)[0]
         best_box = None
         highest_conf = 0.0
@@ -32,11 +38,20 @@ class Detector:
                 if conf >= conf_threshold and conf > highest_conf:
                     highest_conf = conf
                     best_box = list(map(int, box.xyxy[0]))
+        if with_conf:
+            return best_box, highest_conf
         return best_box
 
 
-    def detect_objects(self, frame, pitch_roi=None, manual_pitch=None):
-        results = self.ball_model(frame, verbose=False, conf=0.15)[0]
+    def crop_rect(self, frame_shape, pitch_roi=None, manual_pitch=None):
+        """Region the ball model runs on (None = full frame)."""
+        return pitch_crop_rect(frame_shape, pitch_roi=pitch_roi, manual_pitch=manual_pitch) if self.roi_crop else None
+
+    def detect_objects(self, frame, pitch_roi=None, manual_pitch=None, results=None):
+        """Best ball / batsman / bat; results are the ball model's Results when already run (e.g. batched)."""
+        if results is None:
+            rect = self.crop_rect(frame.shape, pitch_roi=pitch_roi, manual_pitch=manual_pitch)
+            results = predict_in_roi(self.ball_model, frame, rect, verbose=False, conf=0.15)
         detections = {
             'ball': None,
             'batsman': None,
@@ -13,7 +13,6 @@ from trajectory_prediction import TrajectoryPredictor
 from lbw_logic import LBWLogic
 from visualization import draw_analytics
 from utils import resize_frame
-import onnxruntime as ort
 try:
     sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'ai_engine')))
     from hawk_eye_engine import estimate_speed, swing_amount, spin_intensity, get_ball_type
@@ -22,297 +21,141 @@ except ImportError:
     swing_amount = lambda *a, **k: 0
     spin_intensity = lambda *a, **k: 0
     get_ball_type = lambda *a, **k: "UNKNOWN"
+from refresh_scheduler import StaticSceneScheduler
+from scene_change import SceneChangeDetector, CUT
+from roi_inference import pitch_crop_rect
+from motion_gate import MotionGate
+from batsman_tracker import BatsmanTracker
+from mjpeg_stream import source_size
+from api_client import DetectionUpdateSender
+from live_session import LiveSession, LiveSessions, ModelPool, DEFAULT_SESSION, session_for_request
+from detection_scheduler import DetectionScheduler
+from shot_stream import load_shot_classifier
+import model_registry as registry
 
-import joblib
-import json
-import requests
-import threading
 import queue
 
-camera_lock = threading.Lock()
-frame_queue = queue.Queue(maxsize=2)
-stop_reader_thread = False
-reader_thread_obj = None
-video_writer = None
-
-
-class HTTPMJPEGStream:
-    def __init__(self, url):
-        self.url = url
-        self.stream = None
-        self.iterator = None
-        self.bytes = b''
-        self.opened = False
-        self._connect()
-        
-    def _connect(self):
-        import requests
-        try:
-            self.stream = requests.get(self.url, stream=True, timeout=5)
-            self.iterator = self.stream.iter_content(chunk_size=8192)
-            self.opened = True
-        except:
-            self.opened = False
-            
-    def isOpened(self):
-        return self.opened
-        
-    def read(self):
-        import cv2
-        import numpy as np
-        if not self.opened:
-            return False, None
-        try:
-            while True:
-                a = self.bytes.find(b'\xff\xd8')
-                b = self.bytes.find(b'\xff\xd9')
-                if a != -1 and b != -1:
-                    if b < a:
-                        self.bytes = self.bytes[b+2:]
-                        continue
-                    jpg = self.bytes[a:b+2]
-                    self.bytes = self.bytes[b+2:]
-                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
-                        return True, frame
-                chunk = next(self.iterator)
-                self.bytes += chunk
-        except StopIteration:
-            self.opened = False
-            return False, None
-        except Exception as e:
-            self.opened = False
-            return False, None
-            
-    def release(self):
-        self.opened = False
-        if self.stream:
-            self.stream.close()
-            
-    def get(self, prop_id):
-        return 0
-
-def camera_reader_loop():
-    global camera, stop_reader_thread, frame_queue, connection_status, video_writer
-    while not stop_reader_thread:
-        with camera_lock:
-            if camera is None or not camera.isOpened():
-                time.sleep(0.1)
-                continue
-            success, frame = camera.read()
-        
-        if success:
-            if video_writer is not None:
-                try:
-                    video_writer.write(frame)
-                except Exception as e:
-                    print(f"Error writing to video: {e}")
-            if getattr(sys.modules[__name__], 'is_video_file', False):
-                frame_queue.put(frame, block=True)
-            else:
-                if frame_queue.full():
-                    try:
-                        frame_queue.get_nowait()
-                    except queue.Empty:
-                        pass
-                frame_queue.put(frame)
-        else:
-            with camera_lock:
-                connection_status = "Video Finished / Interrupted"
-                if camera:
-                    camera.release()
-                    camera = None
-                if video_writer:
-                    video_writer.release()
-                    video_writer = None
-            time.sleep(0.1)
-
-def start_camera_reader():
-    global stop_reader_thread, reader_thread_obj
-    stop_reader_thread = False
-    if reader_thread_obj is None or not reader_thread_obj.is_alive():
-        reader_thread_obj = threading.Thread(target=camera_reader_loop, daemon=True)
-        reader_thread_obj.start()
-
-def stop_camera_reader():
-    global stop_reader_thread, reader_thread_obj
-    stop_reader_thread = True
-    if reader_thread_obj is not None:
-        reader_thread_obj.join(timeout=1.0)
-        reader_thread_obj = None
-
-
-class HTTPMJPEGStream:
-    def __init__(self, url):
-        self.url = url
-        self.stream = None
-        self.iterator = None
-        self.bytes = b''
-        self.opened = False
-        self._connect()
-        
-    def _connect(self):
-        import requests
-        try:
-            self.stream = requests.get(self.url, stream=True, timeout=5)
-            self.iterator = self.stream.iter_content(chunk_size=8192)
-            self.opened = True
-        except:
-            self.opened = False
-            
-    def isOpened(self):
-        return self.opened
-        
-    def read(self):
-        import cv2
-        import numpy as np
-        if not self.opened:
-            return False, None
-        try:
-            while True:
-                a = self.bytes.find(b'\xff\xd8')
-                b = self.bytes.find(b'\xff\xd9')
-                if a != -1 and b != -1:
-                    if b < a:
-                        self.bytes = self.bytes[b+2:]
-                        continue
-                    jpg = self.bytes[a:b+2]
-                    self.bytes = self.bytes[b+2:]
-                    frame = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
-                    if frame is not None:
-                        return True, frame
-                chunk = next(self.iterator)
-                self.bytes += chunk
-        except StopIteration:
-            self.opened = False
-            return False, None
-        except Exception as e:
-            self.opened = False
-            return False, None
-            
-    def release(self):
-        self.opened = False
-        if self.stream:
-            self.stream.close()
-            
-    def get(self, prop_id):
-        return 0
-        
-    # Clear queue
-    while not frame_queue.empty():
-        try:
-            frame_queue.get_nowait()
-        except queue.Empty:
-            break
+
+# One keep-alive session and sender thread for the Node API; per-frame updates coalesce per detection id
+update_sender = DetectionUpdateSender()
 
 def create_new_detection_sync(image_path="Live LBW Stream"):
-    try:
-        r = requests.post("http://127.0.0.1:3000/api/detections/new", json={"image_path": image_path}, timeout=0.3)
-        if r.status_code == 200:
-            return r.json().get("id")
-    except Exception as e:
-        print(f"Error creating DB record: {e}")
-    return None
-
-def make_api_call_async(url, payload):
-    def run():
-        try:
-            requests.post(url, json=payload, timeout=0.5)
-        except Exception as e:
-            pass
-    threading.Thread(target=run, daemon=True).start()
+    return update_sender.create_detection(image_path)
 
 
 # Initialize Flask App
 app = Flask(__name__)
 CORS(app)
 
-# Global Models
+# Global Models (shared by every camera session)
+models = ModelPool()
 print("--- PRE-LOADING LBW MODELS ---")
-detector = Detector()
-tracker = BallTracker(smoothing_factor=0.6, jump_threshold=120)
-pose_detector = BatsmanPoseDetector()
+detector = Detector(warmup=True)
+detector.ball_model = models.share(detector.ball_model, "ball")
+detector.pitch_model = models.share(detector.pitch_model, "pitch")
+detector.stump_model = models.share(detector.stump_model, "stumps")
 predictor = TrajectoryPredictor()
-lbw_logic = LBWLogic()
+# Ball-model frames of all cameras go through one batched pass per tick
+detections = DetectionScheduler(detector.ball_model, verbose=False, conf=0.15)
 print("--- MODELS READY ---")
 
 # Shot Model State
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-AI_ENGINE_MODELS_DIR = os.path.join(os.path.dirname(BASE_DIR), 'ai_engine', 'models')
-SHOT_MODEL_PATH = os.path.join(AI_ENGINE_MODELS_DIR, "lstm_shot_v2.onnx")
-SCALER_PATH     = os.path.join(AI_ENGINE_MODELS_DIR, "scaler_v2.save")
-LABEL_MAP_PATH  = os.path.join(AI_ENGINE_MODELS_DIR, "label_map_v2.json")
+from model_registry import SHOT_MODEL_PATH, SCALER_PATH, LABEL_MAP_PATH
+
+SEQ_LEN = 30
+CONF_THRESHOLD = 0.70
+TARGET_WIDTH = 1000  # resize_frame width; MJPEG cameras decode straight to about this size
 
 try:
-    shot_model = ort.InferenceSession(SHOT_MODEL_PATH)
-    scaler = joblib.load(SCALER_PATH)
-    with open(LABEL_MAP_PATH, "r") as f:
-        shot_classes = json.load(f)["classes"]
+    shot_classifier = load_shot_classifier(SHOT_MODEL_PATH, SCALER_PATH, seq_len=SEQ_LEN, warmup=True)
+    shot_classes = registry.labels(LABEL_MAP_PATH)
+    print(registry.format_load_report())
 except Exception as e:
     print(f"CRITICAL: Shot Model Loading Error: {e}")
-    shot_model = None
+    shot_classifier = None
     shot_classes = []
 
-SEQ_LEN = 30
-CONF_THRESHOLD = 0.70
 IGNORE_LABELS  = {"Batsman", "Pose"}
 
-# Camera State
-camera = None
-connection_status = "Not Connected"
-current_ip = ""
-show_landmarks_flag = False
-
-# LBW Tracking State
-pitch_roi = None
-stump_rect = None
-pad_hit_time = None
-manual_pitch_pts = []
-session_log = []
-last_logged_pad_hit_time = None
-pose_buffer = []
-latched_shot_label = "Waiting..."
-latched_shot_conf = 0.0
-shot_display_countdown = 0
-current_db_id = None
-frames_without_ball = 0
-lbw_decision_time = None
-current_display_decision = None
-shot_delay_countdown = 0
+
+class LBWSession(LiveSession):
+    """Camera and LBW tracking state of one live camera."""
+
+    recording_prefix = "live_lbw_recording"
+    pipeline_name = "live-lbw-pipeline"
+
+    def __init__(self, session_id):
+        super().__init__(session_id, target_width=TARGET_WIDTH)
+        self.manual_pitch_pts = []
+        self.tracker = BallTracker(smoothing_factor=0.6, jump_threshold=120)
+        self.pose_detector = BatsmanPoseDetector(pose_instance=registry.new_pose())
+        self.lbw_logic = LBWLogic()
+        self.shot_classifier = shot_classifier.clone() if shot_classifier else None
+        self.pitch_refresh = StaticSceneScheduler("pitch")
+        self.stump_refresh = StaticSceneScheduler("stumps")
+        self.scene = SceneChangeDetector()
+        self.scene.subscribe(self.pitch_refresh.on_scene_change)
+        self.scene.subscribe(self.stump_refresh.on_scene_change)
+        self.motion_gate = MotionGate()
+        self.scene.subscribe(self.motion_gate.wake)
+        self.batsman_tracker = BatsmanTracker()
+        self.scene.subscribe(self.batsman_tracker.on_scene_change)
+        self.reset()
+
+    def close(self):
+        stopped = super().close()
+        if stopped:
+            self.pose_detector.pose.close()  # Every LBW session builds its own graph
+        return stopped
+
+    def reset(self):
+        super().reset()
+        # LBW Tracking State
+        self.pitch_roi = None
+        self.stump_rect = None
+        self.pad_hit_time = None
+        self.last_logged_pad_hit_time = None
+        if self.shot_classifier: self.shot_classifier.reset()
+        self.latched_shot_label = "Waiting..."
+        self.latched_shot_conf = 0.0
+        self.shot_display_countdown = 0
+        self.shot_delay_countdown = 0
+        self.frames_without_ball = 0
+        self.tracker.clear()
+        self.lbw_logic.reset()
+        self.pitch_refresh.reset()
+        self.stump_refresh.reset()
+        self.scene.reset()
+        self.motion_gate.reset()
+        self.batsman_tracker.reset()
+        self.lbw_decision_time = None
+        self.current_display_decision = None
+
+    def frames(self):
+        return generate_frames(self)
+
+    def status(self):
+        return dict(super().status(),
+                    refresh={"pitch": self.pitch_refresh.stats(), "stumps": self.stump_refresh.stats()},
+                    scene_changes=self.scene.stats(), motion_gate=self.motion_gate.stats(),
+                    batsman_tracker=self.batsman_tracker.stats())
+
+
+sessions = LiveSessions(LBWSession)
+sessions.get(DEFAULT_SESSION)
 
 @app.route('/api/connect', methods=['POST'])
 def connect_camera():
-    global camera, connection_status, current_ip, pitch_roi, stump_rect, pad_hit_time, manual_pitch_pts, session_log, last_logged_pad_hit_time, pose_buffer, latched_shot_label, latched_shot_conf, shot_display_countdown, shot_delay_countdown, current_db_id, frames_without_ball, lbw_decision_time, current_display_decision, show_landmarks_flag
+    s = session_for_request(sessions, request, create=True)
     data = request.json
     ip = data.get('ip', '')
-    manual_pitch_pts = data.get('manual_pitch', [])
-    show_landmarks_flag = data.get('showLandmarks', False)
+    s.manual_pitch_pts = data.get('manual_pitch', [])
+    s.show_landmarks_flag = data.get('showLandmarks', False)
     
     # Reset tracking state
-    pitch_roi = None
-    stump_rect = None
-    pad_hit_time = None
-    session_log = []
-    last_logged_pad_hit_time = None
-    pose_buffer = []
-    latched_shot_label = "Waiting..."
-    latched_shot_conf = 0.0
-    shot_display_countdown = 0
-    shot_delay_countdown = 0
-    current_db_id = None
-    frames_without_ball = 0
-    tracker.clear()
-    lbw_logic.reset()
-    lbw_decision_time = None
-    current_display_decision = None
-    
-    stop_camera_reader()
-    with camera_lock:
-        if camera: camera.release()
-        global video_writer
-        if video_writer: video_writer.release(); video_writer = None
-    
-    global is_video_file
+    s.reset()
+
     is_video_file = False
     video_source = ip
     if str(ip).isdigit():
@@ -320,97 +163,81 @@ def connect_camera():
     elif isinstance(ip, str) and (ip.startswith('/uploads/') or ip.startswith('uploads/')):
         video_source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared', 'uploads', ip.split('uploads/')[-1])
         is_video_file = True
-    elif isinstance(ip, str) and ip.startswith('uploads/'):
-        video_source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared', ip)
 
-    print(f"Connecting to: {video_source}")
-    with camera_lock:
-        if camera: camera.release()
-        try:
-            os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "timeout;5000"
-            if isinstance(video_source, int) and os.name == 'nt':
-                camera = cv2.VideoCapture(video_source, cv2.CAP_DSHOW)
-            else:
-                camera = cv2.VideoCapture(video_source)
-        except Exception as e:
-            print(f"OpenCV Error opening camera: {e}")
-            camera = None
-
-    if camera and camera.isOpened():
-        connection_status = "Connected"
-        global current_ip
-        current_ip = ip
-        
-        success, frame = camera.read()
-        if success:
-            h, w = frame.shape[:2]
-            fps = 30.0
-            timestamp = time.strftime("%Y%m%d_%H%M%S")
-            upload_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'shared', 'uploads')
-            os.makedirs(upload_dir, exist_ok=True)
-            save_path = os.path.join(upload_dir, f"live_lbw_recording_{timestamp}.mp4")
-            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-            video_writer = cv2.VideoWriter(save_path, fourcc, fps, (w, h))
-            if not frame_queue.full():
-                frame_queue.put(frame)
-                
-        start_camera_reader()
-        return jsonify({"status": "success", "message": "Connected"})
+    os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "timeout;5000"
+    if s.connect(video_source, ip, is_video_file):
+        return jsonify({"status": "success", "message": "Connected", "session": s.id})
     else:
-        connection_status = "Connection Failed"
         return jsonify({"status": "error", "message": f"Failed to open camera: {video_source}"}), 500
 
 @app.route('/api/status', methods=['GET'])
 def get_status():
-    return jsonify({"status": connection_status, "ip": current_ip})
+    return jsonify(session_for_request(sessions, request).status())
+
+@app.route('/api/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify({"sessions": [s.status() for s in sessions.all()], "max_sessions": sessions.max_sessions})
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    return jsonify({"detection_updates": update_sender.stats(), "models": models.stats(), "detection_scheduler": detections.stats(),
+                    "video_feed": {s.id: s.broadcaster.stats() for s in sessions.all()}})
+
+@app.route('/api/latency', methods=['GET'])
+def get_latency():
+    # Frame age at each stage (capture -> queue / inference / encode), p50 / p95 / p99 in ms
+    if request.args.get('session') == 'all':
+        return jsonify({"sessions": [s.latency_report() for s in sessions.all()]})
+    return jsonify(session_for_request(sessions, request).latency_report())
 
 @app.route('/reset_score', methods=['POST'])
 def reset_score():
-    tracker.clear()
-    lbw_logic.reset()
-    global pad_hit_time, session_log, last_logged_pad_hit_time, current_db_id, frames_without_ball, lbw_decision_time, current_display_decision
-    pad_hit_time = None
-    session_log = []
-    last_logged_pad_hit_time = None
-    current_db_id = None
-    frames_without_ball = 0
-    lbw_decision_time = None
-    current_display_decision = None
+    s = session_for_request(sessions, request)
+    s.tracker.clear()
+    s.lbw_logic.reset()
+    s.pad_hit_time = None
+    s.session_log = []
+    s.last_logged_pad_hit_time = None
+    s.current_db_id = None
+    s.frames_without_ball = 0
+    s.lbw_decision_time = None
+    s.current_display_decision = None
     return jsonify({"status": "success", "score": 0})
 
 @app.route('/get_score')
 def get_score():
-    global latched_shot_label, latched_shot_conf, shot_display_countdown, shot_delay_countdown, current_display_decision, lbw_logic
-    
+    s = session_for_request(sessions, request)
     display_shot = None
     display_conf = None
     
-    if not current_display_decision:
-        if shot_delay_countdown > 0:
+    if not s.current_display_decision:
+        if s.shot_delay_countdown > 0:
             display_shot = "Analyzing..."
             display_conf = 0.0
-        elif shot_display_countdown > 0:
-            display_shot = latched_shot_label
-            display_conf = latched_shot_conf
+        elif s.shot_display_countdown > 0:
+            display_shot = s.latched_shot_label
+            display_conf = s.latched_shot_conf
             
     return jsonify({
         "score": 0, 
-        "decision": current_display_decision,
-        "contact": lbw_logic.first_contact if current_display_decision else None,
+        "decision": s.current_display_decision,
+        "contact": s.lbw_logic.first_contact if s.current_display_decision else None,
         "shot_label": display_shot,
         "shot_conf": display_conf
     })
 
 @app.route('/get_log')
 def get_log():
-    return jsonify({"log": session_log})
+    return jsonify({"log": session_for_request(sessions, request).session_log})
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # One pipeline per camera for every viewer: each response only streams the newest annotated frame
+    s = session_for_request(sessions, request, create=True)
+    return Response(s.watch(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-def generate_frames():
-    global camera, connection_status, pitch_roi, stump_rect, pad_hit_time, current_ip, session_log, last_logged_pad_hit_time, pose_buffer, latched_shot_label, latched_shot_conf, shot_display_countdown, shot_delay_countdown, shot_model, scaler, shot_classes, current_db_id, frames_without_ball, lbw_decision_time, current_display_decision, show_landmarks_flag
+def generate_frames(s):
+    """The LBW inference loop of one camera session: yields each annotated frame as JPEG bytes (run by s.worker)."""
     prev_time = time.time()
     tracked_trajectory = []
     last_shot_label = None
@@ -421,54 +248,56 @@ def generate_frames():
     while True:
         current_frame_idx += 1
         try:
-            frame = frame_queue.get(timeout=0.1)
+            captured_at, frame = s.next_frame(timeout=0.1)
             success = True
         except queue.Empty:
             success = False
-            with camera_lock:
-                if camera is None or not camera.isOpened():
+            with s.camera_lock:
+                if s.camera is None or not s.camera.isOpened():
                     frame = np.zeros((480, 640, 3), dtype=np.uint8)
-                    cv2.putText(frame, connection_status, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
+                    cv2.putText(frame, s.connection_status, (50, 240), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
                     ret, buffer = cv2.imencode('.jpg', frame)
-                    frame_bytes = buffer.tobytes()
-                    yield (b'--frame\r\n'
-                           b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+                    yield buffer.tobytes()
             continue
         
-        # Resize frame for LBW
-        orig_h, orig_w = frame.shape[:2]
-        frame = resize_frame(frame)
+        # Resize frame for LBW (orig_* is the camera resolution: MJPEG frames may already be DCT-reduced)
+        orig_w, orig_h = source_size(s.camera, frame)
+        frame = resize_frame(frame, TARGET_WIDTH)
         
-        target_width = 1000
+        target_width = TARGET_WIDTH
         scaled_manual_pitch = []
         if orig_w > target_width:
             target_height = int(orig_h * (target_width / orig_w))
             scale_x = target_width / orig_w
             scale_y = target_height / orig_h
-            if manual_pitch_pts:
-                scaled_manual_pitch = [[p[0]*scale_x, p[1]*scale_y] for p in manual_pitch_pts]
+            if s.manual_pitch_pts:
+                scaled_manual_pitch = [[p[0]*scale_x, p[1]*scale_y] for p in s.manual_pitch_pts]
         else:
-            scaled_manual_pitch = list(manual_pitch_pts) if manual_pitch_pts else []
+            scaled_manual_pitch = list(s.manual_pitch_pts) if s.manual_pitch_pts else []
         
         # FPS Calculation
         curr_time = time.time()
         fps = 1 / (curr_time - prev_time) if (curr_time - prev_time) > 0 else 0
         prev_time = curr_time
 
+        # Camera cut: the old ball track belongs to another view
+        if s.scene.update(frame, current_frame_idx) == CUT:
+            s.tracker.clear()
+            s.frames_without_ball = 0
+
         # 1. Detect Pitch (Auto) & Stumps (Auto)
         if not scaled_manual_pitch:
-            if current_frame_idx % 30 == 0 or not pitch_roi:
-                new_pitch_roi = detector.detect_pitch(frame)
-                if new_pitch_roi:
-                    pitch_roi = new_pitch_roi
-                    
-            if current_frame_idx % 30 == 0 or not stump_rect:
-                new_stump_rect = detector.detect_stumps(frame)
-                if new_stump_rect:
-                    stump_rect = new_stump_rect
-
-        # 2. Detect Objects
-        objects = detector.detect_objects(frame, pitch_roi=pitch_roi, manual_pitch=scaled_manual_pitch)
+            s.pitch_roi = s.pitch_refresh.get(current_frame_idx, lambda: detector.detect_pitch(frame, with_conf=True))
+            s.stump_rect = s.stump_refresh.get(current_frame_idx, lambda: detector.detect_stumps(frame, with_conf=True))
+
+        # 2. Detect Objects (skipped, together with pose, while nothing moves on the pitch)
+        gate_rect = pitch_crop_rect(frame.shape, pitch_roi=s.pitch_roi, manual_pitch=scaled_manual_pitch) or s.pitch_roi
+        gate_open = s.motion_gate.update(frame, gate_rect)
+        if gate_open:
+            ball_results = detections.detect(s.id, frame, detector.crop_rect(frame.shape, pitch_roi=s.pitch_roi, manual_pitch=scaled_manual_pitch))
+            objects = detector.detect_objects(frame, pitch_roi=s.pitch_roi, manual_pitch=scaled_manual_pitch, results=ball_results)
+        else:
+            objects = {}
         ball_data = objects.get('ball')
         batsman_data = objects.get('batsman')
         bat_data = objects.get('bat')
@@ -483,91 +312,78 @@ def generate_frames():
             
         pad_zone = None
         pose_results, leg_positions, pose_offset = None, [], None
-        if batsman_data:
-            pose_results, leg_positions, pose_offset = pose_detector.detect_pose(frame, batsman_data['bbox'])
+        # Crop from the last pose while it tracks, the detected batsman otherwise
+        pose_box = s.batsman_tracker.select(lambda: batsman_data['bbox'] if batsman_data else None) if gate_open else None
+        if pose_box:
+            pose_results, leg_positions, pose_offset = s.pose_detector.detect_pose(frame, pose_box)
+            s.batsman_tracker.update(s.pose_detector.extractor if pose_results and pose_results.pose_landmarks else None, frame.shape)
             if leg_positions:
                 lx = [p[0] for p in leg_positions]
                 ly = [p[1] for p in leg_positions]
                 pad_zone = (max(0, min(lx) - 30), max(0, min(ly) - 20), min(frame.shape[1], max(lx) + 30), min(frame.shape[0], max(ly) + 30))
             else:
-                bx1, by1, bx2, by2 = batsman_data['bbox']
+                bx1, by1, bx2, by2 = batsman_data['bbox'] if batsman_data else pose_box
                 pad_zone = (bx1, int(by1 + (by2-by1)*0.5), bx2, by2)
                 
         # Shot Detection Logic
-        if pose_results and pose_results.pose_landmarks and shot_model:
-            bx1, by1, bx2, by2 = pose_offset if pose_offset else (0, 0, frame.shape[1], frame.shape[0])
-            cw, ch = bx2-bx1, by2-by1
+        if pose_results and pose_results.pose_landmarks and s.shot_classifier:
             h_full, w_full = frame.shape[:2]
-            feat = []
-            for p in pose_results.pose_landmarks.landmark:
-                abs_x = p.x * cw + bx1
-                abs_y = p.y * ch + by1
-                feat.extend([abs_x / w_full, abs_y / h_full, p.z, p.visibility])
-                
-            pose_buffer.append(feat)
-            if len(pose_buffer) > SEQ_LEN: pose_buffer.pop(0)
-            
-            if len(pose_buffer) == SEQ_LEN:
-                X = np.array(pose_buffer, dtype=np.float32)
-                X_scaled = scaler.transform(X).reshape(1, SEQ_LEN, -1).astype(np.float32)
-                ort_inputs = {shot_model.get_inputs()[0].name: X_scaled}
-                preds = shot_model.run(None, ort_inputs)[0]
-                idx = np.argmax(preds[0])
-                if shot_classes[idx] not in IGNORE_LABELS and preds[0][idx] >= CONF_THRESHOLD:
-                    latched_shot_label = shot_classes[idx]
-                    latched_shot_conf = float(preds[0][idx])
-                    shot_delay_countdown = 0
-                    shot_display_countdown = 120 # 4 seconds
+            probs = s.shot_classifier.push(s.pose_detector.extractor.features((w_full, h_full)))
+            if probs is not None:
+                idx = np.argmax(probs)
+                if shot_classes[idx] not in IGNORE_LABELS and probs[idx] >= CONF_THRESHOLD:
+                    s.latched_shot_label = shot_classes[idx]
+                    s.latched_shot_conf = float(probs[idx])
+                    s.shot_delay_countdown = 0
+                    s.shot_display_countdown = 120 # 4 seconds
                     
-                    session_log.append({
+                    s.session_log.append({
                         "time": time.strftime("%I:%M:%S %p"),
                         "type": "shot",
-                        "label": latched_shot_label,
-                        "conf": latched_shot_conf
+                        "label": s.latched_shot_label,
+                        "conf": s.latched_shot_conf
                     })
-                    pose_buffer.clear()
-                else:
-                    pose_buffer = pose_buffer[1:]
+                    s.shot_classifier.reset()
 
         # 4. Track Ball
         if ball_center is not None:
-            last_pt = tracker.trajectory[-1] if tracker.trajectory else None
-            trajectory = tracker.update(ball_center)
-            new_last_pt = tracker.trajectory[-1] if tracker.trajectory else None
+            last_pt = s.tracker.trajectory[-1] if s.tracker.trajectory else None
+            trajectory = s.tracker.update(ball_center)
+            new_last_pt = s.tracker.trajectory[-1] if s.tracker.trajectory else None
             
             if last_pt != new_last_pt or len(trajectory) == 1:
-                frames_without_ball = 0
+                s.frames_without_ball = 0
                 if len(trajectory) == 1:
-                    current_db_id = create_new_detection_sync("Live LBW Stream")
+                    s.current_db_id = create_new_detection_sync("Live LBW Stream")
                     tracked_trajectory = []
-                    lbw_logic.reset()
-                    lbw_decision_time = None
-                    current_display_decision = None
+                    s.lbw_logic.reset()
+                    s.lbw_decision_time = None
+                    s.current_display_decision = None
             else:
-                frames_without_ball += 1
+                s.frames_without_ball += 1
         else:
-            frames_without_ball += 1
-            trajectory = tracker.update(ball_center)
+            s.frames_without_ball += 1
+            trajectory = s.tracker.update(ball_center)
             
-        if frames_without_ball > 15:
+        if s.frames_without_ball > 15:
             can_reset = True
             
-            if lbw_logic.decision in ["OUT", "NOT OUT", "NOT OUT (Missed Stumps)"]:
-                if lbw_decision_time is not None and time.time() - lbw_decision_time < 5.0:
+            if s.lbw_logic.decision in ["OUT", "NOT OUT", "NOT OUT (Missed Stumps)"]:
+                if s.lbw_decision_time is not None and time.time() - s.lbw_decision_time < 5.0:
                     can_reset = False
             
             if can_reset:
-                tracker.clear()
-                lbw_logic.reset()
-                lbw_decision_time = None
-                current_display_decision = None
+                s.tracker.clear()
+                s.lbw_logic.reset()
+                s.lbw_decision_time = None
+                s.current_display_decision = None
         
         # 5. Check Collision & Impact
-        if lbw_logic.first_contact is None:
-            prev_contact = lbw_logic.first_contact
-            lbw_logic.check_collision(trajectory, bat_zone, pad_zone, stump_rect)
-            if lbw_logic.first_contact == "PAD" and prev_contact is None:
-                pad_hit_time = time.time()
+        if s.lbw_logic.first_contact is None:
+            prev_contact = s.lbw_logic.first_contact
+            s.lbw_logic.check_collision(trajectory, bat_zone, pad_zone, s.stump_rect)
+            if s.lbw_logic.first_contact == "PAD" and prev_contact is None:
+                s.pad_hit_time = time.time()
 
         # 6. Predict Trajectory
         predicted_path = []
@@ -575,48 +391,50 @@ def generate_frames():
             predicted_path = predictor.predict(trajectory)
 
         # 7. Judge LBW
-        decision = lbw_logic.decision
+        decision = s.lbw_logic.decision
         is_delay_active = False
-        ball_lost = frames_without_ball > 5
+        ball_lost = s.frames_without_ball > 5
         
-        if lbw_logic.first_contact == "PAD":
+        if s.lbw_logic.first_contact == "PAD":
             if decision == "PENDING" or decision == "CHECK LBW" or decision == "":
-                decision = lbw_logic.judge_lbw(predicted_path, stump_rect, ball_lost=ball_lost)
-                if decision in ["OUT", "NOT OUT", "NOT OUT (Missed Stumps)"] and lbw_decision_time is None:
-                    lbw_decision_time = time.time()
-            current_display_decision = decision
+                decision = s.lbw_logic.judge_lbw(predicted_path, s.stump_rect, ball_lost=ball_lost)
+                if decision in ["OUT", "NOT OUT", "NOT OUT (Missed Stumps)"] and s.lbw_decision_time is None:
+                    s.lbw_decision_time = time.time()
+            s.current_display_decision = decision
         else:
             if decision in ["PENDING", "CHECK LBW", "", "TRACKING..."]:
-                decision = lbw_logic.judge_lbw(predicted_path, stump_rect, ball_lost=ball_lost)
-                if decision in ["OUT", "OUT (BOWLED)", "NOT OUT", "NOT OUT (Missed Stumps)"] and lbw_decision_time is None:
-                    lbw_decision_time = time.time()
-            current_display_decision = decision if (lbw_logic.first_contact or decision == "OUT (BOWLED)") else None
+                decision = s.lbw_logic.judge_lbw(predicted_path, s.stump_rect, ball_lost=ball_lost)
+                if decision in ["OUT", "OUT (BOWLED)", "NOT OUT", "NOT OUT (Missed Stumps)"] and s.lbw_decision_time is None:
+                    s.lbw_decision_time = time.time()
+            s.current_display_decision = decision if (s.lbw_logic.first_contact or decision == "OUT (BOWLED)") else None
         
         # Log final decision once
-        if decision not in ["PENDING", "CHECK LBW", ""] and pad_hit_time is not None:
-            if last_logged_pad_hit_time != pad_hit_time:
-                last_logged_pad_hit_time = pad_hit_time
-                session_log.append({
+        if decision not in ["PENDING", "CHECK LBW", ""] and s.pad_hit_time is not None:
+            if s.last_logged_pad_hit_time != s.pad_hit_time:
+                s.last_logged_pad_hit_time = s.pad_hit_time
+                s.session_log.append({
                     "time": time.strftime("%I:%M:%S %p"),
                     "type": "lbw",
                     "decision": decision
                 })
 
+        s.latency.record("inference", captured_at)
+
         # 8. Visualization
-        if pose_results and show_landmarks_flag:
-            pose_detector.draw_skeleton(frame, pose_results, offset=pose_offset)
+        if pose_results and s.show_landmarks_flag:
+            s.pose_detector.draw_skeleton(frame, pose_results, offset=pose_offset)
             
-        if current_display_decision is None:
-            if shot_delay_countdown > 0:
-                shot_delay_countdown -= 1
-            elif shot_display_countdown > 0:
-                shot_display_countdown -= 1
-                if shot_display_countdown == 0:
-                    latched_shot_label = None
-                    latched_shot_conf = 0.0
+        if s.current_display_decision is None:
+            if s.shot_delay_countdown > 0:
+                s.shot_delay_countdown -= 1
+            elif s.shot_display_countdown > 0:
+                s.shot_display_countdown -= 1
+                if s.shot_display_countdown == 0:
+                    s.latched_shot_label = None
+                    s.latched_shot_conf = 0.0
         
-        vis_impact_point = None if is_delay_active else lbw_logic.impact_point
-        vis_first_contact = None if is_delay_active else lbw_logic.first_contact
+        vis_impact_point = None if is_delay_active else s.lbw_logic.impact_point
+        vis_first_contact = None if is_delay_active else s.lbw_logic.first_contact
 
         speed = 0
         swing = 0
@@ -637,14 +455,14 @@ def generate_frames():
             vis_impact_point, 
             decision, 
             fps,
-            pitch_roi,
-            stump_rect,
+            s.pitch_roi,
+            s.stump_rect,
             scaled_manual_pitch,
             bat_zone=bat_zone,
             pad_zone=pad_zone,
             first_contact=vis_first_contact,
-            show_setup=show_landmarks_flag,
-            show_detections=show_landmarks_flag,
+            show_setup=s.show_landmarks_flag,
+            show_detections=s.show_landmarks_flag,
             speed=speed,
             swing=swing,
             spin=spin,
@@ -652,8 +470,8 @@ def generate_frames():
         )
 
         if decision and decision not in ["PENDING", "CHECK LBW", ""] and not is_delay_active:
-            if lbw_logic.impact_point:
-                ix, iy = lbw_logic.impact_point
+            if s.lbw_logic.impact_point:
+                ix, iy = s.lbw_logic.impact_point
                 cv2.circle(annotated_frame, (int(ix), int(iy)), 15, (0, 0, 255), 3)
                 cv2.putText(annotated_frame, "IMPACT", (int(ix) - 30, int(iy) - 20), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
 
@@ -662,38 +480,37 @@ def generate_frames():
         if len(trajectory) > 0:
             tracked_trajectory = list(trajectory)
 
-        if current_db_id is not None:
-            shot_changed = (latched_shot_label != last_shot_label)
+        if s.current_db_id is not None:
+            shot_changed = (s.latched_shot_label != last_shot_label)
             decision_changed = (decision != last_decision)
-            contact_changed = (lbw_logic.first_contact != last_contact)
+            contact_changed = (s.lbw_logic.first_contact != last_contact)
             if current_frame_idx % 3 == 0 or shot_changed or decision_changed or contact_changed:
-                last_shot_label = latched_shot_label
+                last_shot_label = s.latched_shot_label
                 last_decision = decision
-                last_contact = lbw_logic.first_contact
+                last_contact = s.lbw_logic.first_contact
                 results_data = [{
-                    "class_name": latched_shot_label if latched_shot_label else "Waiting...",
-                    "conf": latched_shot_conf if latched_shot_label else 0.0,
+                    "class_name": s.latched_shot_label if s.latched_shot_label else "Waiting...",
+                    "conf": s.latched_shot_conf if s.latched_shot_label else 0.0,
                     "lbw_decision": decision if decision else "Waiting...",
-                    "first_contact": lbw_logic.first_contact if lbw_logic.first_contact else "None",
+                    "first_contact": s.lbw_logic.first_contact if s.lbw_logic.first_contact else "None",
                     "trajectory": tracked_trajectory,
                     "type": "live_lbw"
                 }]
-                make_api_call_async("http://127.0.0.1:3000/api/detections/update", {"id": current_db_id, "results": results_data})
+                update_sender.update(s.current_db_id, results_data)
 
         ret, buffer = cv2.imencode('.jpg', frame)
         if not ret: continue
-        yield (b'--frame\r\n' b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+        s.latency.record("encode", captured_at)
+        yield buffer.tobytes()
 
 @app.route('/api/disconnect', methods=['POST'])
 def disconnect_camera():
-    global camera, connection_status, video_writer
-    if camera:
-        camera.release()
-        camera = None
-    if video_writer:
-        video_writer.release()
-        video_writer = None
-    connection_status = "Disconnected"
+    s = session_for_request(sessions, request)
+    detections.forget(s.id)
+    if s.id == DEFAULT_SESSION:
+        s.disconnect()
+    else:
+        sessions.close(s.id)  # Extra cameras free their pipeline and pose graph
     return jsonify({"status": "success", "message": "Camera disconnected"})
 
 def main():
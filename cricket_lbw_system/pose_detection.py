@@ -1,11 +1,22 @@
-import mediapipe as mp
 import cv2
 
+import os
+import sys
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+if os.path.join(os.path.dirname(BASE_DIR), "ai_engine") not in sys.path:
+    sys.path.append(os.path.join(os.path.dirname(BASE_DIR), "ai_engine"))
+from pose_features import PoseFeatureExtractor
+from lazy_imports import lazy_import
+
+mp = lazy_import("mediapipe")
+
 class BatsmanPoseDetector:
     def __init__(self, pose_instance=None):
         self.mp_pose = mp.solutions.pose
         self.pose = pose_instance if pose_instance else self.mp_pose.Pose(static_image_mode=False, min_detection_confidence=0.5)
         self.mp_draw = mp.solutions.drawing_utils
+        # Landmarks of the last detect_pose() call; also used for the shot features
+        self.extractor = PoseFeatureExtractor()
         
     def detect_pose(self, frame, person_bbox=None):
         if person_bbox:
@@ -18,19 +29,15 @@ class BatsmanPoseDetector:
             
             roi = frame[y1:y2, x1:x2]
             if roi.size == 0:
-                return None, []
+                return None, [], None
                 
             rgb_roi = cv2.cvtColor(roi, cv2.COLOR_BGR2RGB)
             results = self.pose.process(rgb_roi)
             
             leg_positions = []
             if results.pose_landmarks:
-                rh, rw, _ = roi.shape
-                for idx in [25, 26, 27, 28]:
-                    lm = results.pose_landmarks.landmark[idx]
-                    # Map back to original frame coordinates
-                    cx, cy = int(lm.x * rw) + x1, int(lm.y * rh) + y1
-                    leg_positions.append((cx, cy))
+                # Map back to original frame coordinates
+                leg_positions = self.extractor.read(results.pose_landmarks, (x1, y1, x2, y2)).points()
             
             # Note: results here are relative to ROI. 
             # For drawing, we'll need to adjust landmarks or just pass them as is if we draw on ROI.
@@ -44,10 +51,7 @@ class BatsmanPoseDetector:
             leg_positions = []
             if results.pose_landmarks:
                 h, w, _ = frame.shape
-                for idx in [25, 26, 27, 28]:
-                    lm = results.pose_landmarks.landmark[idx]
-                    cx, cy = int(lm.x * w), int(lm.y * h)
-                    leg_positions.append((cx, cy))
+                leg_positions = self.extractor.read(results.pose_landmarks, (0, 0, w, h)).points()
             return results, leg_positions, None
 
     def draw_skeleton(self, frame, results, offset=None):
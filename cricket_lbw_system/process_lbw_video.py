@@ -1,6 +1,8 @@
 import cv2
 import time
 import argparse
+import base64
+import json
 import sys
 import os
 import numpy as np
@@ -19,8 +21,24 @@ try:
     from hawk_eye_engine import estimate_speed, swing_amount, spin_intensity, get_ball_type
 except ImportError:
     estimate_speed = swing_amount = spin_intensity = get_ball_type = None
-def process_video(input_path, output_path, mode="auto", models_dict=None):
-    import json
+from frame_pipeline import StagePipeline
+from refresh_scheduler import StaticSceneScheduler
+from scene_change import SceneChangeDetector, CUT
+import model_registry as registry
+from pose_sequence import PoseSequenceBuffer
+from batsman_tracker import BatsmanTracker
+
+def read_frames(cap, frame_limit=None):
+    while cap.isOpened():
+        if frame_limit is not None:
+            if frame_limit <= 0: break
+            frame_limit -= 1
+        ret, frame = cap.read()
+        if not ret:
+            break
+        yield resize_frame(frame)
+
+def process_video(input_path, output_path, mode="auto", models_dict=None, pipelined=True, end_frame=None):
     yield f"data: {json.dumps({'progress': f'Starting LBW processing: {input_path}'})}\n\n"
     cap = cv2.VideoCapture(input_path)
     if not cap.isOpened():
@@ -37,20 +55,15 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
         scaler = models_dict.get('scaler')
         classes = models_dict.get('classes')
     else:
-        import onnxruntime as ort
-        import joblib
-        BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        MODELS_DIR = os.path.join(BASE_DIR, 'ai_engine', 'models')
         try:
-            shot_model = ort.InferenceSession(os.path.join(MODELS_DIR, "lstm_shot_v2.onnx"))
-            scaler = joblib.load(os.path.join(MODELS_DIR, "scaler_v2.save"))
-            with open(os.path.join(MODELS_DIR, "label_map_v2.json"), "r") as f:
-                classes = json.load(f)["classes"]
+            shot_model = registry.shot_model()
+            scaler = registry.shot_scaler()
+            classes = registry.labels()
         except Exception as e:
             yield f"data: {json.dumps({'error': f'Failed to load shot detection model: {e}'})}\n\n"
             shot_model = None
 
-    pose_buffer = []
+    pose_buffer = PoseSequenceBuffer(30, scaler=scaler if shot_model else None)
     current_shot_label = ""
     current_shot_conf = 0.0
 
@@ -75,10 +88,13 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
         out = cv2.VideoWriter(output_path, fourcc, fps, (frame_w, frame_h))
     
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if end_frame is not None:
+        total_frames = min(total_frames, end_frame)  # Stop early, still emitting the final result
 
     # Initialize Modules
     if models_dict:
-        detector = Detector(ball_model=models_dict.get('ball_model'), pitch_model=models_dict.get('pitch_model'))
+        detector = Detector(ball_model=models_dict.get('ball_model'), pitch_model=models_dict.get('pitch_model'),
+                            stump_model=models_dict.get('stump_model'))
         pose_detector = BatsmanPoseDetector(pose_instance=models_dict.get('pose_detector'))
     else:
         detector = Detector()
@@ -92,7 +108,6 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
     pad_hit_time = None
     manual_pitch_pts = []
     if mode.startswith('[') and mode.endswith(']'):
-        import json
         try:
             raw_pts = json.loads(mode)
             orig_w = temp_frame.shape[1]
@@ -106,42 +121,49 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
     stump_rect = None
     pad_hit_time = None
     frame_idx = 0
+    detect_frame_idx = 0
     final_decision = "NOT OUT"
     final_conf = 1.0
 
-    while cap.isOpened():
-        ret, frame = cap.read()
-        if not ret:
-            break
-            
-        frame_idx += 1
-        if frame_idx % 10 == 0:
-            import json
-            yield f"data: {json.dumps({'progress': f'Frame {frame_idx}/{total_frames}'})}\n\n"
-            
-        frame = resize_frame(frame)
+    # Pitch and stumps are static: re-detect only when due instead of every frame
+    pitch_refresh = StaticSceneScheduler("pitch")
+    stump_refresh = StaticSceneScheduler("stumps")
+    scene = SceneChangeDetector()
+    scene.subscribe(pitch_refresh.on_scene_change)
+    scene.subscribe(stump_refresh.on_scene_change)
+    batsman_tracker = BatsmanTracker()  # Analyse stage only; cuts reset it there
 
+    def detect_stage(frame):
+        nonlocal pitch_roi, stump_rect, detect_frame_idx
+        detect_frame_idx += 1
+        scene_event = scene.update(frame, detect_frame_idx)
         # 1. Detect Pitch (Auto) & Stumps (Auto)
         if mode == "auto":
-            new_pitch_roi = detector.detect_pitch(frame)
-            if new_pitch_roi:
-                pitch_roi = new_pitch_roi
-            
-        new_stump_rect = detector.detect_stumps(frame)
-        if new_stump_rect:
-            stump_rect = new_stump_rect
+            pitch_roi = pitch_refresh.get(detect_frame_idx, lambda: detector.detect_pitch(frame, with_conf=True))
+
+        stump_rect = stump_refresh.get(detect_frame_idx, lambda: detector.detect_stumps(frame, with_conf=True))
 
         # 2. Detect Objects (Strict Pitch Enforcement)
         if not pitch_roi and not manual_pitch_pts:
             objects = {}
-            ball_data = None
-            batsman_data = None
-            bat_data = None
         else:
             objects = detector.detect_objects(frame, pitch_roi=pitch_roi, manual_pitch=manual_pitch_pts)
-            ball_data = objects.get('ball')
-            batsman_data = objects.get('batsman')
-            bat_data = objects.get('bat')
+        return frame, pitch_roi, stump_rect, objects, scene_event
+
+    def analyse_stage(item):
+        nonlocal current_shot_label, current_shot_conf, frames_without_ball, pad_hit_time, frame_idx, final_decision
+        frame, pitch_roi, stump_rect, objects, scene_event = item
+        frame_idx += 1
+
+        # A camera cut breaks the ball track: positions from the old view are meaningless
+        if scene_event == CUT:
+            tracker.clear()
+            batsman_tracker.reset()
+            frames_without_ball = 0
+
+        ball_data = objects.get('ball')
+        batsman_data = objects.get('batsman')
+        bat_data = objects.get('bat')
         
         ball_center = ball_data['center'] if ball_data else None
 
@@ -153,29 +175,24 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
             
         pad_zone = None
         pose_results, leg_positions, pose_offset = None, [], None
-        if batsman_data:
-            pose_results, leg_positions, pose_offset = pose_detector.detect_pose(frame, batsman_data['bbox'])
+        # Crop from the last pose while it tracks, the detected batsman otherwise
+        pose_box = batsman_tracker.select(lambda: batsman_data['bbox'] if batsman_data else None)
+        if pose_box:
+            pose_results, leg_positions, pose_offset = pose_detector.detect_pose(frame, pose_box)
+            batsman_tracker.update(pose_detector.extractor if pose_results and pose_results.pose_landmarks else None, frame.shape)
             if leg_positions:
                 lx = [p[0] for p in leg_positions]
                 ly = [p[1] for p in leg_positions]
                 pad_zone = (max(0, min(lx) - 30), max(0, min(ly) - 20), min(frame.shape[1], max(lx) + 30), min(frame.shape[0], max(ly) + 30))
             else:
-                bx1, by1, bx2, by2 = batsman_data['bbox']
+                bx1, by1, bx2, by2 = batsman_data['bbox'] if batsman_data else pose_box
                 pad_zone = (bx1, int(by1 + (by2-by1)*0.5), bx2, by2)
             
             # Shot prediction logic
             if shot_model and pose_results and pose_results.pose_landmarks:
-                bx1, by1, bx2, by2 = pose_offset
-                cw, ch = bx2 - bx1, by2 - by1
-                feat = []
-                for p in pose_results.pose_landmarks.landmark:
-                    feat.extend([(p.x * cw + bx1)/width, (p.y * ch + by1)/height, p.z, p.visibility])
-                pose_buffer.append(feat)
-                if len(pose_buffer) > 30: pose_buffer.pop(0)
-                if len(pose_buffer) == 30:
-                    X = np.array(pose_buffer, dtype=np.float32)
-                    X_scaled = scaler.transform(X).reshape(1, 30, -1).astype(np.float32)
-                    ort_inputs = {shot_model.get_inputs()[0].name: X_scaled}
+                pose_buffer.append(pose_detector.extractor.features((width, height)))
+                if pose_buffer.full:
+                    ort_inputs = {shot_model.get_inputs()[0].name: pose_buffer.window()}
                     preds = shot_model.run(None, ort_inputs)[0]
                     idx = np.argmax(preds[0])
                     if classes[idx] != "Batsman" and preds[0][idx] >= 0.70:
@@ -249,26 +266,45 @@ def process_video(input_path, output_path, mode="auto", models_dict=None):
             ball_type=ball_type
         )
 
+        stats = {
+            'decision': decision,
+            'contact': lbw_logic.first_contact,
+            'shot_label': current_shot_label,
+            'shot_conf': current_shot_conf
+        }
+        return frame_idx, output_frame, stats
+
+    def encode_stage(record):
+        idx, output_frame, stats = record
+        messages = []
+        if idx % 10 == 0:
+            messages.append(f"data: {json.dumps({'progress': f'Frame {idx}/{total_frames}'})}\n\n")
+
         out.write(output_frame)
         
-        if frame_idx % 3 == 0:
+        if idx % 3 == 0:
             ret, buffer = cv2.imencode('.jpg', output_frame, [cv2.IMWRITE_JPEG_QUALITY, 40])
             if ret:
-                import base64
                 b64 = base64.b64encode(buffer).decode('utf-8')
-                import json
-                stats = {
-                    'decision': decision,
-                    'contact': lbw_logic.first_contact,
-                    'shot_label': current_shot_label,
-                    'shot_conf': current_shot_conf
-                }
-                yield f"data: {json.dumps({'frame': b64, 'stats': stats})}\n\n"
+                messages.append(f"data: {json.dumps({'frame': b64, 'stats': stats})}\n\n")
+        return messages
+
+    # Decode -> detect -> analyse/annotate -> encode, each stage on its own thread
+    pipeline = StagePipeline(read_frames(cap, end_frame), [detect_stage, analyse_stage, encode_stage], threaded=pipelined)
+    try:
+        for messages in pipeline:
+            for message in messages:
+                yield message
+    finally:
+        pipeline.close()
+        cap.release()
+        out.release()
 
-    cap.release()
-    out.release()
-    import json
-    yield f"data: {json.dumps({'progress': 'LBW Analysis Complete', 'final_result': {'decision': final_decision, 'conf': final_conf}})}\n\n"
+    refresh_stats = {'pitch': pitch_refresh.stats(), 'stumps': stump_refresh.stats(), 'scene_changes': scene.stats(),
+                     'batsman_tracker': batsman_tracker.stats()}
+    saved = pitch_refresh.saved + stump_refresh.saved
+    yield f"data: {json.dumps({'progress': f'Static-scene refresh saved {saved} model calls'})}\n\n"
+    yield f"data: {json.dumps({'progress': 'LBW Analysis Complete', 'final_result': {'decision': final_decision, 'conf': final_conf, 'refresh': refresh_stats}})}\n\n"
     return True
 
 if __name__ == "__main__":
@@ -276,10 +312,10 @@ if __name__ == "__main__":
     parser.add_argument("--input", required=True)
     parser.add_argument("--output", required=True)
     parser.add_argument('--mode', type=str, default="auto", help='Analysis mode or manual pitch JSON array')
+    parser.add_argument('--serial', action='store_true', help='Run decode/inference/encode stages on one thread')
     args = parser.parse_args()
     
-    for output in process_video(args.input, args.output, args.mode):
-        import json
+    for output in process_video(args.input, args.output, args.mode, pipelined=not args.serial):
         if output.startswith("data: "):
             try:
                 data = json.loads(output[6:])